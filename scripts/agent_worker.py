@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Agent Worker Utility
+A long-lived worker that keeps the agent scripts warm. pydantic, the provider
+SDKs, every invoke_* module, the provider client, the knowledge index and the
+agent instructions are loaded once. After that, `python scripts/invoke_*.py ...`
+only imports this module. It forwards its argv, environment and
+stdin/stdout/stderr to the worker over a Unix socket and exits with the run's
+exit code.
+
+Each run is forked from the warm worker. Anything a run changes dies with the
+fork, so runs cannot affect each other or the worker. The worker itself never
+calls a provider.
+
+A script starts cold as before when:
+- no worker is running
+- the caller's AI_*, AID_*, MODEL, TEMPERATURE, API key or stage limit settings
+  (FEEDBACK_MAX_ENTRIES, KNOWLEDGE_MAX_CHARS, ERROR_CONTEXT_*, MAX_FIX_ROUNDS,
+  FIX_CHECK_TIMEOUT) differ from the worker's (modules read them at import)
+- scripts or .env changed since the worker loaded them; the worker then
+  restarts itself
+
+Settings:
+    AID_WORKER=0          Never forward to the worker
+    AID_WORKER_SOCKET     Socket path (default: per user and repository, in the temp dir)
+
+Usage:
+    python scripts/agent_worker.py start [--foreground]
+    python scripts/agent_worker.py status
+    python scripts/agent_worker.py stop
+    python scripts/agent_worker.py bench [script] [--runs N]
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+import zlib
+from pathlib import Path
+
+# Only what the forwarding client needs is imported at module level; scripts
+# import this module on every start.
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPTS_DIR.parent
+LOG_FILE = REPO_ROOT / ".ai/cache/agent-worker.log"
+SOCKET_PATH = os.getenv("AID_WORKER_SOCKET") or os.path.join(
+    os.getenv("TMPDIR") or "/tmp",
+    f"aid-worker-{os.getuid() if hasattr(os, 'getuid') else 0}-{zlib.crc32(str(REPO_ROOT).encode()):08x}.sock"
+)
+# Set in every forked run, so scripts it starts do not forward back to the worker
+CHILD_ENV = "AID_WORKER_CHILD"
+# Environment the preloaded modules read at import time; a caller with other values runs cold
+SETTING_PREFIXES = (
+    "AI_", "AID_", "MODEL", "TEMPERATURE", "OPENAI_", "GOOGLE_", "GEMINI_",
+    "FEEDBACK_MAX_ENTRIES", "KNOWLEDGE_MAX_CHARS", "ERROR_CONTEXT_", "MAX_FIX_ROUNDS", "FIX_CHECK_TIMEOUT",
+)
+# Switches that only affect forwarding itself, and per-run inputs read at call time
+RUN_ONLY_SETTINGS = {"AID_WORKER", "AID_WORKER_SOCKET", CHILD_ENV, "ERROR_CONTEXT_FILE"}
+STAGE_MODULES = sorted(path.stem for path in SCRIPTS_DIR.glob("invoke_*.py"))
+MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+
+def _send(conn, message, fds=()):
+    """Send one JSON line, optionally passing file descriptors with it."""
+    data = (json.dumps(message) + "\n").encode("utf-8")
+    sent = socket.send_fds(conn, [data], list(fds)) if fds else 0
+    if sent < len(data):
+        # Not sendall(b""): the worker may already have replied and closed the connection
+        conn.sendall(data[sent:])
+
+
+def _recv_request(conn):
+    """Receive one JSON line and any file descriptors sent with it."""
+    data, fds = b"", []
+    while not data.endswith(b"\n"):
+        chunk, received, _, _ = socket.recv_fds(conn, 65536, 3)
+        fds.extend(received)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_MESSAGE_BYTES:
+            for fd in fds:
+                os.close(fd)
+            raise ValueError("Request too large")
+    return (json.loads(data) if data.strip() else None), fds
+
+
+def _settings(environ):
+    """The part of an environment the preloaded modules depend on."""
+    return {key: value for key, value in environ.items()
+            if key.startswith(SETTING_PREFIXES) and key not in RUN_ONLY_SETTINGS}
+
+
+def _code_stamp():
+    """mtimes of the scripts and .env, to notice when the loaded code is stale."""
+    stamp = []
+    for path in sorted(SCRIPTS_DIR.glob("*.py")) + [REPO_ROOT / ".env"]:
+        try:
+            stamp.append((path.name, path.stat().st_mtime_ns))
+        except OSError:
+            stamp.append((path.name, None))
+    return stamp
+
+
+def request(message, socket_path=SOCKET_PATH):
+    """Send a command (status, stop) to the worker. Returns its reply, or None if none is running."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(10)
+            conn.connect(socket_path)
+            _send(conn, message)
+            line = conn.makefile("rb").readline()
+    except (OSError, AttributeError):
+        return None
+    return json.loads(line) if line.strip() else None
+
+
+def forward_to_worker(script):
+    """
+    Run the calling script in the warm worker and exit with its exit code.
+
+    Returns (so the script continues with a normal cold start) when forwarding
+    is disabled, no worker is listening, or the worker declines the run.
+    Once the worker has started the run, it is never started a second time
+    locally: a lost connection exits with an error instead.
+
+    Args:
+        script: The calling script's __file__
+    """
+    if (os.environ.get(CHILD_ENV) or os.getenv("AID_WORKER", "1") == "0"
+            or not hasattr(socket, "AF_UNIX") or not os.path.exists(SOCKET_PATH)):
+        return
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(SOCKET_PATH)
+        _send(conn, {
+            "script": Path(script).stem,
+            "argv": list(sys.argv),
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        }, fds=(0, 1, 2))
+        reader = conn.makefile("rb")
+        reply = json.loads(reader.readline() or "null")
+    except (OSError, ValueError):
+        conn.close()
+        return
+    if not reply or "started" not in reply:
+        if reply and reply.get("declined"):
+            print(f"ℹ️  Agent worker declined ({reply['declined']}), starting cold", file=sys.stderr)
+        conn.close()
+        return
+
+    try:
+        line = reader.readline()  # Blocks until the run exits; closing the connection stops it
+    except KeyboardInterrupt:
+        conn.close()
+        sys.exit(130)
+    finally:
+        conn.close()
+    try:
+        sys.exit(json.loads(line)["exit"])
+    except (ValueError, KeyError, TypeError):
+        print("❌ Lost connection to the agent worker during the run", file=sys.stderr)
+        sys.exit(1)
+
+
+def run_script(module_name, argv):
+    """
+    Run a preloaded script's main() with the given argv.
+
+    Returns:
+        int: The script's exit code
+    """
+    import importlib
+    import tracing
+
+    module = importlib.import_module(module_name)
+    tracing.reset(module_name)
+    sys.argv = list(argv)
+    try:
+        module.main()
+        return 0
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code, file=sys.stderr)
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+
+
+class Worker:
+    """Preloads the agent scripts and forks one process per forwarded run."""
+
+    def __init__(self, socket_path=SOCKET_PATH):
+        self.socket_path = socket_path
+        self.started = time.time()
+        self.preload_seconds = 0.0
+        self.preloaded = []
+        self.served = 0
+        self.runs = {}  # pid -> client connection
+        self.dotenv = {}
+        self.settings = {}
+        self.code_stamp = None
+        self.stopping = False
+        self.restart_pending = False
+        self.server = None
+
+    def preload(self):
+        """Import every stage and warm its context files, the knowledge index and the client."""
+        import importlib
+        from prefetch import prefetch_stage
+
+        started = time.monotonic()
+        base_env = dict(os.environ)
+        for sdk in ("pydantic", "openai", "google.genai"):
+            try:
+                importlib.import_module(sdk)
+            except ImportError:
+                pass
+        for name in STAGE_MODULES:
+            try:
+                prefetch_stage(name)  # Also reads the module's agent instructions into memory
+                self.preloaded.append(name)
+            except Exception as e:
+                print(f"⚠️  Could not preload {name}: {e}", file=sys.stderr)
+        # Values load_dotenv() added; runs get them unless the caller sets its own
+        self.dotenv = {key: value for key, value in os.environ.items() if key not in base_env}
+        self.settings = _settings(os.environ)
+        self.code_stamp = _code_stamp()
+        self.preload_seconds = time.monotonic() - started
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "socket": self.socket_path,
+            "uptime_s": round(time.time() - self.started),
+            "preload_s": round(self.preload_seconds, 2),
+            "preloaded": self.preloaded,
+            "served": self.served,
+            "running": len(self.runs),
+        }
+
+    def _decline_reason(self, request, fds):
+        if self.stopping:
+            return "worker is stopping"
+        if self.restart_pending or _code_stamp() != self.code_stamp:
+            self.restart_pending = True
+            return "scripts changed, worker is restarting"
+        if request.get("script") not in STAGE_MODULES:
+            return f"unknown script {request.get('script')}"
+        if _settings({**self.dotenv, **request.get("env", {})}) != self.settings:
+            return "AI/AID/MODEL or stage settings differ from the worker's"
+        if len(fds) != 3:
+            return "standard streams were not passed"
+        return None
+
+    def _handle(self, conn, selector):
+        import selectors
+
+        try:
+            conn.settimeout(10)
+            message, fds = _recv_request(conn)
+        except (OSError, ValueError):
+            conn.close()
+            return
+        try:
+            command = (message or {}).get("command")
+            if command == "status":
+                _send(conn, self.status())
+                conn.close()
+                return
+            if command == "stop":
+                self.stopping = True
+                _send(conn, {"stopping": True, "running": len(self.runs)})
+                conn.close()
+                return
+
+            reason = self._decline_reason(message or {}, fds)
+            if reason:
+                _send(conn, {"declined": reason})
+                conn.close()
+                return
+
+            pid = os.fork()
+            if pid == 0:
+                self._run_child(conn, message, fds)  # Never returns
+            self.runs[pid] = conn
+            self.served += 1
+            _send(conn, {"started": pid})
+            conn.settimeout(None)
+            selector.register(conn, selectors.EVENT_READ, pid)
+        except OSError:
+            conn.close()
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _run_child(self, conn, message, fds):
+        """Forked run: take over the client's streams and environment, run the script, exit."""
+        import signal
+        import traceback
+
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            for other in [self.server, conn, *self.runs.values()]:
+                other.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+            sys.stdout = open(1, 'w', encoding='utf-8', buffering=1, closefd=False)
+            sys.stderr = open(2, 'w', encoding='utf-8', buffering=1, closefd=False)
+            os.environ.clear()
+            os.environ.update({**self.dotenv, **message.get("env", {}), CHILD_ENV: "1"})
+            os.chdir(message.get("cwd") or REPO_ROOT)
+            code = run_script(message["script"], message.get("argv") or [message["script"]])
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                if "tracing" in sys.modules:
+                    sys.modules["tracing"].flush()  # os._exit() skips atexit
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def _reap(self, selector):
+        """Collect finished runs and send their exit codes."""
+        while self.runs:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = self.runs.pop(pid, None)
+            if conn is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            try:
+                selector.unregister(conn)
+            except (KeyError, ValueError):
+                pass
+            try:
+                _send(conn, {"exit": code if code >= 0 else 128 - code})
+            except OSError:
+                pass  # The client is gone
+            conn.close()
+
+    def serve(self):
+        """Preload, then accept runs until stopped. Restarts itself if the scripts change."""
+        import selectors
+        import signal
+
+        self.preload()
+        Path(self.socket_path).unlink(missing_ok=True)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.server.listen(16)
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stopping", True))
+
+        # SIGCHLD writes to a pipe, so a finished run wakes the loop and its exit code goes out at once
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        signal.set_wakeup_fd(wakeup_write)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ)
+        selector.register(wakeup_read, selectors.EVENT_READ)
+        print(f"✅ Agent worker {os.getpid()} listening on {self.socket_path} "
+              f"({len(self.preloaded)} scripts preloaded in {self.preload_seconds:.2f}s)", flush=True)
+        try:
+            while not ((self.stopping or self.restart_pending) and not self.runs):
+                for key, _ in selector.select(timeout=1.0):
+                    if key.fileobj == wakeup_read:
+                        while True:
+                            try:
+                                if not os.read(wakeup_read, 512):
+                                    break
+                            except BlockingIOError:
+                                break
+                        continue
+                    if key.fileobj is self.server:
+                        conn, _ = self.server.accept()
+                        self._handle(conn, selector)
+                        continue
+                    # Clients send nothing after the request, so this is a disconnect: stop the run
+                    try:
+                        data = key.fileobj.recv(1)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        try:
+                            os.kill(key.data, signal.SIGINT)
+                        except ProcessLookupError:
+                            pass
+                self._reap(selector)
+        finally:
+            signal.set_wakeup_fd(-1)
+            selector.close()
+            self.server.close()
+            os.close(wakeup_read)
+            os.close(wakeup_write)
+            Path(self.socket_path).unlink(missing_ok=True)
+
+        if self.restart_pending and not self.stopping:
+            print("🔄 Scripts changed, restarting agent worker", flush=True)
+            os.execv(sys.executable, [sys.executable, str(Path(__file__).resolve()), "start", "--foreground"])
+        print(f"👋 Agent worker {os.getpid()} stopped after {self.served} runs", flush=True)
+
+
+def start(foreground=False):
+    """Start the worker (in the background unless foreground). Returns an exit code."""
+    import subprocess
+
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        print("❌ The agent worker needs fork() and Unix sockets")
+        return 1
+    status = request({"command": "status"})
+    if status:
+        print(f"✅ Agent worker {status['pid']} already running on {status['socket']}")
+        return 0
+    if foreground:
+        Worker().serve()
+        return 0
+
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_FILE, 'a', encoding='utf-8') as log:
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "start", "--foreground"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            cwd=REPO_ROOT, start_new_session=True
+        )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        status = request({"command": "status"})
+        if status:
+            print(f"✅ Agent worker {status['pid']} running on {status['socket']} "
+                  f"({len(status['preloaded'])} scripts preloaded in {status['preload_s']:.2f}s)")
+            return 0
+        if process.poll() is not None:
+            print(f"❌ Agent worker exited during startup (exit {process.returncode}); see {LOG_FILE}")
+            return 1
+        time.sleep(0.1)
+    print(f"❌ Agent worker did not start listening within 120s; see {LOG_FILE}")
+    return 1
+
+
+def bench(script="invoke_product_agent", runs=5):
+    """
+    Compare cold and warm startup of a stage script.
+
+    The script runs without arguments, so it loads everything and exits at its
+    usage message: the time measured is startup alone.
+
+    Returns:
+        dict: cold_ms, warm_ms (medians) and reduction, or None if no worker is running
+    """
+    import statistics
+    import subprocess
+
+    if not request({"command": "status"}):
+        return None
+    path = SCRIPTS_DIR / f"{script}.py"
+    env = {key: value for key, value in os.environ.items() if key != CHILD_ENV}
+
+    def measure(forward):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, str(path)], env={**env, "AID_WORKER": "1" if forward else "0"},
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            )
+            samples.append(time.perf_counter() - started)
+            if forward and "Agent worker declined" in result.stderr:
+                raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        return statistics.median(samples) * 1000
+
+    cold_ms = measure(False)
+    warm_ms = measure(True)
+    return {"cold_ms": cold_ms, "warm_ms": warm_ms, "reduction": 1 - warm_ms / cold_ms if cold_ms else 0.0}
+
+
+def main():
+    """Command line entry point."""
+    args = sys.argv[1:]
+    command = args[0] if args else ""
+
+    if command == "start":
+        sys.exit(start(foreground="--foreground" in args))
+    if command == "status":
+        status = request({"command": "status"})
+        if not status:
+            print(f"Agent worker not running ({SOCKET_PATH})")
+            sys.exit(1)
+        print(json.dumps(status, indent=2))
+        return
+    if command == "stop":
+        reply = request({"command": "stop"})
+        if not reply:
+            print("Agent worker not running")
+            return
+        print(f"✅ Agent worker stopping ({reply['running']} runs still finishing)")
+        return
+    if command == "bench":
+        script = next((arg for arg in args[1:] if not arg.startswith("--") and not arg.isdigit()), "invoke_product_agent")
+        runs = int(args[args.index("--runs") + 1]) if "--runs" in args and args.index("--runs") + 1 < len(args) else 5
+        script = Path(script).stem
+        if script not in STAGE_MODULES:
+            print(f"❌ Unknown script: {script} (expected one of {', '.join(STAGE_MODULES)})")
+            sys.exit(1)
+        try:
+            result = bench(script, runs)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        if result is None:
+            print("❌ No agent worker running (python scripts/agent_worker.py start)")
+            sys.exit(1)
+        print(f"⏱️  {script} startup, median of {runs}: cold {result['cold_ms']:.0f} ms, "
+              f"warm {result['warm_ms']:.0f} ms ({result['reduction']:.0%} less)")
+        return
+
+    print("Usage: python agent_worker.py start [--foreground] | status | stop | bench [script] [--runs N]")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+BM25 Utility
+Small, dependency-free BM25 ranking for local retrieval over repository markdown.
+Used by the feedback inbox indexer and the knowledge base index.
+"""
+
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "its", "of", "on", "or", "should", "that", "the", "this",
+    "to", "was", "we", "will", "with", "you", "your",
+}
+
+
+def tokenize(text):
+    """Lowercase text and split it into index terms, dropping stopwords."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 index.
+
+    Documents can be added and removed one at a time, so callers only pay for
+    what changed. The index round-trips through to_dict()/from_dict() for
+    on-disk persistence as JSON.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.doc_freq = Counter()
+        self.total_length = 0
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, text):
+        """Add (or replace) a document."""
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        self.docs[doc_id] = terms
+        self.doc_freq.update(terms.keys())
+        self.total_length += sum(terms.values())
+
+    def remove(self, doc_id):
+        """Remove a document if present."""
+        terms = self.docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self.doc_freq.subtract(terms.keys())
+        self.doc_freq += Counter()  # drop zero counts
+        self.total_length -= sum(terms.values())
+
+    def score(self, query, doc_ids=None):
+        """
+        Score documents against a query.
+
+        Args:
+            query: Free-text query
+            doc_ids: Optional iterable restricting which documents are scored
+
+        Returns:
+            list: (doc_id, score) tuples, best first
+        """
+        query_terms = tokenize(query)
+        if not query_terms or not self.docs:
+            return []
+
+        n_docs = len(self.docs)
+        avg_length = self.total_length / n_docs or 1
+        candidates = self.docs.keys() if doc_ids is None else [d for d in doc_ids if d in self.docs]
+
+        results = []
+        for doc_id in candidates:
+            terms = self.docs[doc_id]
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                df = self.doc_freq[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+            results.append((doc_id, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def to_dict(self):
+        """Serialize the index to a JSON-compatible dict."""
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "docs": {doc_id: dict(terms) for doc_id, terms in self.docs.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild an index from to_dict() output."""
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for doc_id, terms in data.get("docs", {}).items():
+            terms = Counter(terms)
+            index.docs[doc_id] = terms
+            index.doc_freq.update(terms.keys())
+            index.total_length += sum(terms.values())
+        return index
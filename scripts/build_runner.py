@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Build Runner
+Runs the install/build/test commands the Dev Agent saved to
+.ai/pipeline/<feature-id>.build.json.
+
+- Dependency installs are cached, keyed by a hash of the lockfiles, and only
+  skipped while the installed packages are actually present
+- Test files under the command's test paths are split into shards and run in
+  parallel across cores
+- Every command reports its wall time as it finishes
+- Failures are written as error context for the Dev Agent and can be fed
+  straight to the Error Recovery Agent for a bounded number of rounds
+
+Usage:
+    python scripts/build_runner.py <feature_id> [--shards N|auto] [--recover ROUNDS]
+"""
+
+import configparser
+import hashlib
+import importlib.metadata
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+PIPELINE_DIR = REPO_ROOT / ".ai/pipeline"
+CACHE_DIR = REPO_ROOT / ".ai/cache/build"
+
+LOCKFILES = [
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "package.json",
+    "requirements.txt", "requirements-dev.txt", "poetry.lock", "Pipfile.lock", "pyproject.toml",
+]
+INSTALL_ARTIFACTS = {"package.json": "node_modules"}
+SKIP_DIRS = {"node_modules", ".git", ".venv", "venv", "dist", "build", "__pycache__", ".ai"}
+LOG_TAIL_LINES = 200
+SHELL_OPERATORS = re.compile(r"[;&|<>`$()]")
+PIP_COMMAND = re.compile(r"\bpip3?\s+install\b")
+REQUIREMENT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def _has_command(value):
+    """Return True if a build.json entry holds a real command."""
+    return bool(value) and value != "null"
+
+
+def run_command(label, command, cwd, capture=False):
+    """
+    Run a shell command and report its duration.
+
+    Args:
+        label: Short name shown in status output
+        command: Shell command string
+        cwd: Working directory
+        capture: Capture output instead of streaming it (used for parallel shards)
+
+    Returns:
+        dict: label, command, returncode, seconds and the tail of the output
+    """
+    start = time.perf_counter()
+    if not capture:
+        print(f"▶️  {label}: {command}", flush=True)
+    process = subprocess.Popen(
+        command, shell=True, cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, encoding='utf-8', errors='replace'
+    )
+    lines = []
+    for line in process.stdout:
+        lines.append(line)
+        if len(lines) > LOG_TAIL_LINES:
+            lines.pop(0)
+        if not capture:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+    returncode = process.wait()
+    seconds = time.perf_counter() - start
+    status = "✓" if returncode == 0 else "✗"
+    print(f"  {status} {label} finished in {seconds:.1f}s (exit {returncode})", flush=True)
+    return {"label": label, "command": command, "returncode": returncode,
+            "seconds": seconds, "output": "".join(lines)}
+
+
+def install_cache_key(install_cmd, working_dir):
+    """Hash the install command together with every lockfile present."""
+    digest = hashlib.sha256(install_cmd.encode('utf-8'))
+    for name in LOCKFILES:
+        path = working_dir / name
+        if path.exists():
+            digest.update(name.encode('utf-8'))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def install_is_cached(feature_id, key, install_cmd, working_dir):
+    """Return True if the last successful install used the same lockfiles and is still in place."""
+    stamp_file = CACHE_DIR / f"{feature_id}.install.json"
+    try:
+        with open(stamp_file, 'r', encoding='utf-8') as f:
+            stamp = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    if stamp.get("key") != key:
+        return False
+    # The stamp alone is not enough if the installed tree was wiped (e.g. a fresh CI runner)
+    for lockfile, artifact in INSTALL_ARTIFACTS.items():
+        if (working_dir / lockfile).exists() and not (working_dir / artifact).exists():
+            return False
+    if PIP_COMMAND.search(install_cmd):
+        return _pip_requirements_installed(install_cmd, working_dir)
+    return True
+
+
+def _pip_requirements_installed(install_cmd, working_dir):
+    """
+    Return True if everything a pip install command names is installed in this interpreter.
+
+    Requirement files (-r) and bare package names are checked by distribution
+    name. Anything that cannot be checked (local paths, editable installs,
+    URLs) counts as not installed, so the install runs.
+    """
+    try:
+        args = shlex.split(install_cmd)
+    except ValueError:
+        return False
+    if "install" not in args:
+        return False
+
+    requirements, args = [], iter(args[args.index("install") + 1:])
+    for arg in args:
+        if arg in ("-r", "--requirement"):
+            path = working_dir / next(args, "")
+            try:
+                requirements.extend(path.read_text(encoding='utf-8').splitlines())
+            except OSError:
+                return False
+        elif arg in ("-e", "--editable"):
+            return False
+        elif arg in ("-c", "--constraint", "-i", "--index-url", "--extra-index-url", "-f", "--find-links"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            requirements.append(arg)
+
+    for line in requirements:
+        line = line.split(" #")[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-"):
+            return False  # Nested -r/-e lines in a requirements file
+        name = REQUIREMENT_NAME.match(line)
+        if not name or "/" in line.split(";")[0] or line.startswith("."):
+            return False
+        try:
+            importlib.metadata.distribution(name.group(0))
+        except importlib.metadata.PackageNotFoundError:
+            return False
+    return True
+
+
+def save_install_stamp(feature_id, key):
+    """Record a successful install for the cache."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(CACHE_DIR / f"{feature_id}.install.json", 'w', encoding='utf-8') as f:
+        json.dump({"key": key, "installed_at": datetime.now().isoformat(timespec='seconds')}, f)
+
+
+def _pytest_testpaths(working_dir):
+    """Return the testpaths configured for pytest in working_dir, if any."""
+    for name, section in (("pytest.ini", "pytest"), ("tox.ini", "pytest"), ("setup.cfg", "tool:pytest")):
+        parser = configparser.ConfigParser()
+        try:
+            parser.read(working_dir / name, encoding='utf-8')
+        except configparser.Error:
+            continue
+        if parser.has_option(section, "testpaths"):
+            return parser.get(section, "testpaths").split()
+    try:
+        import tomllib
+        with open(working_dir / "pyproject.toml", 'rb') as f:
+            options = tomllib.load(f).get("tool", {}).get("pytest", {}).get("ini_options", {})
+    except (ImportError, OSError, ValueError):
+        return []
+    testpaths = options.get("testpaths", [])
+    return testpaths.split() if isinstance(testpaths, str) else list(testpaths)
+
+
+def discover_test_files(test_cmd, working_dir):
+    """
+    Find test files for runners that accept file arguments.
+
+    Test paths given in the command (e.g. "pytest tests/") are taken out of it
+    and only searched for files, so a shard does not also run the whole
+    directory. Without paths in the command, pytest's configured testpaths
+    are used, then the whole working directory.
+
+    Returns:
+        tuple: (list of relative test file paths, command without its test
+        paths, argument separator) or ([], test_cmd, "") if the command
+        cannot be sharded.
+    """
+    if SHELL_OPERATORS.search(test_cmd):
+        return [], test_cmd, ""
+    try:
+        args = shlex.split(test_cmd)
+    except ValueError:
+        return [], test_cmd, ""
+
+    if "pytest" in test_cmd:
+        patterns, separator = ("test_*.py", "*_test.py"), " "
+    elif any(runner in test_cmd for runner in ("jest", "vitest", "npm test", "npm run test", "yarn test", "pnpm test")):
+        patterns = ("*.test.js", "*.test.jsx", "*.test.ts", "*.test.tsx",
+                    "*.spec.js", "*.spec.jsx", "*.spec.ts", "*.spec.tsx")
+        # Package-manager scripts need "--" to forward file arguments
+        separator = " -- " if args[0] in ("npm", "yarn", "pnpm") else " "
+    else:
+        return [], test_cmd, ""
+
+    # Existing paths after the runner are test paths, not options
+    paths = [arg for arg in args[1:] if not arg.startswith("-") and (working_dir / arg).exists()]
+    base_cmd = shlex.join([arg for arg in args if arg not in paths]) if paths else test_cmd
+    if not paths and "pytest" in test_cmd:
+        paths = [path for path in _pytest_testpaths(working_dir) if (working_dir / path).exists()]
+    roots = [working_dir / path for path in paths] or [working_dir]
+
+    files = set()
+    for root in roots:
+        candidates = [root] if root.is_file() else [p for pattern in patterns for p in root.rglob(pattern)]
+        for path in candidates:
+            relative = path.resolve().relative_to(working_dir)
+            if not SKIP_DIRS.intersection(relative.parts):
+                files.add(relative.as_posix())
+    return sorted(files), base_cmd, separator
+
+
+def shard_files(files, shards):
+    """Split files into round-robin shards, dropping empty ones."""
+    buckets = [files[i::shards] for i in range(shards)]
+    return [bucket for bucket in buckets if bucket]
+
+
+def run_tests(test_cmd, working_dir, shards):
+    """
+    Run the test command, in parallel shards when the runner supports it.
+
+    Returns:
+        list: Result dicts from run_command, one per shard
+    """
+    files, base_cmd, separator = discover_test_files(test_cmd, working_dir)
+    if shards <= 1 or len(files) <= 1:
+        return [run_command("Tests", test_cmd, working_dir)]
+
+    buckets = shard_files(files, shards)
+    print(f"🧪 Running {len(files)} test files in {len(buckets)} parallel shards", flush=True)
+
+    def run_shard(item):
+        i, bucket = item
+        command = f"{base_cmd}{separator}{shlex.join(bucket)}"
+        return run_command(f"Tests shard {i}/{len(buckets)}", command, working_dir, capture=True)
+
+    with ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+        results = list(executor.map(run_shard, enumerate(buckets, 1)))
+
+    for result in results:
+        if result["returncode"] != 0:
+            print(f"\n--- {result['label']} output ---")
+            print(result["output"])
+    return results
+
+
+def run_build(feature_id, build_commands, shards):
+    """
+    Run install, build and test for a feature.
+
+    Returns:
+        tuple: (failed result dict or None, list of all results)
+    """
+    working_dir = (REPO_ROOT / (build_commands.get("working_dir") or ".")).resolve()
+    if not working_dir.is_dir():
+        failure = {"label": "Setup", "command": "", "returncode": 1, "seconds": 0.0,
+                   "output": f"Working directory not found: {working_dir}"}
+        return failure, [failure]
+
+    results = []
+
+    install_cmd = build_commands.get("install", "")
+    if _has_command(install_cmd):
+        key = install_cache_key(install_cmd, working_dir)
+        if install_is_cached(feature_id, key, install_cmd, working_dir):
+            print(f"📦 Dependencies unchanged, skipping install (cache {key[:12]})")
+        else:
+            result = run_command("Install", install_cmd, working_dir)
+            results.append(result)
+            if result["returncode"] != 0:
+                return result, results
+            save_install_stamp(feature_id, key)
+
+    build_cmd = build_commands.get("build", "")
+    if _has_command(build_cmd):
+        result = run_command("Build", build_cmd, working_dir)
+        results.append(result)
+        if result["returncode"] != 0:
+            return result, results
+
+    test_cmd = build_commands.get("test", "")
+    if _has_command(test_cmd):
+        test_results = run_tests(test_cmd, working_dir, shards)
+        results.extend(test_results)
+        for result in test_results:
+            if result["returncode"] != 0:
+                return result, results
+
+    return None, results
+
+
+def write_failure_context(feature_id, failure):
+    """
+    Write error context for the Dev Agent and an issue body for the Error Recovery Agent.
+
+    Returns:
+        tuple: (error_id, path to the issue body file)
+    """
+    error_id = f"error-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    error_type = f"{failure['label'].split()[0].lower()}_failure"
+
+    context = {
+        "error_id": error_id,
+        "error_type": error_type,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "message": f"{failure['label']} failed: {failure['command']}",
+        "log_tail": failure["output"],
+    }
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(PIPELINE_DIR / f"{feature_id}.error-context.json", 'w', encoding='utf-8') as f:
+        json.dump(context, f, indent=2)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    issue_file = CACHE_DIR / f"{feature_id}.{error_id}.issue.md"
+    with open(issue_file, 'w', encoding='utf-8') as f:
+        f.write(f"""## Build Failure
+
+**Feature ID:** `{feature_id}`
+**Error ID:** `{error_id}`
+**Failed Step:** {failure['label']}
+**Command:** `{failure['command']}`
+
+## Error Log
+
+```
+{failure['output']}
+```
+""")
+    return error_id, issue_file
+
+
+def _recovery_applied_fix(error_id):
+    """Return True if the Error Recovery Agent wrote a validated fix for error_id."""
+    analysis_file = REPO_ROOT / ".ai/error-fixes" / f"{error_id}-analysis.json"
+    try:
+        with open(analysis_file, 'r', encoding='utf-8') as f:
+            return bool(json.load(f).get("fixes_applied"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+
+
+def _set_output(name, value):
+    """Write a step output when running under GitHub Actions."""
+    output_file = os.getenv("GITHUB_OUTPUT")
+    if output_file:
+        with open(output_file, 'a', encoding='utf-8') as f:
+            f.write(f"{name}={value}\n")
+
+
+def main():
+    """Main execution function."""
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Usage: python build_runner.py <feature_id> [--shards N|auto] [--recover ROUNDS]")
+        sys.exit(1)
+
+    feature_id = args[0]
+    shards = 1
+    recover_rounds = 0
+    if "--shards" in args:
+        value = args[args.index("--shards") + 1]
+        shards = (os.cpu_count() or 1) if value == "auto" else int(value)
+    if "--recover" in args:
+        recover_rounds = int(args[args.index("--recover") + 1])
+
+    build_file = PIPELINE_DIR / f"{feature_id}.build.json"
+    if not build_file.exists():
+        print("⚠️  No build commands found, skipping validation")
+        _set_output("validation_passed", "skipped")
+        sys.exit(0)
+
+    print(f"🔨 Building and validating: {feature_id}")
+    print(f"🧵 Test shards: {shards}")
+
+    for attempt in range(recover_rounds + 1):
+        # Re-read each round: a recovery fix may have changed the commands
+        with open(build_file, 'r', encoding='utf-8') as f:
+            build_commands = json.load(f)
+
+        start = time.perf_counter()
+        failure, results = run_build(feature_id, build_commands, shards)
+        total = time.perf_counter() - start
+
+        print(f"\n⏱️  Timing ({total:.1f}s total):")
+        for result in results:
+            print(f"  {result['seconds']:7.1f}s  {result['label']}")
+
+        if failure is None:
+            print("\n✅ Build and tests passed!")
+            _set_output("validation_passed", "true")
+            sys.exit(0)
+
+        print(f"\n❌ {failure['label']} failed")
+        error_id, issue_file = write_failure_context(feature_id, failure)
+        print(f"📝 Error context saved: {error_id}")
+
+        if attempt >= recover_rounds:
+            break
+
+        print(f"\n🔧 Recovery round {attempt + 1}/{recover_rounds}: invoking Error Recovery Agent...")
+        recovery = subprocess.run(
+            [sys.executable, str(REPO_ROOT / "scripts/invoke_error_recovery_agent.py"), error_id, str(issue_file)],
+            cwd=REPO_ROOT
+        )
+        if recovery.returncode != 0:
+            print("❌ Error Recovery Agent failed, stopping")
+            break
+        if not _recovery_applied_fix(error_id):
+            print("⚠️  Error Recovery Agent proposed no fix that passes local validation, stopping")
+            break
+
+    _set_output("validation_passed", "false")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
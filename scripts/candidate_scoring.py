@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Candidate Scoring Utility
+Best-of-N generation for the Architect and Design agents. With AID_BEST_OF_N
+set above 1, a request goes out N times concurrently. Each candidate is
+scored locally with cheap checks, and the best one is kept. A poor sample is
+then replaced without a human rejecting it and the stage running again.
+
+Checks (each scored 0..1, then weighted):
+    schema     Required fields are present, non-empty and of the right type
+    headings   Markdown documents contain their required section headings
+    json       Embedded wireframe JSON parses to a node tree (wireframe.py)
+    length     Documents fall in their expected word range
+
+Ties go to the earliest candidate. With N=1 (the default), the request is made
+once and not scored.
+
+Usage:
+    from candidate_scoring import ARCHITECT_RULES, best_of
+    result = best_of(lambda: route(system_prompt, user_prompt, ...), ARCHITECT_RULES, label="architect")
+
+    python scripts/candidate_scoring.py <architect|design|design_intent|design_spec|wireframe> <result.json>
+"""
+
+import contextvars
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+from usage_ledger import set_usage_context
+from wireframe import WireframeError, parse_wireframe
+
+WEIGHTS = {"schema": 0.4, "headings": 0.3, "json": 0.2, "length": 0.1}
+
+# Field names may list alternatives as "a|b": the first one present is checked.
+# Headings are alternatives too; a required heading matches any markdown
+# heading containing one of them (case-insensitive).
+ARCHITECT_RULES = {
+    "required": {"adr_content": str, "technical_spec": str, "complexity": str, "primary_concerns": list, "summary": str},
+    "choices": {"complexity": ("simple", "moderate", "complex")},
+    "headings": {
+        "adr_content": [("status",), ("context",), ("option", "alternative"), ("decision",), ("consequence",)],
+        "technical_spec": [("overview", "architecture"), ("component",), ("data model", "data"),
+                           ("testing", "test strategy"), ("deploy",)],
+    },
+    "lengths": {"adr_content": (300, 2500), "technical_spec": (400, 4000)},
+}
+
+DESIGN_RULES = {
+    "required": {"design_intent": str, "design_spec": str, "validation_notes|validation_checklist": str, "summary": str},
+    "headings": {"design_spec": [("flow",), ("state",), ("copy", "content", "text"), ("error", "edge")]},
+    "json": ["wireframe_json_string|wireframe_json"],
+    "lengths": {"design_intent": (250, 700), "design_spec": (450, 1200)},
+}
+
+# Steps of the iterative Design Agent
+DESIGN_INTENT_RULES = {
+    "required": {"design_intent": str},
+    "lengths": {"design_intent": (250, 600)},
+}
+
+DESIGN_SPEC_RULES = {
+    "required": {"design_spec": str},
+    "headings": {"design_spec": [("flow",), ("state",), ("copy", "content", "text"), ("error", "edge")]},
+    "lengths": {"design_spec": (450, 1000)},
+}
+
+WIREFRAME_RULES = {
+    "json": ["wireframe"],
+}
+
+RULES = {
+    "architect": ARCHITECT_RULES,
+    "design": DESIGN_RULES,
+    "design_intent": DESIGN_INTENT_RULES,
+    "design_spec": DESIGN_SPEC_RULES,
+    "wireframe": WIREFRAME_RULES,
+}
+
+_HEADING_PATTERN = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+
+def best_of_n():
+    """Return the configured number of candidates (AID_BEST_OF_N, at least 1)."""
+    try:
+        return max(1, int(os.getenv("AID_BEST_OF_N", "1")))
+    except ValueError:
+        return 1
+
+
+def _field(candidate, spec):
+    """Return (name, value) of the first alternative in spec present in candidate."""
+    for name in spec.split("|"):
+        if name in candidate:
+            return name, candidate[name]
+    return spec.split("|")[0], None
+
+
+def _parse_wireframe_value(value):
+    """Parse a wireframe given as a JSON string or an object. Returns the Wireframe or None."""
+    try:
+        return parse_wireframe(value)
+    except WireframeError:
+        return None
+
+
+def _length_score(words, low, high):
+    if words < low:
+        return words / low
+    if words > high:
+        return max(0.0, 1 - (words - high) / high)
+    return 1.0
+
+
+def score_candidate(candidate, rules):
+    """
+    Score a candidate result against a rule set.
+
+    Args:
+        candidate: The parsed model result
+        rules: A rule dict (required, choices, headings, json, lengths)
+
+    Returns:
+        dict: score (0..1), per-check scores and a list of failures
+    """
+    if not isinstance(candidate, dict):
+        return {"score": 0.0, "checks": {}, "failures": [f"result is {type(candidate).__name__}, not an object"]}
+
+    checks, failures = {}, []
+
+    if rules.get("required") or rules.get("choices"):
+        passed, total = 0, 0
+        for spec, expected in rules.get("required", {}).items():
+            total += 1
+            name, value = _field(candidate, spec)
+            if isinstance(value, expected) and value:
+                passed += 1
+            else:
+                failures.append(f"missing or empty {name}")
+        for spec, choices in rules.get("choices", {}).items():
+            total += 1
+            name, value = _field(candidate, spec)
+            if str(value).strip().lower() in choices:
+                passed += 1
+            else:
+                failures.append(f"{name} not one of {'/'.join(choices)}")
+        checks["schema"] = passed / total
+
+    if rules.get("headings"):
+        passed, total = 0, 0
+        for spec, required in rules["headings"].items():
+            name, value = _field(candidate, spec)
+            headings = [h.lower() for h in _HEADING_PATTERN.findall(value if isinstance(value, str) else "")]
+            for alternatives in required:
+                total += 1
+                if any(alt in heading for heading in headings for alt in alternatives):
+                    passed += 1
+                else:
+                    failures.append(f"{name} has no '{alternatives[0]}' heading")
+        checks["headings"] = passed / total if total else 1.0
+
+    if rules.get("json"):
+        passed = 0
+        for spec in rules["json"]:
+            name, value = _field(candidate, spec)
+            if value is not None and _parse_wireframe_value(value) is not None:
+                passed += 1
+            else:
+                failures.append(f"{name} does not parse to a wireframe node tree")
+        checks["json"] = passed / len(rules["json"])
+
+    if rules.get("lengths"):
+        scores = []
+        for spec, (low, high) in rules["lengths"].items():
+            name, value = _field(candidate, spec)
+            words = len(value.split()) if isinstance(value, str) else 0
+            scores.append(_length_score(words, low, high))
+            if not low <= words <= high:
+                failures.append(f"{name} is {words} words (expected {low}-{high})")
+        checks["length"] = sum(scores) / len(scores)
+
+    weight = sum(WEIGHTS[name] for name in checks)
+    score = sum(WEIGHTS[name] * value for name, value in checks.items()) / weight if weight else 1.0
+    return {"score": round(score, 4), "checks": checks, "failures": failures}
+
+
+def best_of(generate, rules, n=None, label="candidate"):
+    """
+    Generate n candidates concurrently and return the best-scoring one.
+
+    Each candidate runs in its own copy of the current context, tagged with
+    its number in the usage ledger (candidate=1..n).
+
+    Args:
+        generate: Zero-argument callable making one model request and returning its parsed result
+        rules: Rule set for score_candidate()
+        n: Number of candidates (defaults to AID_BEST_OF_N)
+        label: Name used in log lines and the trace span
+
+    Returns:
+        The winning candidate's result
+
+    Raises:
+        Exception: The last error if every candidate failed
+    """
+    n = best_of_n() if n is None else max(1, n)
+    if n == 1:
+        return generate()
+
+    def run(number):
+        set_usage_context(candidate=number)
+        return generate()
+
+    with span("candidates.best_of", label=label, candidates=n) as s:
+        with ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"{label}-candidate") as executor:
+            futures = [executor.submit(contextvars.copy_context().run, run, number) for number in range(1, n + 1)]
+
+        scored, last_error = [], None
+        for number, future in enumerate(futures, 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                print(f"   ⚠️  {label} candidate {number} failed: {e}", file=sys.stderr)
+                continue
+            scored.append((score_candidate(result, rules), number, result))
+        if not scored:
+            raise last_error
+
+        # Highest score wins; ties go to the earliest candidate
+        best_score, best_number, best_result = max(scored, key=lambda item: (item[0]["score"], -item[1]))
+        s.set("winner", best_number)
+        s.set("score", best_score["score"])
+        others = ", ".join(f"#{number} {score['score']:.2f}" for score, number, _ in scored if number != best_number)
+        print(f"   🏁 {label}: best of {n} is candidate {best_number} ({best_score['score']:.2f}"
+              f"{'; others ' + others if others else ''})", file=sys.stderr)
+        if best_score["failures"]:
+            print(f"      Remaining issues: {'; '.join(best_score['failures'])}", file=sys.stderr)
+        return best_result
+
+
+def main():
+    """Score a saved result file against a rule set."""
+    if len(sys.argv) < 3 or sys.argv[1] not in RULES:
+        print(f"Usage: python candidate_scoring.py <{'|'.join(RULES)}> <result.json>")
+        sys.exit(1)
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        result = score_candidate(json.load(f), RULES[sys.argv[1]])
+    print(f"Score: {result['score']:.2f}")
+    for name, value in result["checks"].items():
+        print(f"  {name:<9} {value:.2f}")
+    for failure in result["failures"]:
+        print(f"  ✗ {failure}")
+
+
+if __name__ == "__main__":
+    main()
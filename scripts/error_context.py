@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Error Context Builder
+Finds the file:line references in an error log (Python tracebacks, compiler
+and linter output, TypeScript diagnostics) and loads only the relevant windows
+of those files, so the Error Recovery Agent sees the real code it is fixing.
+
+Rendered windows are cached in .ai/cache/error-context/ keyed by the file's
+git blob hash, so repeated recovery runs over an unchanged file cost nothing.
+
+Usage:
+    python scripts/error_context.py <error_log_file>
+"""
+
+import hashlib
+import os
+import re
+import sys
+from pathlib import Path
+
+from journal import content_hash
+from tracing import add_to_attribute, traced
+
+REPO_ROOT = Path(__file__).parent.parent
+CACHE_DIR = REPO_ROOT / ".ai/cache/error-context"
+CONTEXT_LINES = int(os.getenv("ERROR_CONTEXT_LINES", "20"))
+MAX_CONTEXT_CHARS = int(os.getenv("ERROR_CONTEXT_MAX_CHARS", "12000"))
+MAX_FILES = 8
+# Files this short are sent whole; the model rewrites whole files anyway
+WHOLE_FILE_LINES = 150
+
+REFERENCE_PATTERNS = [
+    # Python traceback: File "src/app.py", line 25, in main
+    re.compile(r'File "(?P<path>[^"]+)", line (?P<line>\d+)'),
+    # TypeScript / MSBuild: src/app.ts(12,5): error TS2304
+    re.compile(r'(?P<path>[\w./\\-]+\.\w+)\((?P<line>\d+),\d+\)'),
+    # gcc, eslint, ruff, mypy, pytest, tsc --pretty: src/app.py:25:3: E999 / src/app.py:25: error
+    re.compile(r'(?P<path>[\w./\\-]+\.\w+):(?P<line>\d+)(?::\d+)?'),
+]
+
+LANGUAGES = {
+    ".py": "python", ".js": "javascript", ".jsx": "jsx", ".ts": "typescript", ".tsx": "tsx",
+    ".json": "json", ".yml": "yaml", ".yaml": "yaml", ".md": "markdown", ".sh": "bash",
+}
+
+
+def blob_hash(data):
+    """Git blob hash of a bytes object (same as `git hash-object`)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def resolve_path(raw_path, root=REPO_ROOT):
+    """
+    Map a path from an error log to a file inside the repository.
+
+    CI logs often carry absolute paths from another checkout location
+    (/home/runner/work/AID/AID/src/app.py), so the longest suffix that exists
+    under root wins. Paths outside the repository (site-packages, node
+    internals) resolve to None.
+
+    Returns:
+        Path or None
+    """
+    root = Path(root).resolve()
+    parts = [part for part in raw_path.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    for i in range(len(parts)):
+        candidate = root.joinpath(*parts[i:])
+        if not candidate.is_file():
+            continue
+        candidate = candidate.resolve()
+        try:
+            rel_parts = candidate.relative_to(root).parts
+        except ValueError:
+            return None
+        if any(part in ("node_modules", "site-packages", ".venv", "venv") for part in rel_parts):
+            return None
+        return candidate
+    return None
+
+
+def find_references(error_log, root=REPO_ROOT):
+    """
+    Extract (file, line) references from an error log.
+
+    Returns:
+        dict: Path -> sorted list of line numbers, innermost frame first. Python
+        tracebacks list the failing frame last, so files are ordered by their
+        last appearance in the log.
+    """
+    hits = []
+    for pattern in REFERENCE_PATTERNS:
+        for match in pattern.finditer(error_log):
+            hits.append((match.start(), match.group("path"), int(match.group("line"))))
+
+    references = {}
+    last_seen = {}
+    for position, raw_path, line in sorted(hits):
+        path = resolve_path(raw_path, root)
+        if path is None:
+            continue
+        references.setdefault(path, set()).add(line)
+        last_seen[path] = position
+
+    ordered = sorted(references, key=lambda p: last_seen[p], reverse=True)
+    return {path: sorted(references[path]) for path in ordered}
+
+
+def merge_windows(lines, total_lines, context=CONTEXT_LINES):
+    """Merge overlapping [line - context, line + context] windows (1-based, inclusive)."""
+    windows = []
+    for line in lines:
+        start, end = max(1, line - context), min(total_lines, line + context)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def _render_window(file_lines, start, end, marked):
+    width = len(str(end))
+    rendered = []
+    for number in range(start, end + 1):
+        marker = ">>" if number in marked else "  "
+        rendered.append(f"{marker} {number:>{width}} | {file_lines[number - 1]}")
+    return "\n".join(rendered)
+
+
+def load_window(path, start, end, marked, data=None):
+    """
+    Render lines start..end of a file with line numbers, marking error lines.
+
+    Cached on disk by blob hash, window and marked lines.
+    """
+    data = data if data is not None else Path(path).read_bytes()
+    key = hashlib.sha256(
+        f"{blob_hash(data)}:{start}-{end}:{','.join(map(str, sorted(marked)))}".encode('utf-8')
+    ).hexdigest()[:24]
+    cache_file = CACHE_DIR / f"{key}.txt"
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            rendered = f.read()
+        add_to_attribute("cache_hits")
+        return rendered
+    except FileNotFoundError:
+        add_to_attribute("cache_misses")
+
+    file_lines = data.decode('utf-8', errors='replace').splitlines()
+    rendered = _render_window(file_lines, start, min(end, len(file_lines)), set(marked))
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            f.write(rendered)
+    except OSError:
+        pass  # Cache is best-effort
+    return rendered
+
+
+@traced("context.error_context", result_attributes=lambda result: {"chars": len(result[0]), "files": len(result[1])})
+def build_error_context(error_log, root=REPO_ROOT, max_chars=MAX_CONTEXT_CHARS):
+    """
+    Build the "Affected Files" prompt section for an error log.
+
+    Args:
+        error_log: Raw error output
+        root: Repository root used to resolve paths
+        max_chars: Character budget for all file excerpts
+
+    Returns:
+        tuple: (markdown section, list of repo-relative paths included)
+    """
+    root = Path(root).resolve()
+    sections = []
+    included = []
+    used = 0
+
+    for path, lines in list(find_references(error_log, root).items())[:MAX_FILES]:
+        data = path.read_bytes()
+        total_lines = data.count(b"\n") + (0 if data.endswith(b"\n") or not data else 1)
+        if total_lines <= WHOLE_FILE_LINES:
+            windows = [(1, max(total_lines, 1))]
+        else:
+            windows = merge_windows([line for line in lines if line <= total_lines], total_lines)
+        if not windows:
+            continue
+
+        rel = path.relative_to(root).as_posix()
+        label = "full file" if total_lines <= WHOLE_FILE_LINES else \
+            ", ".join(f"lines {start}-{end}" for start, end in windows)
+        body = "\n\n".join(load_window(path, start, end, lines, data) for start, end in windows)
+        base_hash = content_hash(data.decode('utf-8', errors='replace'))
+        section = f"### {rel} ({label}, {total_lines} lines total, base_hash {base_hash})\n\n```{LANGUAGES.get(path.suffix, '')}\n{body}\n```"
+        if used + len(section) > max_chars and sections:
+            break
+        sections.append(section)
+        included.append(rel)
+        used += len(section)
+
+    if not sections:
+        return "[No repository files referenced in the error log]", []
+    return "\n\n".join(sections), included
+
+
+def main():
+    """Print the context that would be sent for an error log."""
+    if len(sys.argv) < 2:
+        print("Usage: python error_context.py <error_log_file>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        context, files = build_error_context(f.read())
+    print(context)
+    print(f"\n📎 {len(files)} files, {len(context)} chars", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Error Fingerprint Index
+Recognizes recurring failures and re-applies the fix that worked last time,
+without calling the model.
+
+A fingerprint combines the normalized error message (paths, numbers, ids and
+timestamps stripped) with the innermost repository file the log points at and
+a hash of the failing source line. Fixes that passed local validation are
+stored in .ai/error-fixes/fingerprints.json as search/replace edits (only
+files the fix created are stored whole), so they still apply after unrelated
+changes elsewhere in the file and the committed index stays small.
+
+Usage:
+    python scripts/error_fingerprint.py show <error_log_file>
+    python scripts/error_fingerprint.py list
+    python scripts/error_fingerprint.py forget <fingerprint>
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from error_context import find_references
+from journal import content_hash
+from patch_apply import PatchError, apply_change
+
+REPO_ROOT = Path(__file__).parent.parent
+INDEX_FILE = REPO_ROOT / ".ai/error-fixes/fingerprints.json"
+EDIT_CONTEXT_LINES = 3
+
+ERROR_LINE_RE = re.compile(
+    r'(\b\w*(?:Error|Exception|Failure|Warning)\b:?.*|\berror\b[ :\[].*|\bFAILED\b.*|\bcommand not found\b.*)',
+    re.IGNORECASE
+)
+NORMALIZERS = [
+    (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?'), '<time>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<addr>'),
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    (re.compile(r'\b[0-9a-f]{12,}\b'), '<hash>'),
+    (re.compile(r'(?<![\w.])(?:/[\w.-]+)+/([\w.-]+)'), r'\1'),  # Absolute paths -> basename
+    (re.compile(r'\b\d+(?:\.\d+)?(?:ms|s)\b'), '<duration>'),
+    (re.compile(r'\b\d+\b'), 'N'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize_message(error_log, max_lines=5):
+    """
+    Reduce an error log to the lines that identify the failure, normalized.
+
+    The last few lines that look like error messages are kept; volatile parts
+    (timestamps, addresses, hashes, absolute paths, numbers) are replaced.
+    """
+    lines = [line.strip() for line in error_log.splitlines() if line.strip()]
+    errors = [match.group(1) for line in lines for match in [ERROR_LINE_RE.search(line)] if match]
+    selected = errors[-max_lines:] or lines[-max_lines:]
+    normalized = []
+    for line in selected:
+        for pattern, replacement in NORMALIZERS:
+            line = pattern.sub(replacement, line)
+        if line.strip() and line.strip() not in normalized:
+            normalized.append(line.strip())
+    return "\n".join(normalized)
+
+
+def fingerprint_error(error_log, root=REPO_ROOT):
+    """
+    Compute the fingerprint of an error log.
+
+    Returns:
+        tuple: (fingerprint string, details dict with message, path and line_hash)
+    """
+    root = Path(root).resolve()
+    message = normalize_message(error_log)
+    path, line_hash = "", ""
+    references = find_references(error_log, root)
+    if references:
+        # Innermost frame first; hash the failing line's text, not its number
+        file_path, lines = next(iter(references.items()))
+        path = file_path.relative_to(root).as_posix()
+        file_lines = file_path.read_text(encoding='utf-8', errors='replace').splitlines()
+        text = file_lines[lines[-1] - 1].strip() if 0 < lines[-1] <= len(file_lines) else ""
+        line_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+    digest = hashlib.sha256(f"{message}|{path}|{line_hash}".encode('utf-8')).hexdigest()[:16]
+    return digest, {"message": message, "path": path, "line_hash": line_hash}
+
+
+def load_index(index_path=INDEX_FILE):
+    """Load the fingerprint index, or return an empty one."""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_index(index, index_path=INDEX_FILE):
+    """Persist the fingerprint index as JSON."""
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+def diff_to_edits(before, after, context=EDIT_CONTEXT_LINES):
+    """
+    Express the change from before to after as search/replace edits.
+
+    Each changed region carries a few lines of unchanged context so its search
+    block stays unique when the rest of the file moves.
+    """
+    old = before.splitlines(keepends=True)
+    new = after.splitlines(keepends=True)
+    edits = []
+    for group in difflib.SequenceMatcher(None, old, new, autojunk=False).get_grouped_opcodes(context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        edits.append({"search": "".join(old[i1:i2]), "replace": "".join(new[j1:j2])})
+    return edits
+
+
+def _read(path, root):
+    try:
+        with open(Path(root) / path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def record_fix(fingerprint, details, error_id, result, root=REPO_ROOT, index_path=INDEX_FILE):
+    """
+    Store a validated fix under its fingerprint.
+
+    Must be called before the fixes are written, while the repository still
+    holds the failing version of each file.
+    """
+    stored = []
+    for fix in result.get("file_fixes") or []:
+        before = _read(fix["path"], root)
+        if before is None:
+            stored.append({"path": fix["path"], "base_hash": None, "content": fix["content"]})
+        else:
+            stored.append({"path": fix["path"], "base_hash": content_hash(before),
+                           "edits": diff_to_edits(before, fix["content"])})
+
+    index = load_index(index_path)
+    previous = index.get(fingerprint, {})
+    index[fingerprint] = {
+        **details,
+        "error_id": error_id,
+        "first_seen": previous.get("first_seen", datetime.now().strftime('%Y-%m-%d')),
+        "reused": previous.get("reused", 0),
+        "root_cause": result.get("root_cause", ""),
+        "fix_strategy": result.get("fix_strategy", ""),
+        "file_fixes": stored,
+    }
+    save_index(index, index_path)
+
+
+def find_fix(fingerprint, root=REPO_ROOT, index_path=INDEX_FILE):
+    """
+    Look up a stored fix and resolve it against the current files.
+
+    Stored edits are applied to the current file. A file the fix created is
+    only re-created while it is still absent. If any file cannot be fixed the
+    whole entry is treated as a miss.
+
+    Returns:
+        tuple: (index entry, list of {"path", "content"} fixes) or (None, None)
+    """
+    entry = load_index(index_path).get(fingerprint)
+    if not entry:
+        return None, None
+
+    fixes = []
+    for stored in entry["file_fixes"]:
+        current = _read(stored["path"], root)
+        if stored.get("base_hash") is None:
+            if current is not None:
+                return None, None
+            fixes.append({"path": stored["path"], "content": stored["content"]})
+            continue
+        if current is None:
+            return None, None
+        try:
+            change = {"base_hash": content_hash(current), "edits": stored["edits"]}
+            fixes.append({"path": stored["path"], "content": apply_change(change, current)})
+        except PatchError:
+            return None, None
+    return entry, fixes
+
+
+def mark_reused(fingerprint, error_id, index_path=INDEX_FILE):
+    """Count a successful reuse of a stored fix."""
+    index = load_index(index_path)
+    if fingerprint in index:
+        index[fingerprint]["reused"] = index[fingerprint].get("reused", 0) + 1
+        index[fingerprint]["last_reused_by"] = error_id
+        save_index(index, index_path)
+
+
+def main():
+    """Command line entry point."""
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "show" and len(sys.argv) > 2:
+        with open(sys.argv[2], 'r', encoding='utf-8') as f:
+            fingerprint, details = fingerprint_error(f.read())
+        entry, fixes = find_fix(fingerprint)
+        print(f"🔑 {fingerprint}")
+        print(f"   location: {details['path'] or '-'} (line {details['line_hash'] or '-'})")
+        print(f"   message:  {details['message']}")
+        print(f"   stored fix: {'yes, ' + str(len(fixes)) + ' files' if entry else 'no'}")
+    elif command == "list":
+        index = load_index()
+        print(f"🗂️  {len(index)} fingerprints")
+        for fingerprint, entry in sorted(index.items(), key=lambda item: -item[1].get("reused", 0)):
+            first_line = entry["message"].splitlines()[0] if entry["message"] else ""
+            print(f"  {fingerprint} reused {entry.get('reused', 0)}x  {entry['path'] or '-'}  {first_line[:80]}")
+    elif command == "forget" and len(sys.argv) > 2:
+        index = load_index()
+        if index.pop(sys.argv[2], None) is None:
+            print(f"❌ Unknown fingerprint: {sys.argv[2]}")
+            sys.exit(1)
+        save_index(index)
+        print(f"✅ Forgot {sys.argv[2]}")
+    else:
+        print("Usage: python error_fingerprint.py show <error_log_file> | list | forget <fingerprint>")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
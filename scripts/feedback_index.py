@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Feedback Inbox Indexer
+Splits product/feedback/inbox.md into entries by their "## date (author)" headers,
+tracks which entries the Product Agent has already processed, and ranks the
+remaining ones with a local BM25 index. The Product Agent receives only
+unprocessed, relevant entries, so prompt size stays flat as the inbox grows.
+
+Entries are identified by their header, so editing an entry's text does not
+make it unprocessed again. Only the processed map is persisted; the BM25 index
+is rebuilt from the inbox on each run.
+
+Usage:
+    python scripts/feedback_index.py status
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from bm25 import BM25Index
+from journal import locked
+
+REPO_ROOT = Path(__file__).parent.parent
+FEEDBACK_INBOX = REPO_ROOT / "product/feedback/inbox.md"
+INDEX_FILE = REPO_ROOT / ".ai/pipeline/feedback-index.json"
+MAX_ENTRIES = int(os.getenv("FEEDBACK_MAX_ENTRIES", "10"))
+
+ENTRY_HEADER_RE = re.compile(
+    r'^#{2,3}\s+(?P<date>\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4})\s*\((?P<author>[^)]+)\)\s*$',
+    re.MULTILINE
+)
+
+
+def split_entries(inbox_text):
+    """
+    Split inbox markdown into entries.
+
+    Args:
+        inbox_text: Full content of the feedback inbox
+
+    Returns:
+        tuple: (preamble text before the first entry, list of entry dicts)
+    """
+    matches = list(ENTRY_HEADER_RE.finditer(inbox_text))
+    if not matches:
+        return inbox_text.strip(), []
+
+    preamble = re.sub(r'\n-{3,}\s*$', '', inbox_text[:matches[0].start()].strip()).strip()
+    entries = []
+    header_counts = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(inbox_text)
+        text = inbox_text[match.start():end].strip()
+        # Drop a trailing horizontal rule that separates entries
+        text = re.sub(r'\n-{3,}\s*$', '', text).strip()
+        # Key on the header (and its occurrence, for same-day entries by one author)
+        header = f"{match.group('date')} ({match.group('author').strip()})"
+        occurrence = header_counts.get(header, 0)
+        header_counts[header] = occurrence + 1
+        key = header if occurrence == 0 else f"{header} #{occurrence + 1}"
+        entries.append({
+            "id": hashlib.sha256(key.encode('utf-8')).hexdigest()[:12],
+            "date": match.group("date"),
+            "author": match.group("author").strip(),
+            "position": i,
+            "text": text,
+        })
+    return preamble, entries
+
+
+def lock_path_for(index_path):
+    """Return the lock file that serializes updates to the index."""
+    index_path = Path(index_path)
+    return index_path.with_name(index_path.name + ".lock")
+
+
+def load_processed(index_path=INDEX_FILE):
+    """Load the processed map (entry id -> features, first_processed), or an empty one."""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+    return data.get("processed", {})
+
+
+def save_processed(processed, index_path=INDEX_FILE):
+    """Persist the processed map as JSON. Call with the index lock held."""
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"processed": processed}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+def build_index(entries):
+    """Build a BM25 index over inbox entries."""
+    bm25 = BM25Index()
+    for entry in entries:
+        bm25.add(entry["id"], entry["text"])
+    return bm25
+
+
+def select_entries(feature_id, query="", limit=MAX_ENTRIES, inbox_path=FEEDBACK_INBOX, index_path=INDEX_FILE):
+    """
+    Select the inbox entries the Product Agent should see for this feature.
+
+    Entries already processed for other features are excluded. Entries processed
+    for this same feature stay eligible so re-runs see the same feedback.
+    Remaining entries are ranked by BM25 relevance to the query, newest first
+    on ties, and returned in inbox order.
+
+    Args:
+        feature_id: Feature being analyzed
+        query: Extra free-text context used for relevance ranking
+        limit: Maximum number of entries to return
+        inbox_path: Path to the feedback inbox
+        index_path: Path to the persisted index
+
+    Returns:
+        tuple: (preamble, list of selected entry dicts, total entry count)
+    """
+    try:
+        with open(inbox_path, 'r', encoding='utf-8') as f:
+            inbox_text = f.read()
+    except FileNotFoundError:
+        return f"[File not found: {inbox_path}]", [], 0
+
+    preamble, entries = split_entries(inbox_text)
+    processed = load_processed(index_path)
+    eligible = [
+        entry for entry in entries
+        if entry["id"] not in processed or feature_id in processed[entry["id"]].get("features", [])
+    ]
+
+    scores = dict(build_index(eligible).score(f"{feature_id} {query}", [entry["id"] for entry in eligible]))
+    ranked = sorted(eligible, key=lambda e: (scores.get(e["id"], 0.0), e["position"]), reverse=True)
+    selected = sorted(ranked[:limit], key=lambda e: e["position"])
+    return preamble, selected, len(entries)
+
+
+def format_entries(preamble, entries, total):
+    """Render selected entries as markdown for the prompt."""
+    if not entries:
+        body = "[No unprocessed feedback entries]"
+    else:
+        body = "\n\n---\n\n".join(entry["text"] for entry in entries)
+    skipped = total - len(entries)
+    note = f"\n\n_{skipped} older or already-processed entries omitted._" if skipped > 0 else ""
+    return f"{preamble}\n\n---\n\n{body}{note}" if preamble else f"{body}{note}"
+
+
+def mark_processed(entry_ids, feature_id, index_path=INDEX_FILE):
+    """Record that entries were processed for a feature (locked, safe under concurrent runs)."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    with locked(lock_path_for(index_path)):
+        processed = load_processed(index_path)
+        for entry_id in entry_ids:
+            record = processed.setdefault(entry_id, {"features": [], "first_processed": today})
+            if feature_id not in record["features"]:
+                record["features"].append(feature_id)
+        save_processed(processed, index_path)
+
+
+def main():
+    """Print indexing status for the feedback inbox."""
+    if len(sys.argv) < 2 or sys.argv[1] != "status":
+        print("Usage: python feedback_index.py status")
+        sys.exit(1)
+
+    with open(FEEDBACK_INBOX, 'r', encoding='utf-8') as f:
+        _, entries = split_entries(f.read())
+    processed = load_processed()
+
+    print(f"📥 Feedback inbox: {len(entries)} entries")
+    for entry in entries:
+        features = processed.get(entry["id"], {}).get("features", [])
+        status = f"✓ {', '.join(features)}" if features else "○ unprocessed"
+        print(f"  {entry['date']} ({entry['author']}) [{entry['id']}] {status}")
+
+
+if __name__ == "__main__":
+    main()
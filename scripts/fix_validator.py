@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Fix Validator Utility
+Checks proposed file fixes in a scratch copy of the repository (a git worktree
+of HEAD plus the uncommitted changes) before they are written for real. The Error Recovery Agent uses it to catch broken fixes
+locally and send the failures back to the model, instead of spending a full
+CI workflow run on each attempt.
+
+Checks run in parallel and only cover what the fix touched:
+- Python files are compiled; ruff (if installed) checks for syntax errors and undefined names
+- JSON files are parsed; YAML files too when PyYAML is installed
+- JavaScript files are syntax-checked with `node --check` when node is available
+- Tests that target a fixed Python module (test_<name>.py / <name>_test.py) are run with pytest
+
+Usage:
+    python scripts/fix_validator.py <fixes.json>
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from output_writer import OutputBatch
+
+REPO_ROOT = Path(__file__).parent.parent
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".ai", "dist", "build"}
+LINKED_DIRS = {"node_modules", ".venv", "venv"}
+CHECK_TIMEOUT = int(os.getenv("FIX_CHECK_TIMEOUT", "120"))
+OUTPUT_LIMIT = 4000
+
+
+def _ignore(directory, names):
+    return [name for name in names if name in SKIP_DIRS]
+
+
+def _walk(root):
+    """os.walk that never descends into SKIP_DIRS or symlinked directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        skipped = [name for name in dirnames if name in SKIP_DIRS]
+        dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+        yield Path(dirpath), skipped, filenames
+
+
+def _git(root, *args):
+    return subprocess.run(["git", *args], cwd=root, capture_output=True, text=True,
+                          encoding='utf-8', errors='replace', timeout=CHECK_TIMEOUT)
+
+
+def _add_worktree(root, scratch):
+    """
+    Check out HEAD into scratch as a git worktree and apply the uncommitted changes.
+
+    Only tracked and untracked-but-not-ignored files are written, so ignored
+    caches and build output are never copied.
+
+    Returns:
+        bool: False if root is not the top of a git repository (nothing was done)
+    """
+    if not shutil.which("git"):
+        return False
+    try:
+        toplevel = _git(root, "rev-parse", "--show-toplevel")
+        if toplevel.returncode != 0 or Path(toplevel.stdout.strip()).resolve() != root:
+            return False
+        if _git(root, "worktree", "add", "--detach", "--quiet", str(scratch), "HEAD").returncode != 0:
+            return False
+        changed = _git(root, "ls-files", "-z", "--modified", "--others", "--exclude-standard")
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    for rel in filter(None, changed.stdout.split("\0")):
+        if LINKED_DIRS.intersection(Path(rel).parts):
+            continue
+        source, target = root / rel, scratch / rel
+        if source.is_file():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+        elif not source.exists():
+            target.unlink(missing_ok=True)  # Deleted in the working tree
+    return True
+
+
+@contextmanager
+def scratch_tree(root=REPO_ROOT):
+    """
+    Yield a temporary copy of the working tree.
+
+    In a git repository this is a worktree of HEAD with the uncommitted
+    changes applied, so tracked files under build/ or dist/ are present and
+    ignored caches are not. Elsewhere the tree is copied without SKIP_DIRS.
+    Dependency directories (node_modules, virtualenvs) are symlinked rather
+    than copied so tests can still import them.
+    """
+    root = Path(root).resolve()
+    scratch = Path(tempfile.mkdtemp(prefix="aid-validate-"))
+    worktree = False
+    try:
+        worktree = _add_worktree(root, scratch)
+        if not worktree:
+            shutil.copytree(root, scratch, ignore=_ignore, dirs_exist_ok=True, symlinks=True)
+        for dirpath, skipped, _ in _walk(root):
+            for name in LINKED_DIRS.intersection(skipped):
+                target = scratch / (dirpath / name).relative_to(root)
+                if not target.exists():
+                    target.symlink_to(dirpath / name, target_is_directory=True)
+        yield scratch
+    finally:
+        if worktree:
+            try:
+                _git(root, "worktree", "remove", "--force", str(scratch))
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        shutil.rmtree(scratch, ignore_errors=True)
+        if worktree:
+            try:
+                _git(root, "worktree", "prune")
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+
+
+def _unchecked_reason(path, scratch):
+    """
+    Why a fix cannot be checked in the scratch tree, or None if it can.
+
+    Dependency directories are symlinks to the real ones, so writing there
+    would change the repository; other SKIP_DIRS are only usable when the
+    scratch tree actually contains them.
+    """
+    parts = Path(path).parts
+    for i, part in enumerate(parts[:-1]):
+        if part in LINKED_DIRS or part == ".git":
+            return f"Fixes under {part}/ are not allowed"
+        if part in SKIP_DIRS and not (scratch / Path(*parts[:i + 1])).is_dir():
+            return f"{Path(*parts[:i + 1]).as_posix()}/ is not part of the validation copy, so the fix cannot be checked"
+    return None
+
+
+# pytest exit code 5: no tests were collected, which is not a failure of the fix
+PASSING_EXIT_CODES = {"pytest": (0, 5)}
+
+
+def _run(check, path, command, cwd):
+    """Run an external check and return a failure dict, or None if it passed."""
+    try:
+        completed = subprocess.run(
+            command, cwd=cwd, capture_output=True, text=True,
+            encoding='utf-8', errors='replace', timeout=CHECK_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return {"check": check, "path": path, "output": f"Timed out after {CHECK_TIMEOUT}s"}
+    if completed.returncode in PASSING_EXIT_CODES.get(check, (0,)):
+        return None
+    output = (completed.stdout + completed.stderr).strip()
+    return {"check": check, "path": path, "output": output[-OUTPUT_LIMIT:]}
+
+
+def _check_python(path, scratch):
+    try:
+        source = (scratch / path).read_text(encoding='utf-8')
+        compile(source, path, 'exec')
+    except SyntaxError as e:
+        return {"check": "py_compile", "path": path, "output": f"{e.__class__.__name__}: {e.msg} (line {e.lineno})"}
+    if shutil.which("ruff"):
+        return _run("ruff", path, ["ruff", "check", "--no-cache", "--select", "E9,F63,F7,F82", path], scratch)
+    return None
+
+
+def _check_json(path, scratch):
+    try:
+        json.loads((scratch / path).read_text(encoding='utf-8'))
+    except json.JSONDecodeError as e:
+        return {"check": "json", "path": path, "output": str(e)}
+    return None
+
+
+def _check_yaml(path, scratch):
+    try:
+        import yaml
+    except ImportError:
+        return None
+    try:
+        yaml.safe_load((scratch / path).read_text(encoding='utf-8'))
+    except yaml.YAMLError as e:
+        return {"check": "yaml", "path": path, "output": str(e)}
+    return None
+
+
+def _check_javascript(path, scratch):
+    if not shutil.which("node"):
+        return None
+    return _run("node --check", path, ["node", "--check", path], scratch)
+
+
+CHECKS = {
+    ".py": _check_python,
+    ".json": _check_json,
+    ".yml": _check_yaml,
+    ".yaml": _check_yaml,
+    ".js": _check_javascript,
+    ".mjs": _check_javascript,
+    ".cjs": _check_javascript,
+}
+
+
+def targeted_tests(paths, scratch):
+    """
+    Find the Python test files that cover the fixed files.
+
+    Returns:
+        list: Scratch-relative test file paths (fixed test files included)
+    """
+    tests = set()
+    for path in paths:
+        path = Path(path)
+        if path.suffix != ".py":
+            continue
+        if path.name.startswith("test_") or path.stem.endswith("_test"):
+            tests.add(path.as_posix())
+            continue
+        names = {f"test_{path.stem}.py", f"{path.stem}_test.py"}
+        for dirpath, _, filenames in _walk(scratch):
+            for name in names.intersection(filenames):
+                tests.add((dirpath / name).relative_to(scratch).as_posix())
+    return sorted(tests)
+
+
+def validate_fixes(file_fixes, root=REPO_ROOT):
+    """
+    Apply fixes to a scratch copy of the repository and run the local checks.
+
+    Args:
+        file_fixes: List of {"path", "content"} dicts as returned by the model
+        root: Repository root to copy
+
+    Returns:
+        list: Failure dicts (check, path, output); empty if every check passed
+    """
+    if not file_fixes:
+        return []
+
+    root = Path(root).resolve()
+    with scratch_tree(root) as scratch:
+        batch = OutputBatch(scratch)
+        paths = []
+        for fix in file_fixes:
+            path = Path(fix["path"])
+            if path.is_absolute() and root in path.resolve().parents:
+                path = path.resolve().relative_to(root)
+            reason = _unchecked_reason(path, scratch)
+            if reason:
+                return [{"check": "path", "path": fix["path"], "output": reason}]
+            try:
+                target = batch.add(path, fix["content"])
+            except ValueError as e:
+                return [{"check": "path", "path": fix["path"], "output": str(e)}]
+            paths.append(target.relative_to(scratch.resolve()).as_posix())
+        batch.commit()
+
+        jobs = [(CHECKS[Path(path).suffix], path) for path in paths if Path(path).suffix in CHECKS]
+        tests = targeted_tests(paths, scratch)
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(jobs) + 1))) as executor:
+            futures = [executor.submit(check, path, scratch) for check, path in jobs]
+            if tests and importlib.util.find_spec("pytest"):
+                futures.append(executor.submit(
+                    _run, "pytest", " ".join(tests),
+                    [sys.executable, "-m", "pytest", "-x", "-q", "-p", "no:cacheprovider", *tests], scratch
+                ))
+            failures = [future.result() for future in futures]
+
+    return [failure for failure in failures if failure]
+
+
+def format_failures(failures):
+    """Render validation failures as markdown for a follow-up prompt."""
+    return "\n\n".join(
+        f"### {failure['check']} failed: `{failure['path']}`\n\n```\n{failure['output']}\n```"
+        for failure in failures
+    )
+
+
+def main():
+    """Validate a JSON file of fixes ([{"path", "content"}] or {"file_fixes": [...]})."""
+    if len(sys.argv) < 2:
+        print("Usage: python fix_validator.py <fixes.json>")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    fixes = data.get("file_fixes", []) if isinstance(data, dict) else data
+
+    failures = validate_fixes(fixes)
+    if not failures:
+        print(f"✅ {len(fixes)} fixes passed local validation")
+        return
+    print(format_failures(failures))
+    print(f"\n❌ {len(failures)} checks failed")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,11 +7,24 @@ Invokes the Architect Agent using AI models to review and validate system archit
 import os
 import sys
 import json
+import time
 import re
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from candidate_scoring import ARCHITECT_RULES, best_of
 from pydantic import BaseModel
 from typing import List
 
@@ -46,8 +59,12 @@ ARCHITECTURE_DIR = REPO_ROOT / "design/architecture"
 TECHNICAL_SPECS_DIR = REPO_ROOT / "design/technical-specs"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -90,6 +107,7 @@ def invoke_architect_agent(feature_id):
     Returns:
         dict with adr_content, technical_spec, adr_number, complexity
     """
+    set_usage_context(feature_id=feature_id)
     # Load agent instructions
     agent_instructions = load_file(AGENT_FILE)
     
@@ -103,6 +121,7 @@ def invoke_architect_agent(feature_id):
     adr_number = get_next_adr_number()
     
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Architect Agent in the AID pipeline.
@@ -177,13 +196,16 @@ Provide your response in JSON format with these keys:
 }}
 ```
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API based on provider
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
+        # AID_BEST_OF_N > 1 samples several candidates concurrently and keeps the best-scoring one
+        result = best_of(
+            lambda: route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini),
+            ARCHITECT_RULES,
+            label="architect"
+        )
         
         # Add ADR number to result
         result["adr_number"] = adr_number
@@ -195,17 +217,14 @@ Provide your response in JSON format with these keys:
         raise
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -214,6 +233,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=8192,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -221,16 +241,12 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     # Combine system and user prompts for Gemini
     combined_prompt = f"""{system_prompt}
@@ -240,8 +256,9 @@ def _invoke_gemini(system_prompt, user_prompt):
 {user_prompt}"""
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -250,6 +267,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=ArchitectAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -265,8 +283,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -275,6 +294,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="architect_agent_error"
@@ -7,10 +7,25 @@ Invokes the Design Agent using AI models (OpenAI GPT-4.1 or Google Gemini 2.5 Pr
 import os
 import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from candidate_scoring import DESIGN_RULES, best_of
+from wireframe import save_wireframe
+from wireframe_diff import record_version
 from pydantic import BaseModel
 from typing import Any, Dict
 
@@ -35,8 +50,12 @@ BELIEFS_FILE = REPO_ROOT / "product/beliefs/current.md"
 EXPERIMENTS_FILE = REPO_ROOT / "experiments/active.md"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -62,6 +81,7 @@ def invoke_design_agent(feature_id, design_context=""):
     Returns:
         dict with design_intent, design_spec, wireframe_json, validation_notes
     """
+    set_usage_context(feature_id=feature_id)
     # Load agent instructions
     agent_instructions = load_file(AGENT_FILE)
     
@@ -78,6 +98,7 @@ def invoke_design_agent(feature_id, design_context=""):
     beliefs = load_file(BELIEFS_FILE)
     
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Design Agent in the AID pipeline.
@@ -165,13 +186,16 @@ Remember:
 - The wireframe_json_string should contain valid JSON, but AS A STRING VALUE
 - Use simple structures to avoid nested escaping complexity
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API based on provider
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
+        # AID_BEST_OF_N > 1 samples several candidates concurrently and keeps the best-scoring one
+        result = best_of(
+            lambda: route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini),
+            DESIGN_RULES,
+            label="design"
+        )
         
         return result
         
@@ -180,17 +204,14 @@ Remember:
         raise
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -199,6 +220,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=4000,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -206,16 +228,12 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     # Combine system and user prompts for Gemini
     combined_prompt = f"""{system_prompt}
@@ -225,8 +243,9 @@ def _invoke_gemini(system_prompt, user_prompt):
 {user_prompt}"""
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -235,6 +254,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=DesignAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -256,8 +276,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -266,6 +287,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="design_agent_error"
@@ -313,21 +335,18 @@ def main():
     save_file(spec_path, result["design_spec"])
     print(f"✅ Created design spec: {spec_path.relative_to(REPO_ROOT)}")
     
-    # Save wireframe JSON
+    # Save wireframe JSON (validated and compacted; saved as returned if it is not a node tree)
     wireframe_path = REPO_ROOT / f"design/wireframes/{feature_id}.json"
     # Handle wireframe as either string or object (for backward compatibility)
-    if "wireframe_json_string" in result:
-        # It's provided as a JSON string, parse it to validate and then save pretty-printed
-        try:
-            wireframe_obj = json.loads(result["wireframe_json_string"])
-            save_file(wireframe_path, json.dumps(wireframe_obj, indent=2))
-        except json.JSONDecodeError:
-            # If it's not valid JSON, save as-is
-            save_file(wireframe_path, result["wireframe_json_string"])
-    else:
-        # Legacy format: object directly
-        save_file(wireframe_path, json.dumps(result.get("wireframe_json", {}), indent=2))
-    print(f"✅ Created wireframe: {wireframe_path.relative_to(REPO_ROOT)}")
+    wireframe_raw = result.get("wireframe_json_string", result.get("wireframe_json", {}))
+    delta = record_version(wireframe_path, wireframe_raw)
+    saved = save_wireframe(wireframe_path, wireframe_raw)
+    print(f"✅ Created wireframe: {wireframe_path.relative_to(REPO_ROOT)} "
+          f"({saved['nodes']} nodes, {saved['styles']} shared styles, {saved['bytes']:,} bytes)")
+    for issue in saved["issues"][:10]:
+        print(f"   ⚠️  {issue}")
+    if delta:
+        print(f"   🧩 Wireframe version {delta['version']} ({len(delta['ops'])} changes from the previous version)")
     
     # Save validation notes
     validation_path = REPO_ROOT / f"design/validations/{feature_id}.md"
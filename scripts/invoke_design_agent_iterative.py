@@ -8,10 +8,25 @@ This prevents JSON parsing errors by requesting smaller, focused outputs.
 import os
 import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from candidate_scoring import DESIGN_INTENT_RULES, DESIGN_SPEC_RULES, WIREFRAME_RULES, best_of
+from wireframe import WireframeError, parse_wireframe, save_wireframe
+from wireframe_diff import record_version
 from pydantic import BaseModel
 from typing import Any, Dict
 
@@ -36,8 +51,12 @@ BELIEFS_FILE = REPO_ROOT / "product/beliefs/current.md"
 EXPERIMENTS_FILE = REPO_ROOT / "experiments/active.md"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -63,6 +82,7 @@ def invoke_design_agent_iterative(feature_id, design_context=""):
     Returns:
         dict with design_intent, design_spec, wireframe_json, validation_notes
     """
+    set_usage_context(feature_id=feature_id)
     print("📋 Design Agent - Iterative Mode", file=sys.stderr)
     print("   Breaking down into smaller requests to avoid JSON errors...", file=sys.stderr)
     
@@ -81,6 +101,7 @@ def invoke_design_agent_iterative(feature_id, design_context=""):
     beliefs = load_file(BELIEFS_FILE)
     
     # Base system prompt for all iterations
+    prompt_span = start_span("prompt.assemble")
     base_system_prompt = f"""{agent_instructions}
 
 You are the Design Agent in the AID pipeline. You translate product decisions into interaction designs.
@@ -101,6 +122,7 @@ Focus on clarity, simplicity, and reducing user friction."""
 {"### Additional Context" if design_context else ""}
 {design_context if design_context else ""}
 """
+    prompt_span.end(chars=len(base_system_prompt) + len(shared_context))
     
     # Iteration 1: Design Intent
     print("\n📝 Step 1/4: Creating design intent...", file=sys.stderr)
@@ -124,7 +146,8 @@ Provide response as JSON:
 Keep it concise but comprehensive (300-500 words).
 """
     
-    intent_result = _invoke_ai(base_system_prompt, intent_prompt)
+    set_usage_context(iteration=1)
+    intent_result = best_of(lambda: _invoke_ai(base_system_prompt, intent_prompt), DESIGN_INTENT_RULES, label="intent")
     design_intent = intent_result.get("design_intent", "")
     print(f"   ✓ Intent created ({len(design_intent)} chars)", file=sys.stderr)
     
@@ -154,7 +177,8 @@ Provide response as JSON:
 Be thorough but focused (500-800 words).
 """
     
-    spec_result = _invoke_ai(base_system_prompt, spec_prompt)
+    set_usage_context(iteration=2)
+    spec_result = best_of(lambda: _invoke_ai(base_system_prompt, spec_prompt), DESIGN_SPEC_RULES, label="spec")
     design_spec = spec_result.get("design_spec", "")
     print(f"   ✓ Spec created ({len(design_spec)} chars)", file=sys.stderr)
     
@@ -194,19 +218,18 @@ Guidelines:
 Provide response as JSON with the wireframe object directly (not as a string).
 """
     
-    wireframe_result = _invoke_ai(base_system_prompt, wireframe_prompt)
+    set_usage_context(iteration=3)
+    wireframe_json = best_of(
+        lambda: {"wireframe": _wireframe_from(_invoke_ai(base_system_prompt, wireframe_prompt))},
+        WIREFRAME_RULES,
+        label="wireframe"
+    )["wireframe"]
     
-    # Handle both dict and list responses
-    if isinstance(wireframe_result, list):
-        # If it's a list, use the first item or wrap it
-        wireframe_json = wireframe_result[0] if wireframe_result else {}
-    elif isinstance(wireframe_result, dict):
-        # If it's a dict, get the wireframe key or use the whole dict
-        wireframe_json = wireframe_result.get("wireframe", wireframe_result)
-    else:
-        wireframe_json = {}
-    
-    print(f"   ✓ Wireframe created ({len(json.dumps(wireframe_json))} chars)", file=sys.stderr)
+    try:
+        wireframe_nodes = parse_wireframe(wireframe_json).node_count()
+    except WireframeError:
+        wireframe_nodes = 0
+    print(f"   ✓ Wireframe created ({len(json.dumps(wireframe_json))} chars, {wireframe_nodes} nodes)", file=sys.stderr)
     
     # Iteration 4: Validation
     print("\n✓ Step 4/4: Creating validation notes...", file=sys.stderr)
@@ -215,7 +238,7 @@ Provide response as JSON with the wireframe object directly (not as a string).
 ## Previously Created
 Design Intent: {design_intent[:200]}...
 Design Spec: {design_spec[:200]}...
-Wireframe: Created with {len(wireframe_json.get('children', []))} elements
+Wireframe: Created with {wireframe_nodes} elements
 
 ## Task: Validation Check
 
@@ -236,6 +259,7 @@ Provide response as JSON:
 }}
 """
     
+    set_usage_context(iteration=4)
     validation_result = _invoke_ai(base_system_prompt, validation_prompt)
     validation_notes = validation_result.get("validation_notes", "")
     summary = validation_result.get("summary", "")
@@ -255,25 +279,31 @@ Provide response as JSON:
     return combined_result
 
 
+def _wireframe_from(wireframe_result):
+    """Extract the wireframe object from a wireframe step response."""
+    # Handle both dict and list responses
+    if isinstance(wireframe_result, list):
+        # If it's a list, use the first item or wrap it
+        return wireframe_result[0] if wireframe_result else {}
+    if isinstance(wireframe_result, dict):
+        # If it's a dict, get the wireframe key or use the whole dict
+        return wireframe_result.get("wireframe", wireframe_result)
+    return {}
+
+
 def _invoke_ai(system_prompt, user_prompt):
     """Invoke AI based on configured provider."""
-    if AI_PROVIDER == "gemini":
-        return _invoke_gemini(system_prompt, user_prompt)
-    else:
-        return _invoke_openai(system_prompt, user_prompt)
+    return route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -282,6 +312,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=8192,  # Increased to accommodate full design specifications
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -289,22 +320,19 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     combined_prompt = f"{system_prompt}\n\n---\n\n{user_prompt}"
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -313,6 +341,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=DesignAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -334,8 +363,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -344,6 +374,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="design_iteration_error"
@@ -395,8 +426,13 @@ def main():
     
     # Save wireframe
     wireframe_file = output_dir / "wireframes" / f"{feature_id}.json"
-    save_file(wireframe_file, json.dumps(result["wireframe_json"], indent=2))
-    print(f"✓ Saved: {wireframe_file}")
+    delta = record_version(wireframe_file, result["wireframe_json"])
+    saved = save_wireframe(wireframe_file, result["wireframe_json"])
+    print(f"✓ Saved: {wireframe_file} ({saved['nodes']} nodes, {saved['styles']} shared styles, {saved['bytes']:,} bytes)")
+    for issue in saved["issues"][:10]:
+        print(f"  ⚠️  {issue}")
+    if delta:
+        print(f"  🧩 Wireframe version {delta['version']} ({len(delta['ops'])} changes from the previous version)")
     
     # Save validation
     validation_file = output_dir / "validations" / f"{feature_id}.md"
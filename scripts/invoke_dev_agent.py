@@ -8,10 +8,25 @@ Based on Software Engineer Agent v1 - delivers production-ready, maintainable co
 import os
 import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from output_writer import OutputBatch, format_bytes
+from knowledge_index import context_for
+from wireframe_diff import mark_pending, wireframe_context
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
@@ -49,8 +64,12 @@ REPO_ROOT = Path(__file__).parent.parent
 AGENT_FILE = REPO_ROOT / ".ai/agents/dev.md"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -58,13 +77,6 @@ def load_file(filepath):
         return f"[File not found: {filepath}]"
 
 
-def save_file(filepath, content):
-    """Save content to a file."""
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
 def invoke_dev_agent(feature_id):
     """
     Invoke the Dev Agent to implement feature based on specifications.
@@ -75,6 +87,7 @@ def invoke_dev_agent(feature_id):
     Returns:
         dict: Results including implementation summary and test results
     """
+    set_usage_context(feature_id=feature_id)
     print("Invoking Dev Agent...")
     
     # Load agent instructions
@@ -101,11 +114,20 @@ def invoke_dev_agent(feature_id):
     technical_spec_file = REPO_ROOT / "design/technical-specs" / f"{feature_id}.md"
     design_spec_file = REPO_ROOT / "design/specs" / f"{feature_id}.md"
     
-    adrs = "\n\n---\n\n".join([load_file(adr) for adr in adr_files]) if adr_files else "[No ADRs found]"
     technical_spec = load_file(technical_spec_file)
     design_spec = load_file(design_spec_file)
     
+    # Wireframe: whole the first time, then only the subtrees changed since the version last accepted
+    wireframe_file = REPO_ROOT / "design/wireframes" / f"{feature_id}.json"
+    wireframe_text, wireframe_version = wireframe_context(wireframe_file, "dev")
+    if wireframe_text:
+        design_spec += f"\n\n#### Wireframe\n{wireframe_text}"
+    
+    # ADRs: whole while they fit the context budget, otherwise the sections most relevant to the spec
+    adrs = (context_for(f"{feature_id} {technical_spec[:2000]}", adr_files) if adr_files else "") or "[No ADRs found]"
+    
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Dev Agent in the AID pipeline.
@@ -234,13 +256,12 @@ Remember:
 - Comprehensive test coverage
 - Document all significant decisions
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API based on provider
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
+        result = route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
+        result["wireframe_version"] = wireframe_version
         
         return result
         
@@ -249,17 +270,14 @@ Remember:
         raise
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -268,6 +286,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=8000,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -275,16 +294,12 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     # Combine system and user prompts for Gemini
     combined_prompt = f"""{system_prompt}
@@ -294,8 +309,9 @@ def _invoke_gemini(system_prompt, user_prompt):
 {user_prompt}"""
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -304,6 +320,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=DevAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -342,8 +359,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -352,6 +370,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="dev_agent_error"
@@ -405,42 +424,48 @@ def main():
         if "_recovery_note" not in result:
             sys.exit(1)
     
-    # Create all files
-    for file_info in files_created:
-        filepath = REPO_ROOT / file_info['path']
-        save_file(filepath, file_info['content'])
-        print(f"  ✓ Created: {file_info['path']}")
+    # Stage every output, then write them to the repo in one batch
+    batch = OutputBatch(REPO_ROOT)
+    outputs = []
+    try:
+        for file_info in files_created:
+            outputs.append(("Created", batch.add(file_info['path'], file_info['content'])))
+    
+        for test_info in tests_created:
+            outputs.append(("Created test", batch.add(test_info['path'], test_info['content'])))
     
-    # Create all tests
-    for test_info in tests_created:
-        filepath = REPO_ROOT / test_info['path']
-        save_file(filepath, test_info['content'])
-        print(f"  ✓ Created test: {test_info['path']}")
+        for doc_info in result.get('documentation_updates', []):
+            outputs.append(("Updated docs", batch.add(doc_info['path'], doc_info['content'])))
     
-    # Summary of created files
-    if files_created or tests_created:
-        print(f"\n📦 Generated {len(files_created)} implementation files and {len(tests_created)} test files")
+        # Save build commands for pipeline automation
+        if result.get('build_commands'):
+            build_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.build.json"
+            outputs.append(("Saved build commands", batch.add(build_file, json.dumps(result['build_commands'], indent=2))))
+    
+        # Update pipeline state
+        state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
+        if state_file.exists():
+            state_content = load_file(state_file)
+            state_content = state_content.replace('status: architect_approved', 'status: dev_awaiting_approval')
+            state_content = state_content.replace('dev: pending', 'dev: in-progress')
+            outputs.append(("Updated pipeline state", batch.add(state_file, state_content)))
+        
+        stats = batch.commit()
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to write outputs (repository left unchanged): {e}")
+        sys.exit(1)
     
-    # Update documentation
-    for doc_info in result.get('documentation_updates', []):
-        filepath = REPO_ROOT / doc_info['path']
-        save_file(filepath, doc_info['content'])
-        print(f"  ✓ Updated docs: {doc_info['path']}")
+    # Consumed once build validation accepts the output (see the dev job in pipeline.yml)
+    mark_pending(REPO_ROOT / "design/wireframes" / f"{feature_id}.json", "dev", result.get("wireframe_version"))
     
-    # Save build commands for pipeline automation
-    if result.get('build_commands'):
-        build_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.build.json"
-        save_file(build_file, json.dumps(result['build_commands'], indent=2))
-        print(f"  ✓ Saved build commands: {build_file.relative_to(REPO_ROOT)}")
+    for label, path in outputs:
+        suffix = " (unchanged)" if path in stats['skipped'] else ""
+        print(f"  ✓ {label}: {path.relative_to(REPO_ROOT)}{suffix}")
     
-    # Update pipeline state
-    state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
-    if state_file.exists():
-        state_content = load_file(state_file)
-        state_content = state_content.replace('status: architect_approved', 'status: dev_awaiting_approval')
-        state_content = state_content.replace('dev: pending', 'dev: in-progress')
-        save_file(state_file, state_content)
-        print(f"  ✓ Updated pipeline state")
+    # Summary of created files
+    if files_created or tests_created:
+        print(f"\n📦 Generated {len(files_created)} implementation files and {len(tests_created)} test files")
+    print(f"💾 Wrote {len(stats['written'])} files ({format_bytes(stats['bytes_written'])}), {len(stats['skipped'])} unchanged")
     
     print(f"\n📋 Quality Checklist:")
     checklist = result.get('quality_checklist', {})
@@ -2,28 +2,65 @@
 """
 Dev Agent Executor - Iterative Approach
 Invokes the Dev Agent in multiple iterations to avoid large JSON responses.
+
+By default the agent first returns a file manifest (paths with line
+estimates, no content). The files are bin-packed into iterations that fit the
+output token budget and those iterations run concurrently. If no usable
+manifest comes back, the fixed five-iteration plan runs instead; an empty
+manifest means there is nothing to generate.
+
+Settings:
+    AID_DEV_PLANNER        "adaptive" (default) or "fixed"
+    AID_DEV_OUTPUT_TOKENS  Completion token budget per iteration (default 8192)
+    AID_DEV_PARALLEL       Iterations in flight at once (default 4)
 """
 
+import contextvars
 import os
 import sys
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, span, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context, usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from output_writer import OutputBatch, format_bytes
+from knowledge_index import context_for
+from error_context import build_error_context
+from patch_apply import PATCH_FORMAT_INSTRUCTIONS, resolve_with_fallback
+from wireframe_diff import mark_pending, wireframe_context
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Pydantic Models for Schema Validation
+class SearchReplace(BaseModel):
+    """One search/replace edit within a file."""
+    search: str
+    replace: str
+
 class FileInfo(BaseModel):
-    """Single file information."""
+    """Single file: full content, or edits against base_hash for existing files."""
     path: str
-    content: str
+    content: Optional[str] = None
     description: str
+    base_hash: Optional[str] = None
+    edits: Optional[List[SearchReplace]] = None
 
 class BuildCommands(BaseModel):
     """Build commands for the project."""
@@ -42,15 +79,73 @@ class DevAgentResponse(BaseModel):
     testing_summary: str
     next_steps: List[str]
 
+class ManifestEntry(BaseModel):
+    """One planned file, without content."""
+    path: str
+    kind: str
+    description: str
+    estimated_lines: int
+
+class FileManifest(BaseModel):
+    """Files the Dev Agent plans to generate."""
+    files: List[ManifestEntry]
+
 # Configuration
 MODEL = os.getenv("MODEL", "gpt-4.1")
 AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
 REPO_ROOT = Path(__file__).parent.parent
 AGENT_FILE = REPO_ROOT / ".ai/agents/dev.md"
 
+# Adaptive planning
+DEV_PLANNER = os.getenv("AID_DEV_PLANNER", "adaptive").lower()
+OUTPUT_TOKEN_BUDGET = int(os.getenv("AID_DEV_OUTPUT_TOKENS", "8192"))
+MAX_PARALLEL_ITERATIONS = int(os.getenv("AID_DEV_PARALLEL", "4"))
+MANIFEST_MAX_TOKENS = 2048
+# Tokens per generated line, including JSON escaping
+TOKENS_PER_LINE = 12
+# Summary, checklist and JSON structure around the files of every response
+RESPONSE_OVERHEAD_TOKENS = 1000
+# Iterations are filled to this share of the budget; line estimates are rough
+PACKING_HEADROOM = 0.8
+# Rounds of re-planning for manifest files no iteration returned
+MAX_PLAN_ROUNDS = 2
+
+# Fallback plan when no manifest is available - each iteration generates fewer files
+FIXED_ITERATIONS = [
+    {
+        "name": "Project Configuration",
+        "focus": "package.json, tsconfig.json, vite.config.js, .gitignore",
+        "max_files": 5
+    },
+    {
+        "name": "Core Implementation Files",
+        "focus": "Main application code, components, utilities",
+        "max_files": 5
+    },
+    {
+        "name": "Additional Implementation",
+        "focus": "Remaining implementation files if needed",
+        "max_files": 5
+    },
+    {
+        "name": "Test Files",
+        "focus": "Test files for the implementation",
+        "max_files": 5
+    },
+    {
+        "name": "Documentation",
+        "focus": "README.md and other documentation",
+        "max_files": 3
+    }
+]
+
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -58,13 +153,6 @@ def load_file(filepath):
         return f"[File not found: {filepath}]"
 
 
-def save_file(filepath, content):
-    """Save content to a file."""
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
 def invoke_dev_agent_iterative(feature_id):
     """
     Invoke the Dev Agent in iterations to avoid large JSON responses.
@@ -75,6 +163,7 @@ def invoke_dev_agent_iterative(feature_id):
     Returns:
         dict: Combined results from all iterations
     """
+    set_usage_context(feature_id=feature_id)
     print("🔄 Invoking Dev Agent with iterative workflow...")
     
     # Check for error context (error-fix ran)
@@ -86,6 +175,8 @@ def invoke_dev_agent_iterative(feature_id):
             with open(error_context_file, 'r') as f:
                 error_context = json.load(f)
             print(f"⚠️  Error context detected: {error_context.get('error_type', 'unknown')}")
+            # Show the failing code so fixes can be small edits instead of rewrites
+            error_context["affected_files"], _ = build_error_context(error_context.get("log_tail", ""))
             print(f"   Error fix was applied - validating and refining...")
         except Exception as e:
             print(f"⚠️  Failed to load error context: {e}")
@@ -101,38 +192,17 @@ def invoke_dev_agent_iterative(feature_id):
     technical_spec_file = REPO_ROOT / "design/technical-specs" / f"{feature_id}.md"
     design_spec_file = REPO_ROOT / "design/specs" / f"{feature_id}.md"
     
-    adrs = "\n\n---\n\n".join([load_file(adr) for adr in adr_files]) if adr_files else "[No ADRs found]"
     technical_spec = load_file(technical_spec_file)
     design_spec = load_file(design_spec_file)
     
-    # Define iterations - each generates fewer files
-    iterations = [
-        {
-            "name": "Project Configuration",
-            "focus": "package.json, tsconfig.json, vite.config.js, .gitignore",
-            "max_files": 5
-        },
-        {
-            "name": "Core Implementation Files",
-            "focus": "Main application code, components, utilities",
-            "max_files": 5
-        },
-        {
-            "name": "Additional Implementation",
-            "focus": "Remaining implementation files if needed",
-            "max_files": 5
-        },
-        {
-            "name": "Test Files",
-            "focus": "Test files for the implementation",
-            "max_files": 5
-        },
-        {
-            "name": "Documentation",
-            "focus": "README.md and other documentation",
-            "max_files": 3
-        }
-    ]
+    # Wireframe: whole the first time, then only the subtrees changed since the version last accepted
+    wireframe_file = REPO_ROOT / "design/wireframes" / f"{feature_id}.json"
+    wireframe_text, wireframe_version = wireframe_context(wireframe_file, "dev")
+    if wireframe_text:
+        design_spec += f"\n\n#### Wireframe\n{wireframe_text}"
+    
+    # ADRs: whole while they fit the context budget, otherwise the sections most relevant to the spec
+    adrs = (context_for(f"{feature_id} {technical_spec[:2000]}", adr_files) if adr_files else "") or "[No ADRs found]"
     
     combined_result = {
         "implementation_summary": "",
@@ -142,84 +212,347 @@ def invoke_dev_agent_iterative(feature_id):
         "build_commands": {},
         "quality_checklist": {},
         "technical_debt": [],
-        "next_steps": ""
+        "next_steps": "",
+        "wireframe_version": wireframe_version
     }
     
-    # Track what's been generated
+    # Track what's been generated (paths, and content so later iterations can edit it)
     generated_files = []
-    
-    # Execute each iteration
-    for i, iteration in enumerate(iterations, 1):
-        print(f"\n📦 Iteration {i}/{len(iterations)}: {iteration['name']}")
-        print(f"   Focus: {iteration['focus']}")
-        print(f"   Max files: {iteration['max_files']}")
-        
-        try:
-            result = _invoke_iteration(
-                agent_instructions,
-                adrs,
-                technical_spec,
-                design_spec,
-                feature_id,
-                iteration,
-                generated_files,
-                i,
-                len(iterations),
-                error_context
+    generated_contents = {}
+    
+    def merge(i, iteration, result):
+        """Resolve an iteration's edits and merge its result. Returns the number of files."""
+        # Edits to existing files (or files from earlier iterations) become full content
+        for key in ("files_created", "tests_created", "documentation_updates"):
+            result[key] = resolve_with_fallback(
+                result.get(key) or [],
+                lambda failures: _request_full_content(agent_instructions, feature_id, failures),
+                REPO_ROOT,
+                generated_contents
             )
+            for file_info in result[key]:
+                generated_contents[Path(file_info["path"]).as_posix()] = file_info["content"]
+        
+        # Track generated files
+        for file_info in result.get("files_created", []):
+            generated_files.append(file_info["path"])
+        
+        # Merge results
+        if not combined_result["implementation_summary"]:
+            combined_result["implementation_summary"] = result.get("implementation_summary", "")
+        else:
+            summary = result.get("implementation_summary", "")
+            if summary:
+                combined_result["implementation_summary"] += f"\n\n### Iteration {i}: {iteration['name']}\n{summary}"
+        
+        combined_result["files_created"].extend(result.get("files_created", []))
+        combined_result["tests_created"].extend(result.get("tests_created", []))
+        combined_result["documentation_updates"].extend(result.get("documentation_updates", []))
+        
+        # Merge build commands (first iteration usually has them)
+        if result.get("build_commands") and not combined_result["build_commands"]:
+            combined_result["build_commands"] = result["build_commands"]
+        
+        # Update checklist and debt from last iteration
+        if result.get("quality_checklist"):
+            combined_result["quality_checklist"] = result["quality_checklist"]
+        if result.get("technical_debt"):
+            combined_result["technical_debt"].extend(result["technical_debt"])
+        if result.get("next_steps"):
+            combined_result["next_steps"] = result["next_steps"]
+        
+        files_count = len(result.get("files_created", []))
+        print(f"   ✓ Iteration {i}: generated {files_count} files")
+        return files_count
+    
+    manifest = None
+    if DEV_PLANNER == "adaptive":
+        manifest = _request_manifest(agent_instructions, adrs, technical_spec, design_spec, feature_id, error_context)
+        if manifest is None:
+            print("   → No usable manifest, falling back to the fixed iteration plan")
+        elif not manifest:
+            print("   → Manifest lists no files, nothing to generate")
+            # In fix-validation mode this means the applied fixes are complete
+            combined_result["_no_changes_needed"] = bool(error_context)
+    
+    if manifest:
+        remaining = manifest
+        iteration_offset = 0
+        for round_num in range(1, MAX_PLAN_ROUNDS + 1):
+            plan = plan_iterations(remaining)
+            total_tokens = sum(iteration["estimated_tokens"] for iteration in plan)
+            print(f"\n🗂️  Round {round_num}: {len(remaining)} files (~{total_tokens:,} output tokens) "
+                  f"in {len(plan)} iterations of up to {OUTPUT_TOKEN_BUDGET:,} tokens")
             
-            # Track generated files
-            for file_info in result.get("files_created", []):
-                generated_files.append(file_info["path"])
-            
-            # Merge results
-            if i == 1:
-                combined_result["implementation_summary"] = result.get("implementation_summary", "")
-            else:
-                summary = result.get("implementation_summary", "")
-                if summary:
-                    combined_result["implementation_summary"] += f"\n\n### Iteration {i}: {iteration['name']}\n{summary}"
-            
-            combined_result["files_created"].extend(result.get("files_created", []))
-            combined_result["tests_created"].extend(result.get("tests_created", []))
-            combined_result["documentation_updates"].extend(result.get("documentation_updates", []))
-            
-            # Merge build commands (first iteration usually has them)
-            if result.get("build_commands") and not combined_result["build_commands"]:
-                combined_result["build_commands"] = result["build_commands"]
-            
-            # Update checklist and debt from last iteration
-            if result.get("quality_checklist"):
-                combined_result["quality_checklist"] = result["quality_checklist"]
-            if result.get("technical_debt"):
-                combined_result["technical_debt"].extend(result["technical_debt"])
-            if result.get("next_steps"):
-                combined_result["next_steps"] = result["next_steps"]
-            
-            files_count = len(result.get("files_created", []))
-            print(f"   ✓ Generated {files_count} files")
+            results = _invoke_planned_iterations(
+                plan, agent_instructions, adrs, technical_spec, design_spec, feature_id,
+                [entry["path"] for entry in manifest], generated_files, iteration_offset, error_context
+            )
+            for i, (iteration, result) in enumerate(zip(plan, results), iteration_offset + 1):
+                if result is None:
+                    continue
+                try:
+                    merge(i, iteration, result)
+                except Exception as e:
+                    print(f"   ⚠️  Iteration {i} failed: {e}")
+            iteration_offset += len(plan)
             
-            # If no files generated, skip remaining iterations of same type
-            if files_count == 0 and i > 2:
-                print(f"   → Skipping remaining iterations (no more files needed)")
+            # Planned files no iteration returned (failed or skipped calls) get another round
+            returned = {
+                Path(file_info["path"]).as_posix()
+                for key in ("files_created", "tests_created", "documentation_updates")
+                for file_info in combined_result[key]
+            }
+            remaining = [entry for entry in manifest if entry["path"] not in returned]
+            if not remaining:
                 break
+            print(f"   → {len(remaining)} planned files missing: {', '.join(entry['path'] for entry in remaining)}")
+    elif manifest is None:
+        # Execute each iteration
+        for i, iteration in enumerate(FIXED_ITERATIONS, 1):
+            print(f"\n📦 Iteration {i}/{len(FIXED_ITERATIONS)}: {iteration['name']}")
+            print(f"   Focus: {iteration['focus']}")
+            print(f"   Max files: {iteration['max_files']}")
             
-        except Exception as e:
-            print(f"   ⚠️  Iteration {i} failed: {e}")
-            print(f"   Continuing with remaining iterations...")
-            continue
+            try:
+                result = _invoke_iteration(
+                    agent_instructions,
+                    adrs,
+                    technical_spec,
+                    design_spec,
+                    feature_id,
+                    iteration,
+                    generated_files,
+                    i,
+                    len(FIXED_ITERATIONS),
+                    error_context
+                )
+                files_count = merge(i, iteration, result)
+                
+                # If no files generated, skip remaining iterations of same type
+                if files_count == 0 and i > 2:
+                    print(f"   → Skipping remaining iterations (no more files needed)")
+                    break
+                
+            except Exception as e:
+                print(f"   ⚠️  Iteration {i} failed: {e}")
+                print(f"   Continuing with remaining iterations...")
+                continue
     
     print(f"\n📊 Total files generated: {len(combined_result['files_created'])} implementation, {len(combined_result['tests_created'])} tests")
     
     return combined_result
 
 
+def _request_manifest(agent_instructions, adrs, technical_spec, design_spec, feature_id, error_context=None):
+    """
+    Ask for the files to generate, with line estimates but no content.
+    
+    Returns:
+        list: Manifest entries (path, kind, description, estimated_lines), empty if
+            no files are needed, or None if the call failed or returned no usable entries
+    """
+    set_usage_context(iteration="manifest")
+    print("\n🗂️  Requesting file manifest...")
+    
+    error_context_prompt = ""
+    if error_context:
+        error_context_prompt = f"""
+An error-fix workflow has applied automated fixes ({error_context.get('error_type', 'unknown')}:
+{error_context.get('message', 'No message')}). List only the files that still need changes.
+
+### Affected Files
+{error_context.get('affected_files', '[No repository files referenced in the error log]')}
+"""
+    
+    prompt_span = start_span("prompt.assemble")
+    system_prompt = f"""{agent_instructions}
+
+You are the Dev Agent, planning the implementation before writing it.
+{error_context_prompt}
+List every file you will create or change: configuration, implementation, tests and
+documentation. Do NOT write any file content yet.
+"""
+    user_prompt = f"""# Dev Agent - File Manifest
+
+## Feature ID
+{feature_id}
+
+## Specifications
+
+### ADRs
+{adrs}
+
+### Technical Spec
+{technical_spec}
+
+### Design Spec
+{design_spec}
+
+---
+
+## Output Format
+
+```json
+{{
+  "files": [
+    {{"path": "path/to/file", "kind": "implementation|test|documentation", "description": "Purpose", "estimated_lines": 120}}
+  ]
+}}
+```
+
+- estimated_lines is your best estimate of the file's final length
+- List each file once
+"""
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
+    
+    try:
+        result = route(
+            system_prompt,
+            user_prompt,
+            openai=partial(_invoke_openai, max_tokens=MANIFEST_MAX_TOKENS),
+            gemini=partial(_invoke_gemini, max_tokens=MANIFEST_MAX_TOKENS, response_schema=FileManifest)
+        )
+    except Exception as e:
+        print(f"Error requesting manifest: {e}", file=sys.stderr)
+        return None
+    
+    files = result.get("files")
+    if not isinstance(files, list):
+        return None
+    manifest = []
+    seen = set()
+    for entry in files:
+        if not isinstance(entry, dict) or not entry.get("path"):
+            continue
+        path = Path(entry["path"]).as_posix()
+        if path in seen:
+            continue
+        seen.add(path)
+        try:
+            estimated_lines = max(1, int(entry.get("estimated_lines") or 0))
+        except (TypeError, ValueError):
+            estimated_lines = 100
+        manifest.append({
+            "path": path,
+            "kind": str(entry.get("kind") or "implementation"),
+            "description": str(entry.get("description") or ""),
+            "estimated_lines": estimated_lines
+        })
+    return manifest if manifest or not files else None
+
+
+def estimate_tokens(entry):
+    """Estimated completion tokens for a manifest entry's content."""
+    return entry["estimated_lines"] * TOKENS_PER_LINE
+
+
+def plan_iterations(manifest, budget=OUTPUT_TOKEN_BUDGET):
+    """
+    Bin-pack manifest files into iterations that fit the output token budget.
+    
+    First-fit decreasing: the largest files are placed first, each into the
+    first iteration with room left. A file larger than an iteration gets one
+    of its own.
+    
+    Args:
+        manifest: Entries from _request_manifest()
+        budget: Completion tokens per iteration
+        
+    Returns:
+        list: Iteration dicts (name, focus, max_files, files, estimated_tokens)
+    """
+    capacity = max(1, int((budget - RESPONSE_OVERHEAD_TOKENS) * PACKING_HEADROOM))
+    bins = []
+    for entry in sorted(manifest, key=estimate_tokens, reverse=True):
+        tokens = estimate_tokens(entry)
+        target = next((b for b in bins if b["estimated_tokens"] + tokens <= capacity), None)
+        if target is None:
+            target = {"files": [], "estimated_tokens": 0}
+            bins.append(target)
+        target["files"].append(entry)
+        target["estimated_tokens"] += tokens
+    
+    iterations = []
+    for b in bins:
+        paths = [entry["path"] for entry in b["files"]]
+        kinds = sorted({entry["kind"] for entry in b["files"]})
+        iterations.append({
+            "name": f"{', '.join(kinds).title()} Files",
+            "focus": ", ".join(paths),
+            "max_files": len(paths),
+            "files": b["files"],
+            "estimated_tokens": b["estimated_tokens"]
+        })
+    return iterations
+
+
+def _invoke_planned_iterations(plan, agent_instructions, adrs, technical_spec, design_spec, feature_id,
+                               planned_paths, generated_files, iteration_offset=0, error_context=None):
+    """
+    Run planned iterations concurrently, at most MAX_PARALLEL_ITERATIONS at a time.
+    
+    Each iteration is told which files the others generate, so imports line up
+    without waiting for them. Each call runs in a copy of the current context,
+    so its usage iteration and trace span stay its own.
+    
+    Returns:
+        list: Iteration results in plan order (None for an iteration that raised)
+    """
+    total = iteration_offset + len(plan)
+    with span("dev.iterations", iterations=len(plan)):
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_ITERATIONS, len(plan))),
+                                thread_name_prefix="dev-iteration") as executor:
+            futures = []
+            for i, iteration in enumerate(plan, iteration_offset + 1):
+                print(f"\n📦 Iteration {i}/{total}: {iteration['name']} (~{iteration['estimated_tokens']:,} tokens)")
+                for entry in iteration["files"]:
+                    print(f"   - {entry['path']} (~{entry['estimated_lines']} lines)")
+                if iteration["estimated_tokens"] > OUTPUT_TOKEN_BUDGET - RESPONSE_OVERHEAD_TOKENS:
+                    print(f"   ⚠️  Estimated above the {OUTPUT_TOKEN_BUDGET:,} token budget; may need truncation recovery")
+                own = {entry["path"] for entry in iteration["files"]}
+                others = list(dict.fromkeys(
+                    [path for path in generated_files if path not in own]
+                    + [path for path in planned_paths if path not in own]
+                ))
+                futures.append(executor.submit(
+                    contextvars.copy_context().run, _invoke_iteration,
+                    agent_instructions, adrs, technical_spec, design_spec, feature_id,
+                    iteration, others, i, total, error_context
+                ))
+            
+            results = []
+            for i, future in enumerate(futures, iteration_offset + 1):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"   ⚠️  Iteration {i} failed: {e}")
+                    results.append(None)
+            return results
+
+
 def _invoke_iteration(agent_instructions, adrs, technical_spec, design_spec, 
                      feature_id, iteration, generated_files, iteration_num, total_iterations, error_context=None):
-    """Execute a single iteration of dev work."""
+    """
+    Execute a single iteration of dev work.
+    
+    Raises:
+        Exception: If the model call fails; callers skip the iteration (and
+            planned files it did not return are retried in the next round)
+    """
+    set_usage_context(iteration=iteration_num)
     
     generated_list = "\n".join([f"- {f}" for f in generated_files]) if generated_files else "None yet"
     
+    # Planned iterations name their files; the listed files come from the other iterations
+    generated_heading = "Files Generated by Other Iterations" if iteration.get("files") else "Files Already Generated"
+    file_plan = ""
+    if iteration.get("files"):
+        file_plan = "\n## Files to Generate\n" + "\n".join(
+            f"- {entry['path']} ({entry['kind']}, ~{entry['estimated_lines']} lines): {entry['description']}"
+            for entry in iteration["files"]
+        ) + "\n\nPut test files in tests_created and documentation in documentation_updates.\n"
+    
     error_context_prompt = ""
     if error_context:
         error_context_prompt = f"""
@@ -242,8 +575,15 @@ Error Details:
 - Ensuring fixes align with original architecture
 - Making any necessary adjustments
 - Validating the implementation is now complete and correct
+
+### Affected Files
+{error_context.get('affected_files', '[No repository files referenced in the error log]')}
+
+### Changing Existing Files
+{PATCH_FORMAT_INSTRUCTIONS}
 """
     
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are the Dev Agent in iteration {iteration_num} of {total_iterations}.
@@ -253,8 +593,8 @@ You are the Dev Agent in iteration {iteration_num} of {total_iterations}.
 
 **Focus**: {iteration['focus']}
 **Max Files**: Generate UP TO {iteration['max_files']} files (can be fewer)
-
-## Files Already Generated
+{file_plan}
+## {generated_heading}
 {generated_list}
 
 ## Rules for This Iteration
@@ -317,49 +657,71 @@ Skip files already generated:
 - Maximum {iteration['max_files']} files
 - Return empty arrays if no files match this iteration's focus
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API
+    return route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
+
+
+def _request_full_content(agent_instructions, feature_id, failures):
+    """Ask for the complete content of files whose edits could not be applied."""
+    previous_iteration = usage_context().get("iteration")
+    set_usage_context(iteration="full_content")
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
-        
-        return result
-        
+        return _full_content_response(agent_instructions, feature_id, failures)
+    finally:
+        set_usage_context(iteration=previous_iteration)
+
+
+def _full_content_response(agent_instructions, feature_id, failures):
+    """Build and send the full content request (see _request_full_content)."""
+    listing = "\n".join(f"- {failure['path']}: {failure['error']}" for failure in failures)
+    prompt_span = start_span("prompt.assemble")
+    system_prompt = f"""{agent_instructions}
+
+You are the Dev Agent. Some of your edits could not be applied to the current files.
+"""
+    user_prompt = f"""# Dev Agent - Full Content Request
+
+## Feature ID
+{feature_id}
+
+## Edits That Could Not Be Applied
+{listing}
+
+Return JSON with files_created containing ONLY these files, each with its complete
+new content in "content" (no edits):
+
+```json
+{{"files_created": [{{"path": "path/to/file", "description": "Purpose", "content": "Escaped content"}}], "tests_created": []}}
+```
+"""
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
+    try:
+        result = route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
     except Exception as e:
-        print(f"Error in iteration: {e}", file=sys.stderr)
-        # Return empty result to continue
-        return {
-            "implementation_summary": f"Iteration failed: {e}",
-            "files_created": [],
-            "tests_created": [],
-            "documentation_updates": [],
-            "quality_checklist": {},
-            "technical_debt": [],
-            "next_steps": ""
-        }
-
-
-def _invoke_openai(system_prompt, user_prompt):
+        print(f"Error requesting full content: {e}", file=sys.stderr)
+        return []
+    return (result.get("files_created") or []) + (result.get("tests_created") or [])
+
+
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL, max_tokens=OUTPUT_TOKEN_BUDGET):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
         temperature=float(os.getenv("TEMPERATURE", "0.7")),
-        max_tokens=8192,
+        max_tokens=max_tokens,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -367,16 +729,13 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL, max_tokens=OUTPUT_TOKEN_BUDGET,
+                   response_schema=DevAgentResponse):
     """Invoke Google Gemini API with schema validation and retry logic."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     combined_prompt = f"{system_prompt}\n\n---\n\n{user_prompt}"
     
@@ -386,31 +745,39 @@ def _invoke_gemini(system_prompt, user_prompt):
     
     for attempt in range(max_retries):
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
-                    max_output_tokens=8192,
+                    max_output_tokens=max_tokens,
                     response_mime_type='application/json',
-                    response_schema=DevAgentResponse  # ✨ Schema validation!
+                    response_schema=response_schema  # ✨ Schema validation!
                 )
             )
+            record_usage(response, model, started)
             
             # Use validated, parsed response
             parsed = response.parsed
+            if response_schema is not DevAgentResponse:
+                return parsed.model_dump()
             
             # Convert Pydantic models to dicts
             impl_files = [{
                 "path": f.path,
                 "content": f.content,
-                "description": f.description
+                "description": f.description,
+                "base_hash": f.base_hash,
+                "edits": [{"search": e.search, "replace": e.replace} for e in f.edits or []]
             } for f in parsed.implementation_files]
             
             test_files = [{
                 "path": f.path,
                 "content": f.content,
-                "description": f.description
+                "description": f.description,
+                "base_hash": f.base_hash,
+                "edits": [{"search": e.search, "replace": e.replace} for e in f.edits or []]
             } for f in parsed.test_files]
             
             build_cmds = {
@@ -443,16 +810,18 @@ def _invoke_gemini(system_prompt, user_prompt):
                 # Schema validation failed or other error, use fallback
                 print(f"⚠️  Schema validation failed, retrying without schema: {e}")
                 try:
+                    started = time.monotonic()
                     response = client.models.generate_content(
-                        model=MODEL,
+                        model=model,
                         contents=combined_prompt,
                         config=types.GenerateContentConfig(
                             temperature=float(os.getenv("TEMPERATURE", "0.7")),
-                            max_output_tokens=8192,
+                            max_output_tokens=max_tokens,
                             response_mime_type='application/json'
                             # No schema validation
                         )
                     )
+                    record_usage(response, model, started)
                     return parse_json_with_recovery(
                         response.text,
                         error_prefix="dev_iteration_error"
@@ -493,43 +862,52 @@ def main():
     tests_created = result.get('tests_created', [])
     
     if not files_created and not tests_created:
-        print(f"\n⚠️  WARNING: No files generated!")
+        if not result.get("_no_changes_needed"):
+            print(f"\n⚠️  WARNING: No files generated!")
+            sys.exit(1)
+        print(f"\n✅ No further changes needed: the applied fixes are complete")
+    
+    # Stage every output, then write them to the repo in one batch
+    batch = OutputBatch(REPO_ROOT)
+    outputs = []
+    try:
+        for file_info in files_created:
+            outputs.append(("Created", batch.add(file_info['path'], file_info['content'])))
+    
+        for test_info in tests_created:
+            outputs.append(("Created test", batch.add(test_info['path'], test_info['content'])))
+    
+        for doc_info in result.get('documentation_updates', []):
+            outputs.append(("Updated docs", batch.add(doc_info['path'], doc_info['content'])))
+    
+        # Save build commands for pipeline automation
+        if result.get('build_commands'):
+            build_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.build.json"
+            outputs.append(("Saved build commands", batch.add(build_file, json.dumps(result['build_commands'], indent=2))))
+    
+        # Update pipeline state
+        state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
+        if state_file.exists():
+            state_content = load_file(state_file)
+            state_content = state_content.replace('status: architect_approved', 'status: dev_awaiting_approval')
+            state_content = state_content.replace('dev: pending', 'dev: in-progress')
+            outputs.append(("Updated pipeline state", batch.add(state_file, state_content)))
+        
+        stats = batch.commit()
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to write outputs (repository left unchanged): {e}")
         sys.exit(1)
     
-    # Create all files
-    for file_info in files_created:
-        filepath = REPO_ROOT / file_info['path']
-        save_file(filepath, file_info['content'])
-        print(f"  ✓ Created: {file_info['path']}")
+    # Consumed once build validation accepts the output (see the dev job in pipeline.yml)
+    mark_pending(REPO_ROOT / "design/wireframes" / f"{feature_id}.json", "dev", result.get("wireframe_version"))
     
-    for test_info in tests_created:
-        filepath = REPO_ROOT / test_info['path']
-        save_file(filepath, test_info['content'])
-        print(f"  ✓ Created test: {test_info['path']}")
+    for label, path in outputs:
+        suffix = " (unchanged)" if path in stats['skipped'] else ""
+        print(f"  ✓ {label}: {path.relative_to(REPO_ROOT)}{suffix}")
     
     if files_created or tests_created:
         print(f"\n📦 Generated {len(files_created)} files and {len(tests_created)} tests")
-    
-    # Update documentation
-    for doc_info in result.get('documentation_updates', []):
-        filepath = REPO_ROOT / doc_info['path']
-        save_file(filepath, doc_info['content'])
-        print(f"  ✓ Updated docs: {doc_info['path']}")
-    
-    # Save build commands for pipeline automation
-    if result.get('build_commands'):
-        build_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.build.json"
-        save_file(build_file, json.dumps(result['build_commands'], indent=2))
-        print(f"  ✓ Saved build commands: {build_file.relative_to(REPO_ROOT)}")
-    
-    # Update pipeline state
-    state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
-    if state_file.exists():
-        state_content = load_file(state_file)
-        state_content = state_content.replace('status: architect_approved', 'status: dev_awaiting_approval')
-        state_content = state_content.replace('dev: pending', 'dev: in-progress')
-        save_file(state_file, state_content)
-        print(f"  ✓ Updated pipeline state")
+    print(f"💾 Wrote {len(stats['written'])} files ({format_bytes(stats['bytes_written'])}), {len(stats['skipped'])} unchanged")
     
     print(f"\n📋 Quality Checklist:")
     checklist = result.get('quality_checklist', {})
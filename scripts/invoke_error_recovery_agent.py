@@ -7,10 +7,27 @@ Analyzes pipeline errors and implements automatic fixes.
 import os
 import sys
 import json
+import time
 import re
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
+from error_context import build_error_context
+from error_fingerprint import find_fix, fingerprint_error, mark_reused, record_fix
+from fix_validator import format_failures, validate_fixes
+from patch_apply import PATCH_FORMAT_INSTRUCTIONS, resolve_with_fallback
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from output_writer import OutputBatch, format_bytes
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 
@@ -18,10 +35,17 @@ from typing import List, Dict, Optional
 load_dotenv()
 
 # Pydantic Models for Schema Validation
+class SearchReplace(BaseModel):
+    """One search/replace edit within a file."""
+    search: str
+    replace: str
+
 class FileInfo(BaseModel):
-    """Single file information."""
+    """Single file change: full content, or edits against base_hash."""
     path: str
-    content: str
+    content: Optional[str] = None
+    base_hash: Optional[str] = None
+    edits: Optional[List[SearchReplace]] = None
 
 class ErrorRecoveryResponse(BaseModel):
     """Type-safe response structure for Error Recovery Agent."""
@@ -37,10 +61,16 @@ MODEL = os.getenv("MODEL", "gpt-4.1")
 AI_PROVIDER = os.getenv("AI_PROVIDER", "openai")
 REPO_ROOT = Path(__file__).parent.parent
 AGENT_FILE = REPO_ROOT / ".ai/agents/error-recovery.md"
+# Extra model rounds allowed when proposed fixes fail local validation
+MAX_FIX_ROUNDS = int(os.getenv("MAX_FIX_ROUNDS", "2"))
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -48,22 +78,14 @@ def load_file(filepath):
         return f"[File not found: {filepath}]"
 
 
-def save_file(filepath, content):
-    """Save content to a file."""
-    filepath = Path(filepath)
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    import openai
-    
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -71,6 +93,7 @@ def _invoke_openai(system_prompt, user_prompt):
         temperature=0.3,  # Lower temperature for more deterministic fixes
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -78,22 +101,19 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    from google import genai
     from google.genai import types
     
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found")
-    
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     combined_prompt = f"{system_prompt}\n\n---\n\n{user_prompt}"
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=0.3,  # Lower temperature for deterministic fixes
@@ -101,6 +121,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=ErrorRecoveryResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -108,7 +129,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         # Convert Pydantic models to dicts
         file_fixes = [{
             "path": f.path,
-            "content": f.content
+            "content": f.content,
+            "base_hash": f.base_hash,
+            "edits": [{"search": e.search, "replace": e.replace} for e in f.edits or []]
         } for f in parsed.file_fixes]
         
         return {
@@ -124,8 +147,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=0.3,
@@ -133,6 +157,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="error_recovery_agent_error"
@@ -141,6 +166,142 @@ def _invoke_gemini(system_prompt, user_prompt):
             raise Exception(f"Both schema validation and fallback failed: {e}, {fallback_error}")
 
 
+def _invoke_model(system_prompt, user_prompt):
+    """Invoke the configured AI provider."""
+    return route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
+
+
+def resolve_fixes(system_prompt, result):
+    """
+    Turn edit-style file fixes into full file content.
+
+    Patches that no longer apply (stale base_hash, ambiguous search block) are
+    re-requested from the model as full content for just those files.
+
+    Returns:
+        dict: result with every file_fixes entry carrying full content
+    """
+    def request_full_content(failures):
+        listing = "\n".join(f"- {failure['path']}: {failure['error']}" for failure in failures)
+        response = _invoke_model(system_prompt, f"""# Full Content Request
+
+These edits from your fix could not be applied:
+
+{listing}
+
+Fix strategy: {result.get('fix_strategy', 'N/A')}
+
+Return the same JSON format with file_fixes containing ONLY these files, each with
+its complete new content in "content" (no edits).
+""")
+        return response.get("file_fixes") or []
+
+    result["file_fixes"] = resolve_with_fallback(result.get("file_fixes") or [], request_full_content, REPO_ROOT)
+    return result
+
+
+def validate_and_retry(system_prompt, user_prompt, result):
+    """
+    Validate proposed fixes locally and ask the model to correct failures.
+
+    Fixes are applied to a scratch copy of the repository and checked there
+    (see fix_validator.py). Failures are sent back to the model for up to
+    MAX_FIX_ROUNDS more attempts.
+
+    Returns:
+        dict: The last result, with a "local_validation" summary added
+    """
+    failures = validate_fixes(result.get("file_fixes") or [])
+    rounds = 0
+    while failures and rounds < MAX_FIX_ROUNDS:
+        rounds += 1
+        set_usage_context(iteration=rounds + 1)
+        print(f"🔁 {len(failures)} local checks failed, asking for a corrected fix (round {rounds}/{MAX_FIX_ROUNDS})")
+        retry_prompt = f"""{user_prompt}
+
+## Previous Attempt Failed Local Validation
+
+Your previous fix was applied to a scratch copy of the repository and failed these checks:
+
+{format_failures(failures)}
+
+Previous fix strategy: {result.get('fix_strategy', 'N/A')}
+Previously changed files: {', '.join(f['path'] for f in result.get('file_fixes') or [])}
+
+Return a corrected response in the same JSON format. Edits are applied to the
+original repository files (the base_hash values above), not to your previous attempt.
+"""
+        result = resolve_fixes(system_prompt, _invoke_model(system_prompt, retry_prompt))
+        failures = validate_fixes(result.get("file_fixes") or [])
+
+    result["local_validation"] = {
+        "passed": not failures,
+        "retries": rounds,
+        "failures": failures,
+    }
+    if failures:
+        print(f"⚠️  Fix still fails {len(failures)} local checks after {rounds} retries; flagging for human review")
+        result["requires_human_review"] = True
+    elif result.get("file_fixes"):
+        suffix = f" after {rounds} retries" if rounds else ""
+        print(f"✅ Fix passed local validation{suffix}")
+    return result
+
+
+def reuse_known_fix(error_id, fingerprint):
+    """
+    Re-apply the stored fix for a recurring error without calling the model.
+
+    The stored fix is resolved against the current files and must still pass
+    local validation; otherwise the model is consulted as usual.
+
+    Returns:
+        dict: A result in the usual shape, or None on a cache miss
+    """
+    entry, fixes = find_fix(fingerprint)
+    if entry is None:
+        return None
+    print(f"♻️  Known error {fingerprint} (fixed before in {entry['error_id']}), re-applying stored fix")
+    failures = validate_fixes(fixes)
+    if failures:
+        print(f"⚠️  Stored fix fails {len(failures)} local checks now, asking the model instead")
+        return None
+    mark_reused(fingerprint, error_id)
+
+    changed = "\n".join(f"- `{fix['path']}`" for fix in fixes)
+    return {
+        "error_analysis": f"Recurring error matching fingerprint {fingerprint}, previously fixed in {entry['error_id']}.",
+        "root_cause": entry.get("root_cause", ""),
+        "fix_strategy": f"Re-applied the validated fix from {entry['error_id']}. {entry.get('fix_strategy', '')}".strip(),
+        "file_fixes": fixes,
+        "confidence": "high",
+        "requires_human_review": False,
+        "reused_fix": {"fingerprint": fingerprint, "error_id": entry["error_id"]},
+        "local_validation": {"passed": True, "retries": 0, "failures": []},
+        "issue_update": f"""## ♻️ Recurring Error
+
+This failure matches fingerprint `{fingerprint}`, fixed before in `{entry['error_id']}`.
+The stored fix was re-applied and passed local validation; no model call was made.
+
+**Root cause:** {entry.get('root_cause', 'N/A')}
+
+**Files changed:**
+{changed}
+""",
+        "pr_description": f"""## ♻️ Re-applied fix for a recurring error
+
+Fingerprint `{fingerprint}` (first fixed in `{entry['error_id']}`).
+
+**Root cause:** {entry.get('root_cause', 'N/A')}
+
+**Fix strategy:** {entry.get('fix_strategy', 'N/A')}
+
+**Files changed:**
+{changed}
+""",
+    }
+
+
 def extract_error_from_issue(issue_body):
     """Extract error log from issue body."""
     # Look for error log section
@@ -150,24 +311,29 @@ def extract_error_from_issue(issue_body):
     return issue_body
 
 
-def invoke_error_recovery_agent(error_id, issue_body):
+def analyze_error(error_id, error_log, fingerprint, fingerprint_details):
     """
-    Invoke the Error Recovery Agent to analyze and fix errors.
+    Ask the model for a fix, validate it locally and remember it if it passes.
     
     Args:
         error_id: Unique identifier for this error
-        issue_body: The GitHub issue body containing error details
+        error_log: The extracted error log
+        fingerprint: Fingerprint of the error log
+        fingerprint_details: Details returned by fingerprint_error()
     
     Returns:
-        dict with analysis, fix details, and updates
+        dict: The validated result
     """
     # Load agent instructions
     agent_instructions = load_file(AGENT_FILE)
     
-    # Extract error log
-    error_log = extract_error_from_issue(issue_body)
+    # Load the code around every file:line the log points at
+    affected_files, affected_paths = build_error_context(error_log)
+    if affected_paths:
+        print(f"📎 Loaded context from {len(affected_paths)} files: {', '.join(affected_paths)}")
     
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Error Recovery Agent in the AID pipeline.
@@ -184,6 +350,13 @@ Output MUST be valid JSON.
 ## Error Log
 {error_log}
 
+## Affected Files
+Excerpts of the repository files referenced in the error log. Lines marked `>>`
+are the ones the log points at. Base your fix on this code; do not guess at
+file contents that are not shown.
+
+{affected_files}
+
 ## Repository Context
 Repository Root: {REPO_ROOT}
 
@@ -196,12 +369,12 @@ Repository Root: {REPO_ROOT}
    - Affected file(s) and line number(s)
    - Root cause
 
-2. Read the affected files using the context above
+2. Read the affected files in the "Affected Files" section above
 
 3. Determine the minimal fix required
 
 4. Generate the complete fix including:
-   - File modifications (with full new content)
+   - File modifications in file_fixes (edits or full content, see below)
    - Additional actions needed
    - Validation steps
 
@@ -211,47 +384,93 @@ Repository Root: {REPO_ROOT}
 
 Provide your response in JSON format following the schema in your instructions.
 Include all required keys: analysis, fix, validation, issue_update, pr_description
+
+### file_fixes
+
+{PATCH_FORMAT_INSTRUCTIONS}
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
-    # Invoke AI API
+    print(f"🤖 Analyzing error with {AI_PROVIDER.upper()} ({MODEL})...")
+    result = resolve_fixes(system_prompt, _invoke_model(system_prompt, user_prompt))
+    result = validate_and_retry(system_prompt, user_prompt, result)
+    
+    # Remember validated fixes; must happen before the fixes overwrite the failing files
+    if result["local_validation"]["passed"] and result.get("file_fixes"):
+        record_fix(fingerprint, fingerprint_details, error_id, result)
+        print(f"🔑 Stored fix under fingerprint {fingerprint}")
+    return result
+
+
+def invoke_error_recovery_agent(error_id, issue_body):
+    """
+    Invoke the Error Recovery Agent to analyze and fix errors.
+    
+    Args:
+        error_id: Unique identifier for this error
+        issue_body: The GitHub issue body containing error details
+    
+    Returns:
+        dict with analysis, fix details, and updates
+    """
+    set_usage_context(feature_id=error_id, iteration=1)
+    
+    # Extract error log
+    error_log = extract_error_from_issue(issue_body)
+    fingerprint, fingerprint_details = fingerprint_error(error_log)
+    
     try:
-        print(f"🤖 Analyzing error with {AI_PROVIDER.upper()} ({MODEL})...")
+        # Recurring failures are fixed from the fingerprint index before any context is loaded
+        result = reuse_known_fix(error_id, fingerprint)
+        if result is None:
+            result = analyze_error(error_id, error_log, fingerprint, fingerprint_details)
+        result["fingerprint"] = fingerprint
         
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
-        
-        # Save outputs
+        # Stage analysis, docs and fixes, then write them to the repo in one batch
         output_dir = REPO_ROOT / ".ai" / "error-fixes"
-        output_dir.mkdir(parents=True, exist_ok=True)
+        batch = OutputBatch(REPO_ROOT)
+        try:
+            # Save analysis
+            batch.add(output_dir / f"{error_id}-analysis.json", json.dumps(result, indent=2))
         
-        # Save analysis
-        save_file(output_dir / f"{error_id}-analysis.json", json.dumps(result, indent=2))
+            # Save issue update
+            if "issue_update" in result:
+                batch.add(output_dir / f"{error_id}-issue-update.md", result["issue_update"])
         
-        # Save issue update
-        if "issue_update" in result:
-            save_file(output_dir / f"{error_id}-issue-update.md", result["issue_update"])
+            # Save PR description
+            if "pr_description" in result:
+                batch.add(output_dir / f"{error_id}-pr-description.md", result["pr_description"])
         
-        # Save PR description
-        if "pr_description" in result:
-            save_file(output_dir / f"{error_id}-pr-description.md", result["pr_description"])
+            # Apply file fixes; a fix that fails local validation is only saved as a proposal for review
+            result["fixes_applied"] = bool(result.get("file_fixes")) and result["local_validation"]["passed"]
+            if result["fixes_applied"]:
+                for file_fix in result["file_fixes"]:
+                    print(f"✏️  Applying fix to {file_fix['path']}")
+                    batch.add(file_fix["path"], file_fix["content"])
+            elif result.get("file_fixes"):
+                proposal_path = output_dir / f"{error_id}-proposed-fixes.json"
+                batch.add(proposal_path, json.dumps({
+                    "file_fixes": result["file_fixes"],
+                    "failures": result["local_validation"]["failures"],
+                }, indent=2))
+                print(f"📝 Fix not applied (fails local validation); proposal saved to {proposal_path.relative_to(REPO_ROOT)}")
         
-        # Apply file fixes
-        if result.get("file_fixes"):
-            for file_fix in result["file_fixes"]:
-                file_path = REPO_ROOT / file_fix["path"]
-                print(f"✏️  Applying fix to {file_fix['path']}")
-                save_file(file_path, file_fix["content"])
+            stats = batch.commit()
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to write outputs (repository left unchanged): {e}")
+            sys.exit(1)
+        
+        print(f"💾 Wrote {len(stats['written'])} files ({format_bytes(stats['bytes_written'])}), {len(stats['skipped'])} unchanged")
         
-        print("✅ Error analysis and fix complete!")
+        print("✅ Error analysis and fix complete!" if result["fixes_applied"] or not result.get("file_fixes")
+              else "⚠️  Error analysis complete; the proposed fix needs human review")
         print(f"\nError Analysis: {result.get('error_analysis', 'N/A')}")
         print(f"Root Cause: {result.get('root_cause', 'N/A')}")
         print(f"Fix Strategy: {result.get('fix_strategy', 'N/A')}")
         print(f"Confidence: {result.get('confidence', 'N/A')}")
         
-        if result.get("file_fixes"):
-            print(f"\nFixed Files:")
+        if result["fixes_applied"]:
+            print("\nFixed Files:")
             for file_fix in result["file_fixes"]:
                 print(f"  - {file_fix['path']}")
         
@@ -8,10 +8,23 @@ Based on SE GitOps/CI Specialist - makes deployments boring and reliable.
 import os
 import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from output_writer import OutputBatch, format_bytes
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
@@ -40,8 +53,12 @@ REPO_ROOT = Path(__file__).parent.parent
 AGENT_FILE = REPO_ROOT / ".ai/agents/ops.md"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -49,13 +66,6 @@ def load_file(filepath):
         return f"[File not found: {filepath}]"
 
 
-def save_file(filepath, content):
-    """Save content to a file."""
-    filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-
 def invoke_ops_agent(feature_id):
     """
     Invoke the Ops Agent to create deployment configurations and CI/CD updates.
@@ -66,6 +76,7 @@ def invoke_ops_agent(feature_id):
     Returns:
         dict: Results including deployment configs and monitoring setup
     """
+    set_usage_context(feature_id=feature_id)
     print("Invoking Ops Agent...")
     
     # Load agent instructions
@@ -98,6 +109,7 @@ Build reliable CI/CD pipelines, ensure safe deployments, focus on automation, mo
     existing_configs = "\n".join([f"- {wf.name}" for wf in existing_workflows])
     
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Ops Agent in the AID pipeline.
@@ -218,13 +230,11 @@ Remember:
 - Document for 3AM debugging scenarios
 - Security first, always
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API based on provider
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
+        result = route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
         
         return result
         
@@ -233,17 +243,14 @@ Remember:
         raise
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -252,6 +259,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=8000,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -259,16 +267,12 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API with schema validation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     # Combine system and user prompts for Gemini
     combined_prompt = f"""{system_prompt}
@@ -278,8 +282,9 @@ def _invoke_gemini(system_prompt, user_prompt):
 {user_prompt}"""
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -288,6 +293,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=OpsAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -317,8 +323,9 @@ def _invoke_gemini(system_prompt, user_prompt):
         print(f"⚠️  Schema validation failed: {e}")
         # Try without schema validation as fallback
         try:
+            started = time.monotonic()
             response = client.models.generate_content(
-                model=MODEL,
+                model=model,
                 contents=combined_prompt,
                 config=types.GenerateContentConfig(
                     temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -327,6 +334,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                     # No schema validation
                 )
             )
+            record_usage(response, model, started)
             return parse_json_with_recovery(
                 response.text,
                 error_prefix="ops_agent_error"
@@ -360,38 +368,45 @@ def main():
     print(f"\nDeployment Summary:")
     print(result.get('deployment_summary', 'No summary provided'))
     
-    # Create deployment config files
-    for file_info in result.get('deployment_configs', []):
-        filepath = REPO_ROOT / file_info['path']
-        save_file(filepath, file_info['content'])
-        print(f"  ✓ Created: {file_info['path']}")
+    # Stage every output, then write them to the repo in one batch
+    batch = OutputBatch(REPO_ROOT)
+    outputs = []
+    try:
+        # Create deployment config files
+        for file_info in result.get('deployment_configs', []):
+            outputs.append(("Created", batch.add(file_info['path'], file_info['content'])))
+    
+        # Create/update CI workflow files
+        for file_info in result.get('ci_updates', []):
+            outputs.append(("Updated CI", batch.add(file_info['path'], file_info['content'])))
     
-    # Create/update CI workflow files
-    for file_info in result.get('ci_updates', []):
-        filepath = REPO_ROOT / file_info['path']
-        save_file(filepath, file_info['content'])
-        print(f"  ✓ Updated CI: {file_info['path']}")
+        # Save monitoring setup documentation
+        if result.get('monitoring_setup'):
+            monitoring_path = REPO_ROOT / "docs" / f"monitoring-{feature_id}.md"
+            outputs.append(("Created monitoring docs", batch.add(monitoring_path, result['monitoring_setup'])))
     
-    # Save monitoring setup documentation
-    if result.get('monitoring_setup'):
-        monitoring_path = REPO_ROOT / "docs" / f"monitoring-{feature_id}.md"
-        save_file(monitoring_path, result['monitoring_setup'])
-        print(f"  ✓ Created monitoring docs: {monitoring_path.relative_to(REPO_ROOT)}")
+        # Save rollback plan
+        if result.get('rollback_plan'):
+            rollback_path = REPO_ROOT / "docs" / f"rollback-{feature_id}.md"
+            outputs.append(("Created rollback plan", batch.add(rollback_path, result['rollback_plan'])))
     
-    # Save rollback plan
-    if result.get('rollback_plan'):
-        rollback_path = REPO_ROOT / "docs" / f"rollback-{feature_id}.md"
-        save_file(rollback_path, result['rollback_plan'])
-        print(f"  ✓ Created rollback plan: {rollback_path.relative_to(REPO_ROOT)}")
+        # Update pipeline state
+        state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
+        if state_file.exists():
+            state_content = load_file(state_file)
+            state_content = state_content.replace('status: dev_approved', 'status: ops_awaiting_approval')
+            state_content = state_content.replace('ops: pending', 'ops: in-progress')
+            outputs.append(("Updated pipeline state", batch.add(state_file, state_content)))
+        
+        stats = batch.commit()
+    except (OSError, ValueError) as e:
+        print(f"❌ Failed to write outputs (repository left unchanged): {e}")
+        sys.exit(1)
     
-    # Update pipeline state
-    state_file = REPO_ROOT / ".ai/pipeline" / f"{feature_id}.state"
-    if state_file.exists():
-        state_content = load_file(state_file)
-        state_content = state_content.replace('status: dev_approved', 'status: ops_awaiting_approval')
-        state_content = state_content.replace('ops: pending', 'ops: in-progress')
-        save_file(state_file, state_content)
-        print(f"  ✓ Updated pipeline state")
+    for label, path in outputs:
+        suffix = " (unchanged)" if path in stats['skipped'] else ""
+        print(f"  ✓ {label}: {path.relative_to(REPO_ROOT)}{suffix}")
+    print(f"💾 Wrote {len(stats['written'])} files ({format_bytes(stats['bytes_written'])}), {len(stats['skipped'])} unchanged")
     
     print(f"\n✅ Ops Agent execution complete!")
     print(f"\n📋 Deliverables:")
@@ -7,10 +7,25 @@ Invokes the Product Agent using AI models (OpenAI GPT-4.1 or Google Gemini 2.5 P
 import os
 import sys
 import json
+import time
 from datetime import datetime
 from pathlib import Path
+
+if __name__ == "__main__":
+    # Run in the warm agent worker if one is up; returns here to start cold otherwise
+    from agent_worker import forward_to_worker
+    forward_to_worker(__file__)
+
 from dotenv import load_dotenv
 from json_fixer import parse_json_with_recovery
+from tracing import file_attributes, prompt_attributes, start_span, text_attributes, traced
+from usage_ledger import record_usage, set_usage_context
+from replay_provider import gemini_client, openai_client
+from provider_router import route
+from prefetch import prefetched_text
+from journal import append_markdown, compare_and_swap, file_hash
+from feedback_index import select_entries, format_entries, mark_processed
+from knowledge_index import context_for
 from pydantic import BaseModel
 from typing import Optional
 
@@ -38,8 +53,12 @@ DECISION_RULES = REPO_ROOT / ".ai/workflows/decision-rules.md"
 CHANGE_INTAKE = REPO_ROOT / ".ai/workflows/change-intake.md"
 
 
+@traced("context.load_file", args_attributes=file_attributes, result_attributes=text_attributes)
 def load_file(filepath):
     """Load content from a file."""
+    prefetched = prefetched_text(filepath)
+    if prefetched is not None:
+        return prefetched
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             return f.read()
@@ -65,16 +84,23 @@ def invoke_product_agent(feature_id, feedback_context=""):
     Returns:
         dict with decision_record, experiment_update, github_issue, belief_update
     """
+    set_usage_context(feature_id=feature_id)
     # Load agent instructions
     agent_instructions = load_file(AGENT_FILE)
     
-    # Load context files
-    feedback = load_file(FEEDBACK_INBOX)
+    # Load context files (only unprocessed, relevant inbox entries)
+    preamble, feedback_entries, total_entries = select_entries(feature_id, feedback_context, inbox_path=FEEDBACK_INBOX)
+    feedback = format_entries(preamble, feedback_entries, total_entries)
+    print(f"📥 Feedback: {len(feedback_entries)} of {total_entries} inbox entries selected")
     beliefs = load_file(BELIEFS_FILE)
-    decision_rules = load_file(DECISION_RULES)
-    change_intake = load_file(CHANGE_INTAKE)
+    
+    # Shared workflow docs: whole while small, top-k relevant sections once they grow
+    query = f"{feature_id} {feedback_context} {feedback}"
+    decision_rules = context_for(query, [DECISION_RULES]) or load_file(DECISION_RULES)
+    change_intake = context_for(query, [CHANGE_INTAKE]) or load_file(CHANGE_INTAKE)
     
     # Construct the prompt
+    prompt_span = start_span("prompt.assemble")
     system_prompt = f"""{agent_instructions}
 
 You are now executing as the Product Agent in the AID pipeline.
@@ -89,7 +115,7 @@ Your task is to analyze the feedback and produce structured outputs according to
 
 ## Context Files
 
-### Current Feedback Inbox
+### Current Feedback Inbox (unprocessed entries)
 {feedback}
 
 ### Current Beliefs
@@ -146,13 +172,14 @@ Provide your response in JSON format with these keys:
 }}
 ```
 """
+    prompt_span.end(chars=len(system_prompt) + len(user_prompt))
 
     # Invoke AI API based on provider
     try:
-        if AI_PROVIDER == "gemini":
-            result = _invoke_gemini(system_prompt, user_prompt)
-        else:
-            result = _invoke_openai(system_prompt, user_prompt)
+        result = route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
+        
+        # Remember which inbox entries this run covered
+        result["feedback_entry_ids"] = [entry["id"] for entry in feedback_entries]
         
         return result
         
@@ -161,17 +188,14 @@ Provide your response in JSON format with these keys:
         raise
 
 
-def _invoke_openai(system_prompt, user_prompt):
+@traced("model.openai", args_attributes=prompt_attributes)
+def _invoke_openai(system_prompt, user_prompt, model=MODEL):
     """Invoke OpenAI API."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    import openai
-    client = openai.OpenAI(api_key=api_key)
+    client = openai_client()
     
+    started = time.monotonic()
     response = client.chat.completions.create(
-        model=MODEL,
+        model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -180,6 +204,7 @@ def _invoke_openai(system_prompt, user_prompt):
         max_tokens=4000,
         response_format={"type": "json_object"}
     )
+    record_usage(response, model, started)
     
     return parse_json_with_recovery(
         response.choices[0].message.content,
@@ -187,16 +212,12 @@ def _invoke_openai(system_prompt, user_prompt):
     )
 
 
-def _invoke_gemini(system_prompt, user_prompt):
+@traced("model.gemini", args_attributes=prompt_attributes)
+def _invoke_gemini(system_prompt, user_prompt, model=MODEL):
     """Invoke Google Gemini API."""
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
-    
-    from google import genai
     from google.genai import types
     
-    client = genai.Client(api_key=api_key)
+    client = gemini_client()
     
     # Combine system and user prompts for Gemini
     combined_prompt = f"""{system_prompt}
@@ -206,8 +227,9 @@ def _invoke_gemini(system_prompt, user_prompt):
 {user_prompt}"""
     
     try:
+        started = time.monotonic()
         response = client.models.generate_content(
-            model=MODEL,
+            model=model,
             contents=combined_prompt,
             config=types.GenerateContentConfig(
                 temperature=float(os.getenv("TEMPERATURE", "0.7")),
@@ -216,6 +238,7 @@ def _invoke_gemini(system_prompt, user_prompt):
                 response_schema=ProductAgentResponse  # ✨ Schema validation!
             )
         )
+        record_usage(response, model, started)
         
         # Use validated, parsed response
         parsed = response.parsed
@@ -252,6 +275,9 @@ def main():
     print(f"🤖 Model: {MODEL}")
     print()
     
+    # Remember the beliefs this run is based on so a concurrent update is not clobbered
+    beliefs_hash = file_hash(BELIEFS_FILE)
+    
     # Invoke the agent
     try:
         result = invoke_product_agent(feature_id, feedback_context)
@@ -264,11 +290,9 @@ def main():
     save_file(decision_path, result["decision_record"])
     print(f"✅ Created decision record: {decision_path.relative_to(REPO_ROOT)}")
     
-    # Update experiments/active.md
+    # Update experiments/active.md (journaled append, safe under concurrent runs)
     experiments_path = REPO_ROOT / "experiments/active.md"
-    current_experiments = load_file(experiments_path)
-    updated_experiments = current_experiments.rstrip() + "\n\n" + result["experiment_update"]
-    save_file(experiments_path, updated_experiments)
+    append_markdown(experiments_path, result["experiment_update"], feature_id)
     print(f"✅ Updated experiments: {experiments_path.relative_to(REPO_ROOT)}")
     
     # Save GitHub issue content
@@ -279,8 +303,11 @@ def main():
     # Update beliefs if needed
     if result["belief_update"] != "NO_CHANGE":
         beliefs_path = REPO_ROOT / "product/beliefs/current.md"
-        save_file(beliefs_path, result["belief_update"])
-        print(f"✅ Updated beliefs: {beliefs_path.relative_to(REPO_ROOT)}")
+        if compare_and_swap(beliefs_path, result["belief_update"], beliefs_hash, feature_id):
+            print(f"✅ Updated beliefs: {beliefs_path.relative_to(REPO_ROOT)}")
+        else:
+            print("⚠️  Beliefs changed during this run - update journaled but not applied")
+            print(f"   Review: {beliefs_path.relative_to(REPO_ROOT)}.journal.jsonl")
     
     # Create pipeline state file
     needs_design = result.get("needs_design", True)
@@ -299,6 +326,10 @@ stages:
     save_file(state_path, state_content)
     print(f"✅ Created pipeline state: {state_path.relative_to(REPO_ROOT)}")
     
+    # Mark feedback entries as processed so later runs only see new feedback
+    mark_processed(result.get("feedback_entry_ids", []), feature_id)
+    print(f"✅ Marked {len(result.get('feedback_entry_ids', []))} feedback entries as processed")
+    
     # Print summary
     print()
     print("📋 Summary:")
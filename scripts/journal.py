@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Journal Utility
+Append-only JSONL journal for shared markdown state (experiments/active.md,
+product/beliefs/current.md). Every change is an O(1) locked append to
+<file>.journal.jsonl; the markdown file is a materialized view that can be
+re-rendered from the journal at any time.
+
+Usage:
+    python scripts/journal.py render experiments/active.md
+    python scripts/journal.py render product/beliefs/current.md --write
+"""
+
+import hashlib
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+
+def content_hash(text):
+    """Return a short content hash used for compare-and-swap."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def file_hash(path):
+    """Return content_hash() of a file as compare_and_swap() reads it (empty when missing)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return content_hash(f.read())
+    except FileNotFoundError:
+        return content_hash("")
+
+
+def journal_path_for(md_path):
+    """Return the journal file that backs a markdown file."""
+    md_path = Path(md_path)
+    return md_path.with_name(md_path.name + ".journal.jsonl")
+
+
+@contextmanager
+def locked(journal_path):
+    """
+    Hold an exclusive lock on a journal file.
+
+    Yields the journal opened for appending. Concurrent product runs block here
+    instead of interleaving their writes.
+    """
+    journal_path = Path(journal_path)
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(journal_path, 'a+', encoding='utf-8') as f:
+        if sys.platform == 'win32':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            f.seek(0, os.SEEK_END)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            if sys.platform == 'win32':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_record(handle, record):
+    """Append one record to an already-locked journal handle."""
+    record = {"ts": datetime.now().isoformat(timespec='seconds'), **record}
+    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+    return record
+
+
+def _ensure_snapshot(handle, md_path):
+    """
+    Seed an empty journal with the current markdown so render() is lossless.
+
+    Called with the journal lock held.
+    """
+    if handle.tell() > 0:
+        return
+    try:
+        with open(md_path, 'r', encoding='utf-8') as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = ""
+    _write_record(handle, {"op": "snapshot", "content": current})
+
+
+def append_record(journal_path, record):
+    """
+    Append a single JSON record to a journal under an exclusive lock.
+
+    Args:
+        journal_path: Path to the .jsonl journal
+        record: JSON-serializable dict
+
+    Returns:
+        dict: The record as written (with timestamp)
+    """
+    with locked(journal_path) as handle:
+        return _write_record(handle, record)
+
+
+def read_records(journal_path):
+    """Read all records from a journal. Returns an empty list if it does not exist."""
+    records = []
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def append_markdown(md_path, content, feature_id=""):
+    """
+    Append a section to a markdown file through its journal.
+
+    Only the tail of the markdown file is touched, so the cost does not grow
+    with the file size.
+
+    Args:
+        md_path: Markdown file to append to (e.g. experiments/active.md)
+        content: Markdown section to append
+        feature_id: Feature that produced the entry
+    """
+    md_path = Path(md_path)
+    content = content.strip()
+    with locked(journal_path_for(md_path)) as handle:
+        _ensure_snapshot(handle, md_path)
+        _write_record(handle, {"op": "append", "feature_id": feature_id, "content": content})
+        with open(md_path, 'a+b') as f:
+            # Mirror the old "rstrip() + blank line" behaviour by peeking at the tail only
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 2))
+            tail = f.read()
+            separator = _separator(tail, size)
+            f.write((separator + content + "\n").encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _separator(tail, size):
+    """Return the newlines needed so the next section starts after one blank line."""
+    if size == 0:
+        return ""
+    if tail.endswith(b"\n\n"):
+        return ""
+    if tail.endswith(b"\n"):
+        return "\n"
+    return "\n\n"
+
+
+def compare_and_swap(md_path, new_content, expected_hash, feature_id=""):
+    """
+    Replace a markdown file only if it still matches the content the agent read.
+
+    The proposed content is always journaled, so a losing concurrent run keeps
+    its update in the journal for review instead of clobbering the winner.
+
+    Args:
+        md_path: Markdown file to replace (e.g. product/beliefs/current.md)
+        new_content: Full new markdown content
+        expected_hash: file_hash() of the file when it was read
+        feature_id: Feature that produced the update
+
+    Returns:
+        bool: True if the file was replaced, False on conflict
+    """
+    md_path = Path(md_path)
+    with locked(journal_path_for(md_path)) as handle:
+        _ensure_snapshot(handle, md_path)
+        applied = file_hash(md_path) == expected_hash
+        _write_record(handle, {
+            "op": "replace",
+            "feature_id": feature_id,
+            "base_hash": expected_hash,
+            "applied": applied,
+            "content": new_content,
+        })
+        if applied:
+            tmp_path = md_path.with_name(md_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+            os.replace(tmp_path, md_path)
+        return applied
+
+
+def render(md_path):
+    """
+    Rebuild markdown content from a file's journal.
+
+    Args:
+        md_path: Markdown file whose journal should be replayed
+
+    Returns:
+        str or None: Rendered markdown, or None if the file has no journal
+    """
+    records = read_records(journal_path_for(md_path))
+    if not records:
+        return None
+    content = ""
+    for record in records:
+        op = record.get("op")
+        if op == "snapshot" or (op == "replace" and record.get("applied")):
+            content = record["content"]
+        elif op == "append":
+            content += _separator(content[-2:].encode('utf-8'), len(content)) + record["content"] + "\n"
+    return content
+
+
+def main():
+    """Command line entry point for rendering journaled markdown."""
+    if len(sys.argv) < 3 or sys.argv[1] != "render":
+        print("Usage: python journal.py render <markdown_file> [--write]")
+        sys.exit(1)
+
+    md_path = Path(sys.argv[2])
+    content = render(md_path)
+    if content is None:
+        print(f"❌ No journal found for {md_path}")
+        sys.exit(1)
+
+    if "--write" in sys.argv[3:]:
+        with locked(journal_path_for(md_path)):
+            tmp_path = md_path.with_name(md_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, md_path)
+        print(f"✅ Rendered {md_path} from journal")
+    else:
+        sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+from tracing import set_attribute, traced
+
 
 def _save_json_response(json_string, prefix="response", success=False):
     """
@@ -110,6 +112,7 @@ def _escape_newlines_in_string_values(json_string):
     return ''.join(result)
 
 
+@traced("json.fix_json_string")
 def fix_json_string(json_string):
     """
     Attempt to fix common JSON errors in AI-generated content.
@@ -209,6 +212,7 @@ def fix_json_string(json_string):
     return json_string, (modified or json_string != original)
 
 
+@traced("json.parse", args_attributes=lambda json_string, *args, **kwargs: {"chars": len(json_string or "")})
 def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="json_parse_error"):
     """
     Parse JSON with automatic error recovery.
@@ -242,6 +246,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
         result = json.loads(fixed_string)
         # Save successful parse
         _save_json_response(fixed_string, prefix=error_prefix, success=True)
+        set_attribute("json.strategy", "fixed" if was_fixed else "direct")
         return result
     except json.JSONDecodeError as e:
         print(f"⚠ JSON parsing failed after auto-fix: {e}", file=sys.stderr)
@@ -256,6 +261,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
             if comma_fixed:
                 result = json.loads(comma_fixed)
                 print(f"✓ Fixed missing delimiter issue", file=sys.stderr)
+                set_attribute("json.strategy", "missing_commas")
                 return result
         except Exception as comma_error:
             print(f"Comma fix failed: {comma_error}", file=sys.stderr)
@@ -269,6 +275,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
             if string_fixed:
                 result = json.loads(string_fixed)
                 print(f"✓ Fixed unterminated string issue", file=sys.stderr)
+                set_attribute("json.strategy", "unterminated_string")
                 return result
         except Exception as string_error:
             print(f"String fix failed: {string_error}", file=sys.stderr)
@@ -284,6 +291,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
                 f"JSON was truncated due to parsing error at position {first_error.pos}. "
                 f"Some fields may be incomplete or missing."
             )
+            set_attribute("json.strategy", "truncate_and_close")
             return recovered
     except Exception as recovery_error:
         print(f"Aggressive recovery failed: {recovery_error}", file=sys.stderr)
@@ -295,6 +303,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
         if extracted:
             result = json.loads(extracted)
             print(f"✓ Successfully extracted and parsed JSON from text", file=sys.stderr)
+            set_attribute("json.strategy", "extract_from_text")
             return result
     except Exception as extract_error:
         print(f"Extraction attempt failed: {extract_error}", file=sys.stderr)
@@ -347,6 +356,7 @@ def parse_json_with_recovery(json_string, save_error_file=True, error_prefix="js
     raise first_error
 
 
+@traced("json.fix_missing_commas")
 def _fix_missing_commas(json_string, error):
     """
     Attempt to fix missing comma/delimiter errors.
@@ -501,6 +511,7 @@ def _fix_missing_commas(json_string, error):
     return None
 
 
+@traced("json.fix_unterminated_string")
 def _fix_unterminated_string(json_string, error):
     """
     Attempt to fix unterminated string errors.
@@ -645,6 +656,7 @@ def _fix_unterminated_string(json_string, error):
     return None
 
 
+@traced("json.truncate_and_close_json")
 def _truncate_and_close_json(json_string, error):
     """
     Attempt to recover JSON by truncating at error position and closing properly.
@@ -716,6 +728,7 @@ def _truncate_and_close_json(json_string, error):
         return None
 
 
+@traced("json.extract_json_from_text")
 def _extract_json_from_text(text):
     """
     Try to extract JSON object or array from surrounding text.
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Knowledge Index
+Local, offline retrieval over the repository's markdown knowledge base
+(.ai/agents, .ai/workflows, ADRs, technical specs, engineering standards).
+Documents are chunked by heading, ranked with BM25, persisted to
+.ai/index/knowledge.json and refreshed incrementally from file mtimes.
+
+Agents use top_k_sections() or context_for() instead of pasting whole documents.
+
+Usage:
+    python scripts/knowledge_index.py refresh
+    python scripts/knowledge_index.py search "google login session handling" [k]
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+from bm25 import BM25Index
+from tracing import add_to_attribute, set_attribute, traced
+
+REPO_ROOT = Path(__file__).parent.parent
+INDEX_FILE = REPO_ROOT / ".ai/index/knowledge.json"
+SOURCE_GLOBS = [
+    ".ai/agents/*.md",
+    ".ai/workflows/*.md",
+    "design/architecture/*.md",
+    "design/technical-specs/*.md",
+    "engineering/*.md",
+]
+MAX_CHUNK_CHARS = 1500
+MAX_CONTEXT_CHARS = int(os.getenv("KNOWLEDGE_MAX_CHARS", "6000"))
+
+HEADING_RE = re.compile(r'^(#{1,3})\s+(.+?)\s*$', re.MULTILINE)
+
+
+def chunk_markdown(text):
+    """
+    Split markdown into sections at level 1-3 headings.
+
+    Sections longer than MAX_CHUNK_CHARS are split further on blank lines.
+
+    Args:
+        text: Markdown document
+
+    Returns:
+        list: (heading, section_text) tuples
+    """
+    matches = list(HEADING_RE.finditer(text))
+    bounds = [(0, "")] + [(m.start(), m.group(2)) for m in matches]
+    sections = []
+    for i, (start, heading) in enumerate(bounds):
+        end = bounds[i + 1][0] if i + 1 < len(bounds) else len(text)
+        body = text[start:end].strip()
+        if not body:
+            continue
+        if len(body) <= MAX_CHUNK_CHARS:
+            sections.append((heading, body))
+            continue
+        current = ""
+        for paragraph in re.split(r'\n\s*\n', body):
+            if current and len(current) + len(paragraph) > MAX_CHUNK_CHARS:
+                sections.append((heading, current.strip()))
+                current = ""
+            current += paragraph + "\n\n"
+        if current.strip():
+            sections.append((heading, current.strip()))
+    return sections
+
+
+class KnowledgeIndex:
+    """Persistent, incrementally refreshed BM25 index over markdown sections."""
+
+    def __init__(self, index_path=INDEX_FILE, root=REPO_ROOT):
+        self.index_path = Path(index_path)
+        self.root = Path(root)
+        self.files = {}
+        self.chunks = {}
+        self.bm25 = BM25Index()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.files = data.get("files", {})
+        self.chunks = data.get("chunks", {})
+        self.bm25 = BM25Index.from_dict(data.get("bm25", {}))
+
+    def save(self):
+        """Persist the index to disk."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"files": self.files, "chunks": self.chunks, "bm25": self.bm25.to_dict()}
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _relpath(self, path):
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def refresh(self, paths=None):
+        """
+        Re-index files whose mtime or size changed.
+
+        Files whose content hash is unchanged (e.g. after a fresh checkout) only
+        have their stat info updated. Files that disappeared are dropped.
+
+        Args:
+            paths: Optional explicit list of files; defaults to SOURCE_GLOBS
+
+        Returns:
+            int: Number of files re-chunked
+        """
+        full_scan = paths is None
+        if full_scan:
+            paths = [p for pattern in SOURCE_GLOBS for p in sorted(self.root.glob(pattern))]
+        seen = set()
+        reindexed = 0
+
+        for path in paths:
+            path = Path(path)
+            rel = self._relpath(path)
+            seen.add(rel)
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            record = self.files.get(rel)
+            if record and record["mtime"] == stat.st_mtime and record["size"] == stat.st_size:
+                add_to_attribute("index.cache_hits")
+                continue
+
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            if record and record["sha"] == digest:
+                record.update(mtime=stat.st_mtime, size=stat.st_size)
+                continue
+
+            self._drop_file(rel)
+            chunk_ids = []
+            for i, (heading, body) in enumerate(chunk_markdown(text)):
+                chunk_id = f"{rel}#{i}"
+                self.chunks[chunk_id] = {"path": rel, "heading": heading, "text": body}
+                self.bm25.add(chunk_id, f"{heading}\n{body}")
+                chunk_ids.append(chunk_id)
+            self.files[rel] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha": digest, "chunks": chunk_ids}
+            reindexed += 1
+
+        # Explicit path lists are additive; a full scan also drops deleted files
+        if full_scan:
+            for rel in [r for r in self.files if r not in seen]:
+                self._drop_file(rel)
+                reindexed += 1
+        return reindexed
+
+    def _drop_file(self, rel):
+        record = self.files.pop(rel, None)
+        if not record:
+            return
+        for chunk_id in record["chunks"]:
+            self.chunks.pop(chunk_id, None)
+            self.bm25.remove(chunk_id)
+
+    def search(self, query, k=5, paths=None):
+        """
+        Return the top-k sections for a query.
+
+        Args:
+            query: Free-text query
+            k: Number of sections to return
+            paths: Optional list of files to restrict the search to
+
+        Returns:
+            list: Section dicts with id, path, heading, text and score
+        """
+        doc_ids = None
+        if paths is not None:
+            doc_ids = [c for p in paths for c in self.files.get(self._relpath(p), {}).get("chunks", [])]
+        results = []
+        for chunk_id, score in self.bm25.score(query, doc_ids)[:k]:
+            if score <= 0:
+                break
+            results.append({"id": chunk_id, **self.chunks[chunk_id], "score": round(score, 3)})
+        return results
+
+
+_index = None
+
+
+def get_index():
+    """Return the process-wide index, refreshed against the working tree."""
+    global _index
+    if _index is None:
+        _index = KnowledgeIndex()
+        if _index.refresh():
+            _index.save()
+    return _index
+
+
+def top_k_sections(query, k=5, paths=None):
+    """
+    Retrieve the k most relevant knowledge-base sections for a query.
+
+    Args:
+        query: Free-text query (feature id, feedback, spec excerpt...)
+        k: Number of sections
+        paths: Optional list of files to restrict retrieval to
+
+    Returns:
+        list: Section dicts with path, heading, text and score
+    """
+    index = get_index()
+    if paths is not None and index.refresh(paths):
+        index.save()
+    return index.search(query, k=k, paths=paths)
+
+
+def format_sections(sections):
+    """Render retrieved sections as markdown for a prompt."""
+    if not sections:
+        return "[No relevant sections found]"
+    return "\n\n---\n\n".join(f"<!-- {s['path']} -->\n{s['text']}" for s in sections)
+
+
+@traced("context.retrieve", result_attributes=lambda context: {"chars": len(context)})
+def context_for(query, paths, max_chars=MAX_CONTEXT_CHARS, separator="\n\n---\n\n"):
+    """
+    Build prompt context from a set of documents within a character budget.
+
+    Documents are included whole while they fit. Once the combined size exceeds
+    max_chars, only the most relevant sections are included instead, in the
+    order they appear in the documents.
+
+    Args:
+        query: Free-text query used to rank sections
+        paths: Files to draw context from
+        max_chars: Character budget for the returned context
+        separator: Separator between whole documents
+
+    Returns:
+        str: Markdown context, or an empty string if no file exists or no
+        section matches the query (so callers can fall back with `or`)
+    """
+    paths = [Path(p) for p in paths if Path(p).exists()]
+    if not paths:
+        return ""
+
+    contents = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            contents.append(f.read())
+    whole = separator.join(contents)
+    set_attribute("source_chars", len(whole))
+    if len(whole) <= max_chars:
+        return whole
+
+    selected = []
+    used = 0
+    for section in top_k_sections(query, k=50, paths=paths):
+        if used + len(section["text"]) > max_chars:
+            continue
+        selected.append(section)
+        used += len(section["text"])
+    print(f"📚 Retrieved {len(selected)} sections ({used} of {len(whole)} chars)", file=sys.stderr)
+    if not selected:
+        return ""
+    index = get_index()
+    file_order = {index._relpath(path): i for i, path in enumerate(paths)}
+    selected.sort(key=lambda s: (file_order.get(s["path"], len(file_order)), int(s["id"].rsplit("#", 1)[1])))
+    return format_sections(selected)
+
+
+def main():
+    """Command line entry point."""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("refresh", "search"):
+        print("Usage: python knowledge_index.py refresh | search <query> [k]")
+        sys.exit(1)
+
+    index = KnowledgeIndex()
+    reindexed = index.refresh()
+    index.save()
+
+    if sys.argv[1] == "refresh":
+        print(f"✅ Indexed {len(index.files)} files ({len(index.chunks)} sections), {reindexed} re-chunked")
+        return
+
+    if len(sys.argv) < 3:
+        print("Usage: python knowledge_index.py search <query> [k]")
+        sys.exit(1)
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    for section in index.search(sys.argv[2], k=k):
+        print(f"[{section['score']}] {section['path']} - {section['heading'] or '(intro)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Output Writer Utility
+Writes agent-generated files to the repository as a single batch.
+Files are staged in a temporary directory first and only moved into place once
+every file has been written, so a crash mid-run never leaves a half-written tree.
+Replaced files are backed up until the last rename succeeds, and restored if one
+fails, so the batch lands either whole or not at all.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tracing import traced
+
+
+def _sha256(data):
+    """Return the hex SHA-256 digest of a bytes object."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(filepath):
+    """Return the SHA-256 of an existing file, or None if it does not exist."""
+    try:
+        with open(filepath, 'rb') as f:
+            return _sha256(f.read())
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def _backup(target, backup):
+    """Keep a copy of an existing target for rollback. Returns the backup path, or None if there is no target."""
+    try:
+        os.link(target, backup)
+    except FileNotFoundError:
+        return None
+    except OSError:
+        # No hard links on this filesystem
+        shutil.copy2(target, backup)
+    return backup
+
+
+class OutputBatch:
+    """
+    Collects file writes and commits them to disk together.
+
+    Usage:
+        batch = OutputBatch(REPO_ROOT)
+        batch.add("src/app.py", content)
+        stats = batch.commit()
+    """
+
+    def __init__(self, root, max_workers=None):
+        self.root = Path(root).resolve()
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self._files = {}
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, filepath, content):
+        """
+        Queue a file for writing. Later writes to the same path replace earlier ones.
+
+        Args:
+            filepath: Absolute path, or a path relative to the batch root
+            content: Text content of the file
+
+        Returns:
+            Path: The resolved target path
+        """
+        target = Path(filepath)
+        if not target.is_absolute():
+            target = self.root / target
+        target = target.resolve()
+        if target != self.root and self.root not in target.parents:
+            raise ValueError(f"Refusing to write outside repository: {filepath}")
+        self._files[target] = content
+        return target
+
+    @traced("output.commit", result_attributes=lambda stats: {
+        "files.written": len(stats["written"]), "files.skipped": len(stats["skipped"]), "bytes": stats["bytes_written"]
+    })
+    def commit(self):
+        """
+        Stage all queued files in parallel, then rename them into place.
+
+        Files whose content hash matches what is already on disk are skipped.
+        Replaced files keep their permission bits. If staging fails for any
+        file, nothing in the repository is touched; if a rename fails, the
+        files already swapped in are rolled back before the error is raised.
+
+        Returns:
+            dict: written (list of Paths), skipped (list of Paths), bytes_written (int)
+        """
+        stats = {"written": [], "skipped": [], "bytes_written": 0}
+        if not self._files:
+            return stats
+
+        staging_dir = Path(tempfile.mkdtemp(prefix=".aid-staging-", dir=self.root))
+        try:
+            def stage(item):
+                index, (target, content) = item
+                data = content.encode('utf-8')
+                if _file_sha256(target) == _sha256(data):
+                    return target, None, 0
+                staged = staging_dir / str(index)
+                with open(staged, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                try:
+                    # Keep the mode of the file being replaced (e.g. executable scripts)
+                    os.chmod(staged, stat.S_IMODE(os.stat(target).st_mode))
+                except FileNotFoundError:
+                    pass
+                return target, staged, len(data)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                staged_files = list(executor.map(stage, enumerate(self._files.items())))
+
+            # Every file is staged - create each parent directory once, then swap in
+            for parent in {target.parent for target, staged, _ in staged_files if staged}:
+                parent.mkdir(parents=True, exist_ok=True)
+
+            swapped = []  # (target, backup or None for a new file)
+            try:
+                for target, staged, size in staged_files:
+                    if staged is None:
+                        stats["skipped"].append(target)
+                        continue
+                    backup = _backup(target, Path(f"{staged}.orig"))
+                    os.replace(staged, target)
+                    swapped.append((target, backup))
+                    stats["written"].append(target)
+                    stats["bytes_written"] += size
+            except OSError:
+                for target, backup in reversed(swapped):
+                    if backup is None:
+                        target.unlink(missing_ok=True)
+                    else:
+                        os.replace(backup, target)
+                raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        self._files.clear()
+        return stats
+
+
+def format_bytes(size):
+    """Format a byte count for status output."""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Patch Apply Utility
+Applies model-generated file changes that are expressed as edits instead of
+whole-file rewrites, so a one-line fix costs a few lines of output rather than
+the entire file.
+
+A file change is one of:
+    {"path": ..., "content": "full file"}                              (new files, rewrites)
+    {"path": ..., "base_hash": ..., "edits": [{"search": ..., "replace": ...}]}
+    {"path": ..., "base_hash": ..., "diff": "unified diff"}
+
+base_hash is content_hash() of the file the model was shown. Edits are only
+applied when it is given and still matches, and every search block must match
+exactly once.
+Changes that cannot be applied are returned as failures so the caller can ask
+for full content for just those files.
+
+Usage:
+    python scripts/patch_apply.py <changes.json> [--write]
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+
+from journal import content_hash
+
+REPO_ROOT = Path(__file__).parent.parent
+
+HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+PATCH_FORMAT_INSTRUCTIONS = """For files that already exist, prefer small edits over full content:
+  {"path": "src/app.py", "base_hash": "<hash shown for the file>",
+   "edits": [{"search": "exact lines copied from the file", "replace": "new lines"}]}
+Each search block must be copied verbatim and match exactly once; include a
+few surrounding lines if needed to make it unique. Leave content empty when
+using edits. Use "content" with the complete file only for new files or when
+most of a file changes."""
+
+
+class PatchError(Exception):
+    """A change could not be applied to the current file content."""
+
+
+def is_patch(change):
+    """Return True if a change is expressed as edits or a diff rather than full content."""
+    return bool(change.get("edits") or change.get("diff")) and not change.get("content")
+
+
+def _find_unique(haystack, needle):
+    """Index of the single occurrence of needle, tolerating trailing whitespace differences."""
+    count = haystack.count(needle)
+    if count == 1:
+        return haystack.index(needle), len(needle)
+    if count > 1:
+        raise PatchError(f"search block matches {count} times: {needle[:60]!r}")
+
+    # Models often drop trailing spaces; retry line by line with them stripped
+    lines = haystack.split("\n")
+    wanted = [line.rstrip() for line in needle.strip("\n").split("\n")]
+    stripped = [line.rstrip() for line in lines]
+    matches = [i for i in range(len(lines) - len(wanted) + 1) if stripped[i:i + len(wanted)] == wanted]
+    if len(matches) != 1:
+        raise PatchError(f"search block matches {len(matches)} times: {needle[:60]!r}")
+    first, last = matches[0], matches[0] + len(wanted) - 1
+    start = sum(len(line) + 1 for line in lines[:first])
+    length = sum(len(line) + 1 for line in lines[first:last + 1]) - 1
+    # Line breaks around the block belong to the match when the search block has them
+    if needle.endswith("\n") and last < len(lines) - 1:
+        length += 1
+    if needle.startswith("\n") and first > 0:
+        start, length = start - 1, length + 1
+    return start, length
+
+
+def apply_edits(text, edits):
+    """Apply search/replace edits in order."""
+    for edit in edits:
+        search = edit.get("search", "")
+        if not search:
+            raise PatchError("empty search block")
+        start, length = _find_unique(text, search)
+        text = text[:start] + edit.get("replace", "") + text[start + length:]
+    return text
+
+
+def apply_unified_diff(text, diff):
+    """
+    Apply a unified diff to text.
+
+    Hunks are located by their context lines, starting at the line number in
+    the header and searching outward, so small offsets are tolerated. Context
+    that does not match anywhere is an error (no fuzz).
+    """
+    lines = text.split("\n")
+    hunks = []
+    current = None
+    for line in diff.split("\n"):
+        header = HUNK_HEADER_RE.match(line)
+        if header:
+            current = {"start": int(header.group(1)), "old": [], "new": []}
+            hunks.append(current)
+        elif current is None:
+            continue  # File headers (---/+++) before the first hunk
+        elif line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        elif line.startswith("-"):
+            current["old"].append(line[1:])
+        elif line.startswith("+"):
+            current["new"].append(line[1:])
+        elif line.startswith(" ") or line == "":
+            current["old"].append(line[1:])
+            current["new"].append(line[1:])
+    if not hunks:
+        raise PatchError("diff contains no hunks")
+
+    offset = 0
+    for hunk in hunks:
+        old = hunk["old"]
+        # Trailing blank context lines are often an artifact of splitting the diff
+        while old and hunk["new"] and old[-1] == "" and hunk["new"][-1] == "":
+            old, hunk["new"] = old[:-1], hunk["new"][:-1]
+        expected = max(0, hunk["start"] - 1 + offset)
+        candidates = sorted(range(len(lines) - len(old) + 1), key=lambda i: abs(i - expected))
+        position = next((i for i in candidates if lines[i:i + len(old)] == old), None)
+        if position is None:
+            raise PatchError(f"hunk at line {hunk['start']} does not match the file")
+        lines[position:position + len(old)] = hunk["new"]
+        offset += len(hunk["new"]) - len(old)
+    return "\n".join(lines)
+
+
+def apply_change(change, current):
+    """
+    Compute the new content of one file.
+
+    Args:
+        change: File change dict (see module docstring)
+        current: Current file content, or None if the file does not exist
+
+    Returns:
+        str: New file content
+
+    Raises:
+        PatchError: If the change cannot be applied safely
+    """
+    if not is_patch(change):
+        if change.get("content") is None:
+            raise PatchError("change has neither content nor edits")
+        return change["content"]
+    if current is None:
+        raise PatchError("edits target a file that does not exist")
+    base_hash = change.get("base_hash")
+    if not base_hash:
+        raise PatchError("edits without a base_hash cannot be checked against the file")
+    if base_hash != content_hash(current):
+        raise PatchError(f"file changed since it was read (base_hash {base_hash} != {content_hash(current)})")
+    if change.get("edits"):
+        return apply_edits(current, change["edits"])
+    return apply_unified_diff(current, change["diff"])
+
+
+def _read(path, root, pending):
+    key = Path(path).as_posix()
+    if key in pending:
+        return pending[key]
+    target = Path(path) if Path(path).is_absolute() else Path(root) / path
+    try:
+        # newline='' keeps CRLF files byte-identical, so hashes match what the model was shown
+        with open(target, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+
+
+def resolve_changes(changes, root=REPO_ROOT, pending=None):
+    """
+    Turn a list of file changes into full-content {"path", "content"} dicts.
+
+    Args:
+        changes: File change dicts from a model response
+        root: Repository root that relative paths refer to
+        pending: Optional {path: content} of files generated earlier in the same
+            run and not yet written, which edits may also target
+
+    Returns:
+        tuple: (resolved list with full content, list of failure dicts with path and error)
+    """
+    pending = dict(pending or {})
+    resolved = []
+    failures = []
+    for change in changes:
+        path = change.get("path", "")
+        try:
+            content = apply_change(change, _read(path, root, pending))
+        except PatchError as e:
+            failures.append({"path": path, "error": str(e)})
+            continue
+        pending[Path(path).as_posix()] = content
+        resolved.append({**{k: v for k, v in change.items() if k not in ("edits", "diff", "base_hash")},
+                         "content": content})
+    return resolved, failures
+
+
+def resolve_with_fallback(changes, request_full_content, root=REPO_ROOT, pending=None):
+    """
+    Resolve changes, asking for full content for any patch that failed.
+
+    Args:
+        changes: File change dicts from a model response
+        request_full_content: Callable taking the failure list and returning
+            full-content change dicts for those paths
+        root: Repository root
+        pending: Optional {path: content} of files not yet written
+
+    Returns:
+        list: Full-content {"path", "content", ...} dicts
+    """
+    resolved, failures = resolve_changes(changes, root, pending)
+    patched = sum(1 for change in changes if is_patch(change))
+    if patched:
+        print(f"🩹 Applied {patched - len(failures)}/{patched} patches locally")
+    if not failures:
+        return resolved
+
+    for failure in failures:
+        print(f"⚠️  Patch for {failure['path']} failed ({failure['error']}), requesting full content")
+    retried, still_failing = resolve_changes(request_full_content(failures) or [], root, pending)
+    for failure in still_failing:
+        print(f"❌ No usable change for {failure['path']}: {failure['error']}")
+    return resolved + retried
+
+
+def main():
+    """Resolve a JSON list of changes and print (or write) the result."""
+    if len(sys.argv) < 2:
+        print("Usage: python patch_apply.py <changes.json> [--write]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        changes = json.load(f)
+    resolved, failures = resolve_changes(changes)
+    for failure in failures:
+        print(f"❌ {failure['path']}: {failure['error']}")
+    if "--write" in sys.argv:
+        from output_writer import OutputBatch
+        batch = OutputBatch(REPO_ROOT)
+        for change in resolved:
+            batch.add(change["path"], change["content"])
+        stats = batch.commit()
+        print(f"💾 Wrote {len(stats['written'])} files, {len(stats['skipped'])} unchanged")
+    else:
+        for change in resolved:
+            print(f"✓ {change['path']} ({len(change['content'])} chars)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Prefetch Utility
+Speculatively prepares the next pipeline stage while the current one is
+waiting on its model call: imports the stage module, reads its static context
+files into memory, warms the knowledge index and creates the provider client.
+
+Prefetched files are served by each agent's load_file() only while their
+mtime and size still match, so a file rewritten by the current stage is read
+again from disk rather than served stale.
+
+Usage:
+    from prefetch import Prefetcher
+    prefetcher = Prefetcher("invoke_architect_agent", feature_id)  # starts in the background
+    ...
+    prefetcher.wait()
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from tracing import add_to_attribute, span
+
+MAX_PREFETCH_BYTES = int(os.getenv("AID_PREFETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_files = {}
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def prefetch_file(path):
+    """Read a file into the prefetch cache. Returns the number of bytes cached."""
+    key = os.path.abspath(path)
+    try:
+        stamp = _stamp(key)
+        if stamp[1] > MAX_PREFETCH_BYTES:
+            return 0
+        with open(key, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError):
+        return 0
+    with _lock:
+        _files[key] = (stamp, text)
+    return stamp[1]
+
+
+def prefetched_text(path):
+    """
+    Return a prefetched file's content if it is still current, else None.
+
+    Each hit is consumed: later reads of the same file go to disk, so the
+    cache never holds more than one stage's context.
+    """
+    if not _files:
+        return None
+    key = os.path.abspath(path)
+    with _lock:
+        entry = _files.pop(key, None)
+    if entry is None:
+        return None
+    try:
+        if _stamp(key) != entry[0]:
+            return None
+    except OSError:
+        return None
+    add_to_attribute("prefetch_hits")
+    return entry[1]
+
+
+def stage_context_files(module, feature_id=None):
+    """
+    Collect the context files a stage module declares.
+
+    Module-level Path constants that point at files are included; for
+    directory constants, only files whose name mentions the feature are.
+    """
+    files = []
+    for name, value in vars(module).items():
+        if not name.isupper() or not isinstance(value, Path) or name in ("REPO_ROOT",):
+            continue
+        if value.is_file():
+            files.append(value)
+        elif value.is_dir() and feature_id:
+            files.extend(path for path in sorted(value.glob(f"*{feature_id}*")) if path.is_file())
+    return files
+
+
+def prefetch_stage(module_name, feature_id=None):
+    """
+    Prepare a stage: import it, read its context files, warm the index and client.
+
+    Returns:
+        dict: files, bytes and seconds spent
+    """
+    started = time.monotonic()
+    with span("prefetch.stage", stage=module_name) as s:
+        module = importlib.import_module(module_name)
+        files = stage_context_files(module, feature_id)
+        size = sum(prefetch_file(path) for path in files)
+
+        from knowledge_index import get_index
+        get_index()  # Loads and refreshes the BM25 index (tokenizes changed docs)
+
+        from replay_provider import gemini_client, openai_client
+        try:
+            gemini_client() if os.getenv("AI_PROVIDER", "openai").lower() == "gemini" else openai_client()
+        except Exception as e:
+            print(f"⚠️  Could not warm provider client: {e}", file=sys.stderr)
+
+        s.set("files", len(files))
+        s.set("bytes", size)
+    return {"files": len(files), "bytes": size, "seconds": time.monotonic() - started}
+
+
+class Prefetcher:
+    """Runs prefetch_stage() in a daemon thread."""
+
+    def __init__(self, module_name, feature_id=None):
+        self.module_name = module_name
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(feature_id,), name=f"prefetch-{module_name}", daemon=True)
+        self._thread.start()
+
+    def _run(self, feature_id):
+        try:
+            self.result = prefetch_stage(self.module_name, feature_id)
+        except Exception as e:  # Speculation must never break the pipeline
+            self.error = e
+
+    def wait(self, timeout=None):
+        """Wait for the prefetch to finish and return its result (None if it failed)."""
+        self._thread.join(timeout)
+        return self.result
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Provider Router Utility
+Routes agent model calls across the configured provider/model endpoints with
+request timeouts, failover and optional hedged requests, so one slow tail
+response no longer stalls a whole pipeline stage.
+
+Endpoints are "provider:model" pairs. Each call goes to the endpoint with the
+lowest recent median latency (endpoints with too few samples are tried first
+so every endpoint gets measured). Latencies are kept in a rolling window per
+endpoint and stage and persisted to .ai/cache/provider-latency.json, so the
+separate stage processes share what they learn. Routing uses all of an
+endpoint's samples; the hedge delay uses the calling stage's own p95, since a
+planning call and a full dev iteration differ by minutes.
+
+Settings:
+    AID_ENDPOINTS          Comma-separated endpoints (default "$AI_PROVIDER:$MODEL"),
+                           e.g. "openai:gpt-4.1,gemini:gemini-2.5-flash"
+    AID_REQUEST_TIMEOUT    Seconds before a call is abandoned (default 600)
+    AID_HEDGE=1            Send a duplicate request to the next endpoint once the
+                           primary is slower than its p95 for the stage (costs a second
+                           call; needs a second endpoint)
+    AID_HEDGE_AFTER        Hedge delay in seconds until the stage has a p95 (default: no hedge)
+    AID_LATENCY_WINDOW     Samples kept per endpoint and stage (default 50)
+
+Settings are read when a call is routed, so values loaded from .env after
+import apply.
+
+Usage:
+    from provider_router import route
+    result = route(system_prompt, user_prompt, openai=_invoke_openai, gemini=_invoke_gemini)
+
+    python scripts/provider_router.py stats
+    python scripts/provider_router.py reset
+"""
+
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from tracing import set_attribute, span
+from usage_ledger import usage_context
+
+REPO_ROOT = Path(__file__).parent.parent
+STATS_FILE = REPO_ROOT / ".ai/cache/provider-latency.json"
+# Percentiles are not trusted (for routing or hedging) below this many samples
+MIN_SAMPLES = 5
+# Providers that are served by another provider's invoker
+INVOKER_ALIASES = {"replay": "openai"}
+
+
+def configured_endpoints():
+    """Return the configured endpoints as (provider, model) tuples, in priority order."""
+    default = f"{os.getenv('AI_PROVIDER', 'openai')}:{os.getenv('MODEL', 'gpt-4.1')}"
+    endpoints = []
+    for item in os.getenv("AID_ENDPOINTS", default).split(","):
+        provider, _, model = item.strip().partition(":")
+        if provider:
+            endpoints.append((provider.lower(), model or os.getenv("MODEL", "gpt-4.1")))
+    return endpoints
+
+
+def request_timeout():
+    """Seconds before a call is abandoned (AID_REQUEST_TIMEOUT)."""
+    return float(os.getenv("AID_REQUEST_TIMEOUT", "600"))
+
+
+def hedging_enabled():
+    return os.getenv("AID_HEDGE", "").lower() in ("1", "true", "yes")
+
+
+def endpoint_name(endpoint):
+    return f"{endpoint[0]}:{endpoint[1]}"
+
+
+def _window_key(endpoint, stage=None):
+    """Stats key for an endpoint's samples from one stage ("provider:model|stage")."""
+    return f"{endpoint_name(endpoint)}|{stage}" if stage else endpoint_name(endpoint)
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers (q in 0..100)."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+class LatencyStats:
+    """Rolling latency and error samples per endpoint and stage, persisted as JSON."""
+
+    def __init__(self, path=STATS_FILE, window=None):
+        self.path = Path(path)
+        self.window = window or int(os.getenv("AID_LATENCY_WINDOW", "50"))
+        self._lock = threading.Lock()
+        self._samples = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for name, samples in json.load(f).items():
+                    self._samples[name] = deque((tuple(s) for s in samples), maxlen=self.window)
+        except (FileNotFoundError, json.JSONDecodeError, TypeError, ValueError):
+            pass
+
+    def record(self, endpoint, seconds, ok=True, stage=None):
+        """Add a sample to the endpoint's window for a stage and persist the windows."""
+        name = _window_key(endpoint, stage)
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append((round(seconds, 3), ok))
+            data = {key: list(samples) for key, samples in self._samples.items()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Stats are best-effort
+
+    def summary(self, endpoint, stage=None):
+        """
+        Return count, p50, p95, p99 (seconds, successful calls) and error rate.
+
+        Covers the endpoint's samples from one stage, or from every stage when
+        stage is None.
+        """
+        name = endpoint_name(endpoint)
+        with self._lock:
+            if stage:
+                samples = list(self._samples.get(_window_key(endpoint, stage), []))
+            else:
+                samples = [sample for key, window in self._samples.items()
+                           if key.partition("|")[0] == name for sample in window]
+        latencies = [seconds for seconds, ok in samples if ok]
+        return {
+            "count": len(samples),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "error_rate": (sum(1 for _, ok in samples if not ok) / len(samples)) if samples else 0.0,
+        }
+
+    def ranked(self, endpoints):
+        """
+        Order endpoints for routing.
+
+        Endpoints with fewer than MIN_SAMPLES samples come first (in configured
+        order) so they get measured; then healthy endpoints by median latency;
+        endpoints failing half their recent calls go last.
+        """
+        def key(item):
+            position, endpoint = item
+            stats = self.summary(endpoint)
+            if stats["count"] < MIN_SAMPLES:
+                return (0, 0, 0, position)
+            return (1, stats["error_rate"] >= 0.5, stats["p50"] or float("inf"), position)
+        return [endpoint for _, endpoint in sorted(enumerate(endpoints), key=key)]
+
+    def hedge_delay(self, endpoint, stage=None):
+        """Seconds to wait before hedging a stage's call to this endpoint, or None to not hedge."""
+        if not hedging_enabled():
+            return None
+        stats = self.summary(endpoint, stage)
+        if stats["p95"] is not None and stats["count"] >= MIN_SAMPLES:
+            return stats["p95"]
+        return float(os.getenv("AID_HEDGE_AFTER", "0")) or None
+
+
+_stats = None
+
+
+def get_stats():
+    """Return the process-wide latency stats."""
+    global _stats
+    if _stats is None:
+        _stats = LatencyStats()
+    return _stats
+
+
+def route(system_prompt, user_prompt, **invokers):
+    """
+    Invoke the best endpoint for a prompt, with timeout, failover and hedging.
+
+    Args:
+        system_prompt: System prompt
+        user_prompt: User prompt
+        **invokers: Provider name -> callable(system_prompt, user_prompt, model=...)
+            returning the parsed result
+
+    Returns:
+        The result of the first endpoint call that succeeds
+
+    Raises:
+        TimeoutError: If no call finished within AID_REQUEST_TIMEOUT
+        Exception: The last endpoint error if every attempt failed
+    """
+    stats = get_stats()
+    endpoints = [e for e in stats.ranked(configured_endpoints()) if INVOKER_ALIASES.get(e[0], e[0]) in invokers]
+    if not endpoints:
+        raise ValueError(f"No invoker for any configured endpoint: {', '.join(map(endpoint_name, configured_endpoints()))}")
+
+    stage = usage_context().get("stage")
+    results = queue.Queue()
+    launched = []
+
+    def launch(endpoint):
+        invoker = invokers[INVOKER_ALIASES.get(endpoint[0], endpoint[0])]
+        context = contextvars.copy_context()  # Keep usage and trace context in the worker
+
+        def run():
+            started = time.monotonic()
+            try:
+                value = context.run(invoker, system_prompt, user_prompt, model=endpoint[1])
+            except Exception as e:
+                stats.record(endpoint, time.monotonic() - started, ok=False, stage=stage)
+                results.put((endpoint, None, e))
+                return
+            stats.record(endpoint, time.monotonic() - started, stage=stage)
+            results.put((endpoint, value, None))
+
+        launched.append(endpoint)
+        # Daemon threads: an abandoned call must not keep the process alive
+        threading.Thread(target=run, name=f"aid-{endpoint_name(endpoint)}", daemon=True).start()
+
+    with span("model.route", endpoint=endpoint_name(endpoints[0])):
+        started = time.monotonic()
+        timeout = request_timeout()
+        deadline = started + timeout
+        # Hedging re-sends to the next endpoint; with only one it would duplicate the same call
+        hedge_delay = stats.hedge_delay(endpoints[0], stage) if len(endpoints) > 1 else None
+        launch(endpoints[0])
+        pending = 1
+        last_error = None
+        while pending:
+            now = time.monotonic()
+            wait = deadline - now
+            hedge_at = started + hedge_delay if hedge_delay is not None and len(launched) == 1 else None
+            if hedge_at is not None:
+                wait = min(wait, hedge_at - now)
+            try:
+                endpoint, value, error = results.get(timeout=max(0.0, wait))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    for endpoint in launched:
+                        stats.record(endpoint, timeout, ok=False, stage=stage)
+                    raise TimeoutError(f"No response from {', '.join(map(endpoint_name, launched))} "
+                                       f"within {timeout:g}s")
+                hedge = endpoints[1]
+                print(f"⏱️  {endpoint_name(endpoints[0])} slower than {hedge_delay:.2f}s, "
+                      f"hedging with {endpoint_name(hedge)}", file=sys.stderr)
+                set_attribute("hedged", True)
+                launch(hedge)
+                pending += 1
+                continue
+
+            pending -= 1
+            if error is None:
+                set_attribute("served_by", endpoint_name(endpoint))
+                return value
+            last_error = error
+            print(f"⚠️  {endpoint_name(endpoint)} failed: {error}", file=sys.stderr)
+            untried = [e for e in endpoints if e not in launched]
+            if not pending and untried:
+                print(f"   Failing over to {endpoint_name(untried[0])}", file=sys.stderr)
+                launch(untried[0])
+                pending += 1
+        raise last_error
+
+
+def main():
+    """Print or reset the rolling latency stats."""
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "reset":
+        STATS_FILE.unlink(missing_ok=True)
+        print(f"✅ Cleared {STATS_FILE}")
+        return
+    if command != "stats":
+        print("Usage: python provider_router.py stats | reset")
+        sys.exit(1)
+
+    stats = get_stats()
+    names = sorted(set(stats._samples) | {endpoint_name(e) for e in configured_endpoints()})
+    print(f"{'endpoint':<36}{'calls':>6}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'errors':>8}")
+    for name in names:
+        endpoint, _, stage = name.partition("|")
+        provider, _, model = endpoint.partition(":")
+        summary = stats.summary((provider, model), stage or None)
+        cells = [f"{summary[q]:>8.1f}" if summary[q] is not None else f"{'-':>8}" for q in ("p50", "p95", "p99")]
+        print(f"{name:<36}{summary['count']:>6}{''.join(cells)}{summary['error_rate']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Replay Provider Utility
+Record/replay backend for the agent scripts, so the pipeline's own overhead
+(context loading, parsing, file emission) can be benchmarked offline and
+repeatably, without paying for live API calls or their latency noise.
+
+Modes:
+    AI_PROVIDER=replay     Serve recorded responses from the cassette directory
+                           (OpenAI-shaped; no SDK or API key needed)
+    AID_RECORD=1           With a real provider, save every response as a cassette
+
+Settings:
+    AID_CASSETTE_DIR       Cassette directory (default .ai/cassettes, gitignored)
+    AID_REPLAY_LATENCY     "0" (default), "recorded", or a fixed latency in ms
+    AID_REPLAY_SPEED       Divide simulated latency by this factor (default 1)
+    AID_REPLAY_CHUNK_CHARS Characters per chunk for streamed responses (default 64)
+    AID_REPLAY_STRICT=1    Only serve exact prompt matches (no sequence fallback)
+
+Settings are read when they are used, so values loaded from .env by the agent
+scripts (after this module is imported) apply.
+
+A cassette is keyed by a hash of the prompt text. Prompts that embed volatile
+values (dates) will not match exactly; unless AID_REPLAY_STRICT is set, the
+next unused cassette recorded for the same stage and iteration is served.
+
+Usage:
+    AID_RECORD=1 python scripts/invoke_dev_agent_iterative.py my-feature
+    AI_PROVIDER=replay AID_REPLAY_LATENCY=recorded python scripts/invoke_dev_agent_iterative.py my-feature
+    python scripts/replay_provider.py list
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from tracing import model_usage
+from usage_ledger import usage_context
+
+REPO_ROOT = Path(__file__).parent.parent
+# Share of the simulated latency spent before the first streamed chunk
+FIRST_CHUNK_SHARE = 0.2
+
+
+class ReplayMiss(Exception):
+    """No cassette matches a request."""
+
+
+def _enabled(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def cassette_dir_setting():
+    """The cassette directory (AID_CASSETTE_DIR, default .ai/cassettes)."""
+    return Path(os.getenv("AID_CASSETTE_DIR") or REPO_ROOT / ".ai/cassettes")
+
+
+def replaying():
+    """True when AI_PROVIDER=replay."""
+    return os.getenv("AI_PROVIDER", "").lower() == "replay"
+
+
+def recording():
+    """True when AID_RECORD is set."""
+    return _enabled("AID_RECORD")
+
+
+def prompt_text(messages=None, contents=None):
+    """
+    Normalize a request to the prompt text used as the cassette key.
+
+    OpenAI messages are joined the way the agents combine system and user
+    prompts for Gemini, so a cassette recorded with one provider replays for
+    the other.
+    """
+    if messages is not None:
+        return "\n\n---\n\n".join(str(message.get("content", "")) for message in messages)
+    if isinstance(contents, str):
+        return contents
+    return json.dumps(contents, sort_keys=True, default=str)
+
+
+def cassette_key(prompt):
+    """Cassette key for a prompt."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:24]
+
+
+def save_cassette(prompt, text, usage, latency_ms, model, provider, cassette_dir=None):
+    """Write one recorded interaction to the cassette directory."""
+    cassette_dir = Path(cassette_dir or cassette_dir_setting())
+    cassette_dir.mkdir(parents=True, exist_ok=True)
+    key = cassette_key(prompt)
+    context = usage_context()
+    cassette = {
+        "key": key,
+        "recorded_ns": time.time_ns(),
+        "stage": context.get("stage"),
+        "feature_id": context.get("feature_id"),
+        "iteration": context.get("iteration"),
+        "provider": provider,
+        "model": model,
+        "prompt_chars": len(prompt),
+        "latency_ms": latency_ms,
+        "usage": usage,
+        "text": text,
+    }
+    path = cassette_dir / f"{key}.json"
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cassette, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_cassettes(cassette_dir=None):
+    """Load every cassette, oldest recording first."""
+    cassettes = []
+    for path in Path(cassette_dir or cassette_dir_setting()).glob("*.json"):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cassettes.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(cassettes, key=lambda c: c.get("recorded_ns", 0))
+
+
+def _simulated_latency(cassette):
+    setting = os.getenv("AID_REPLAY_LATENCY", "0")
+    if setting == "recorded":
+        latency_ms = cassette.get("latency_ms") or 0
+    else:
+        latency_ms = float(setting or 0)
+    return latency_ms / 1000 / (float(os.getenv("AID_REPLAY_SPEED", "1")) or 1.0)
+
+
+def _chunks(text):
+    size = int(os.getenv("AID_REPLAY_CHUNK_CHARS", "64"))
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class Cassettes:
+    """Cassette lookup with exact matching and per-stage sequence fallback."""
+
+    def __init__(self, cassette_dir=None):
+        self.cassette_dir = Path(cassette_dir or cassette_dir_setting())
+        self._all = None
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def find(self, prompt):
+        with self._lock:
+            return self._find(prompt)
+
+    def _find(self, prompt):
+        key = cassette_key(prompt)
+        path = self.cassette_dir / f"{key}.json"
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                self._used.add(key)
+                return json.load(f)
+        if _enabled("AID_REPLAY_STRICT"):
+            raise ReplayMiss(f"No cassette for prompt {key} in {self.cassette_dir} (AID_REPLAY_STRICT is set)")
+
+        if self._all is None:
+            self._all = load_cassettes(self.cassette_dir)
+        context = usage_context()
+        for cassette in self._all:
+            if cassette["key"] in self._used:
+                continue
+            if cassette.get("stage") == context.get("stage") and cassette.get("iteration") == context.get("iteration"):
+                self._used.add(cassette["key"])
+                return cassette
+        raise ReplayMiss(
+            f"No cassette for prompt {key} or for stage {context.get('stage')} "
+            f"iteration {context.get('iteration')} in {self.cassette_dir}. Record one with AID_RECORD=1."
+        )
+
+
+def _openai_response(cassette, model):
+    usage = cassette.get("usage") or {}
+    return SimpleNamespace(
+        model=cassette.get("model") or model,
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=cassette["text"]), finish_reason="stop")],
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
+            prompt_tokens_details=SimpleNamespace(cached_tokens=usage.get("cached_tokens", 0)),
+        ),
+    )
+
+
+def _openai_chunk(text, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)])
+
+
+class _ReplayCompletions:
+    def __init__(self, cassettes):
+        self._cassettes = cassettes
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        cassette = self._cassettes.find(prompt_text(messages=messages))
+        latency = _simulated_latency(cassette)
+        if not stream:
+            time.sleep(latency)
+            return _openai_response(cassette, model)
+        return self._stream(cassette, latency)
+
+    @staticmethod
+    def _stream(cassette, latency):
+        chunks = _chunks(cassette["text"])
+        time.sleep(latency * FIRST_CHUNK_SHARE)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(latency * (1 - FIRST_CHUNK_SHARE) / max(1, len(chunks) - 1))
+            yield _openai_chunk(chunk, "stop" if i == len(chunks) - 1 else None)
+
+
+_cassettes = None
+
+
+class ReplayClient:
+    """Stand-in for openai.OpenAI that serves cassettes."""
+
+    def __init__(self, cassettes=None):
+        global _cassettes
+        if cassettes is None:
+            # Shared per process, so sequence fallback does not serve a cassette twice
+            _cassettes = _cassettes or Cassettes()
+            cassettes = _cassettes
+        self.chat = SimpleNamespace(completions=_ReplayCompletions(cassettes))
+
+
+class _RecordingCompletions:
+    def __init__(self, completions):
+        self._completions = completions
+
+    def create(self, **kwargs):
+        started = time.monotonic()
+        response = self._completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return response  # Streams are not recorded; record the non-streamed call instead
+        latency_ms = round((time.monotonic() - started) * 1000)
+        save_cassette(prompt_text(messages=kwargs.get("messages")), response.choices[0].message.content,
+                      model_usage(response), latency_ms, kwargs.get("model"), "openai")
+        return response
+
+
+class _RecordingModels:
+    def __init__(self, models):
+        self._models = models
+
+    def generate_content(self, **kwargs):
+        started = time.monotonic()
+        response = self._models.generate_content(**kwargs)
+        latency_ms = round((time.monotonic() - started) * 1000)
+        save_cassette(prompt_text(contents=kwargs.get("contents")), response.text or "",
+                      model_usage(response), latency_ms, kwargs.get("model"), "gemini")
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class RecordingClient:
+    """Wraps a real OpenAI or Gemini client and saves each response as a cassette."""
+
+    def __init__(self, client):
+        self._client = client
+        if hasattr(client, "chat"):
+            self.chat = SimpleNamespace(completions=_RecordingCompletions(client.chat.completions))
+        if hasattr(client, "models"):
+            self.models = _RecordingModels(client.models)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _cached_client(provider, factory):
+    # One client per process: reuses its connection pool and lets the
+    # pipeline runner warm it up before the stage needs it
+    with _clients_lock:
+        if provider not in _clients:
+            _clients[provider] = factory()
+        return _clients[provider]
+
+
+def _new_openai_client():
+    if replaying():
+        return ReplayClient()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment. Create a .env file with your API key.")
+    import openai
+    client = openai.OpenAI(api_key=api_key)
+    return RecordingClient(client) if recording() else client
+
+
+def _new_gemini_client():
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment. Create a .env file with your API key.")
+    from google import genai
+    client = genai.Client(api_key=api_key)
+    return RecordingClient(client) if recording() else client
+
+
+def openai_client():
+    """
+    Return the client for OpenAI-style calls: a ReplayClient under
+    AI_PROVIDER=replay, otherwise openai.OpenAI (recording if AID_RECORD is set).
+    """
+    return _cached_client("openai", _new_openai_client)
+
+
+def gemini_client():
+    """Return a google.genai client (recording if AID_RECORD is set)."""
+    return _cached_client("gemini", _new_gemini_client)
+
+
+def main():
+    """List recorded cassettes."""
+    if len(sys.argv) < 2 or sys.argv[1] != "list":
+        print("Usage: python replay_provider.py list")
+        sys.exit(1)
+    cassettes = load_cassettes()
+    print(f"📼 {len(cassettes)} cassettes in {cassette_dir_setting()}")
+    for cassette in cassettes:
+        usage = cassette.get("usage") or {}
+        print(f"  {cassette['key']}  {cassette.get('stage') or '-':<16} iter {str(cassette.get('iteration') or '-'):<12} "
+              f"{cassette.get('model') or '-':<20} {usage.get('total_tokens', 0):>7} tok {cassette.get('latency_ms', 0):>6} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner
+Runs the pipeline stages for a feature in one process, in the order of
+.github/workflows/pipeline.yml, instead of one workflow job per stage.
+
+The .ai/pipeline/<feature_id>.state file is read and updated the way the
+workflow jobs do it: stages already marked ✓ are skipped (dev re-runs while an
+error context is pending), design only runs when needs_design is true, QA
+blocks on a failed build validation, and each finished stage updates the
+status and its ✓ line. A validated build marks the wireframe version the Dev
+Agent used as consumed.
+
+While a stage runs (mostly waiting on its model call), the next stage is
+prepared in the background: its module is imported, its static context files
+are read into memory, the knowledge index is loaded and the provider client
+is created. When the stage finishes, the next request can go out immediately.
+
+Usage:
+    python scripts/run_pipeline.py <feature_id> [--from STAGE] [--to STAGE] [--no-prefetch]
+
+Stages: product, design, architect, dev, build, qa, ops
+"""
+
+import contextvars
+import importlib
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+from prefetch import Prefetcher
+from tracing import span
+from wireframe_diff import mark_consumed
+
+SCRIPTS_DIR = Path(__file__).parent
+PIPELINE_DIR = SCRIPTS_DIR.parent / ".ai/pipeline"
+WIREFRAMES_DIR = SCRIPTS_DIR.parent / "design/wireframes"
+
+# (stage, module, extra arguments after the feature id); qa is checked in-process
+STAGES = [
+    ("product", "invoke_product_agent", []),
+    ("design", "invoke_design_agent_iterative", []),
+    ("architect", "invoke_architect_agent", []),
+    ("dev", "invoke_dev_agent_iterative", []),
+    ("build", "build_runner", ["--shards", "auto"]),
+    ("qa", None, []),
+    ("ops", "invoke_ops_agent", []),
+]
+# State file key per stage; dev and build are one workflow job, marked done after the build
+STATE_KEYS = {"build": "dev"}
+
+
+def state_path(feature_id):
+    return PIPELINE_DIR / f"{feature_id}.state"
+
+
+def read_state(feature_id):
+    """Return the feature's pipeline state file content ("" if there is none)."""
+    try:
+        with open(state_path(feature_id), 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+def update_state(feature_id, key, extra_lines=()):
+    """
+    Mark a stage complete, like the workflow's "Update pipeline state" steps.
+
+    Sets status to <key>_complete, the stage's line to ✓ and appends
+    extra_lines. Does nothing if the feature has no state file.
+    """
+    path = state_path(feature_id)
+    state = read_state(feature_id)
+    if not state:
+        return
+    state = re.sub(r"status:.*", f"status: {key}_complete", state)
+    state = re.sub(rf"{key}: .*", f"{key}: ✓", state)
+    state += "".join(f"{line}\n" for line in extra_lines)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(state)
+    os.replace(tmp_path, path)
+
+
+def skip_reason(stage, feature_id):
+    """Why the workflow would skip a stage for the current state, or None to run it."""
+    state = read_state(feature_id)
+    key = STATE_KEYS.get(stage, stage)
+    if key == "dev" and (PIPELINE_DIR / f"{feature_id}.error-context.json").exists():
+        return None  # An error fix was applied; dev re-runs to validate it
+    if f"{key}: ✓" in state:
+        return "already complete"
+    if stage == "design" and not re.search(r"^needs_design:\s*true\s*$", state, re.MULTILINE):
+        return "not needed"
+    return None
+
+
+def finish_stage(stage, feature_id):
+    """Record a finished stage in the state file. Returns an exit code (QA can fail)."""
+    if stage == "dev":
+        return 0  # Marked done once the build has been validated
+    if stage == "qa" and "build_validation: ✗" in read_state(feature_id):
+        print("❌ Build validation failed - blocking QA approval")
+        return 1
+    extra_lines = []
+    if stage == "build":
+        # build_runner exits 0 without a build file (validation skipped) or when it passed
+        if (PIPELINE_DIR / f"{feature_id}.build.json").exists():
+            extra_lines.append("  build_validation: ✓")
+            mark_consumed(WIREFRAMES_DIR / f"{feature_id}.json", "dev")
+            error_context = PIPELINE_DIR / f"{feature_id}.error-context.json"
+            if error_context.exists():
+                error_context.unlink()
+                extra_lines.append("  error_context_resolved: ✓")
+        else:
+            extra_lines.append("  build_validation: - skipped")
+    update_state(feature_id, STATE_KEYS.get(stage, stage), extra_lines)
+    return 0
+
+
+def run_stage(module_name, feature_id, extra_args):
+    """
+    Run a stage script's main() in-process.
+
+    sys.argv is set as if the script had been invoked directly, so stage
+    names in traces and the usage ledger stay the same. Each stage runs in
+    its own context so usage fields (iteration) do not leak into the next.
+
+    Returns:
+        int: The stage's exit code
+    """
+    module = importlib.import_module(module_name)
+    saved_argv = sys.argv
+    sys.argv = [str(SCRIPTS_DIR / f"{module_name}.py"), feature_id, *extra_args]
+    try:
+        contextvars.copy_context().run(module.main)
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        sys.argv = saved_argv
+
+
+def run_pipeline(feature_id, first=None, last=None, prefetch=True):
+    """
+    Run stages first..last for a feature, prefetching each next stage.
+
+    Stages the state file marks as complete or not needed are skipped.
+
+    Returns:
+        int: 0 if every stage succeeded, otherwise the failing stage's exit code
+    """
+    names = [name for name, _, _ in STAGES]
+    start = names.index(first) if first else 0
+    end = names.index(last) + 1 if last else len(STAGES)
+    stages = STAGES[start:end]
+
+    for i, (name, module_name, extra_args) in enumerate(stages):
+        reason = skip_reason(name, feature_id)
+        if reason:
+            print(f"\n⏭️  Stage {i + 1}/{len(stages)}: {name} skipped ({reason})")
+            continue
+
+        prefetcher = None
+        if prefetch and i + 1 < len(stages) and stages[i + 1][1]:
+            prefetcher = Prefetcher(stages[i + 1][1], feature_id)
+
+        print(f"\n{'=' * 60}\n▶️  Stage {i + 1}/{len(stages)}: {name}\n{'=' * 60}")
+        started = time.monotonic()
+        with span(f"stage.{name}", feature_id=feature_id):
+            code = run_stage(module_name, feature_id, extra_args) if module_name else 0
+            code = code or finish_stage(name, feature_id)
+        elapsed = time.monotonic() - started
+        if code:
+            print(f"❌ Stage {name} failed (exit {code}) after {elapsed:.1f}s")
+            return code
+        print(f"✅ Stage {name} finished in {elapsed:.1f}s")
+
+        if prefetcher:
+            waited = time.monotonic()
+            result = prefetcher.wait()
+            if result:
+                print(f"⚡ Prefetched {stages[i + 1][0]}: {result['files']} files in {result['seconds']:.2f}s "
+                      f"(waited {time.monotonic() - waited:.2f}s)")
+            elif prefetcher.error:
+                print(f"⚠️  Prefetch for {stages[i + 1][0]} failed: {prefetcher.error}")
+    return 0
+
+
+def main():
+    """Command line entry point."""
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Usage: python run_pipeline.py <feature_id> [--from STAGE] [--to STAGE] [--no-prefetch]")
+        sys.exit(1)
+
+    def option(name):
+        if name not in args or args.index(name) + 1 >= len(args):
+            return None
+        value = args[args.index(name) + 1]
+        if value not in [stage for stage, _, _ in STAGES]:
+            print(f"❌ Unknown stage: {value} (expected one of {', '.join(stage for stage, _, _ in STAGES)})")
+            sys.exit(1)
+        return value
+
+    sys.exit(run_pipeline(args[0], option("--from"), option("--to"), prefetch="--no-prefetch" not in args))
+
+
+if __name__ == "__main__":
+    main()
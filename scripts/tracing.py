@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Tracing Utility
+Lightweight spans for the agent scripts: context loading, prompt assembly,
+model calls, JSON recovery and file emission. Each span records its duration
+plus attributes such as byte and token counts and cache hits.
+
+Tracing is off unless one of these is set:
+    AID_TRACE_FILE=traces.jsonl   Append an OpenTelemetry (OTLP/JSON) export per run
+    AID_TRACE=summary             Print a per-span-name summary to stderr at exit
+
+They are read the first time a span is started (after the agents load .env),
+not at import.
+
+Usage:
+    from tracing import span, traced, start_span, set_attribute
+
+    @traced("load_file", result_attributes=lambda text: {"bytes": len(text)})
+    def load_file(path): ...
+
+    with span("model.openai", model=MODEL) as s:
+        ...
+        s.set("llm.completion_tokens", 1234)
+
+    python scripts/tracing.py summary traces.jsonl
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import secrets
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+SERVICE_NAME = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "aid"
+
+_current = contextvars.ContextVar("aid_current_span", default=None)
+_finished = []
+_trace_id = secrets.token_hex(16)
+_settings = None
+_flush_registered = False
+
+
+def _config():
+    """(trace file, trace mode), read from the environment on first use."""
+    global _settings, _flush_registered
+    if _settings is None:
+        _settings = (os.getenv("AID_TRACE_FILE", ""), os.getenv("AID_TRACE", "").lower())
+        if any(_settings) and not _flush_registered:
+            atexit.register(flush)
+            _flush_registered = True
+    return _settings
+
+
+def enabled():
+    """True if AID_TRACE_FILE or AID_TRACE is set."""
+    return any(_settings if _settings is not None else _config())
+
+
+class Span:
+    """A timed operation with attributes. Create with span() or start_span()."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status", "_token")
+
+    def __init__(self, name, attributes):
+        parent = _current.get()
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = "OK"
+        self._token = _current.set(self)
+
+    def set(self, key, value):
+        """Set an attribute."""
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        """Increment a numeric attribute (e.g. cache hits)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def end(self, **attributes):
+        """Finish the span, optionally adding attributes."""
+        if self.end_ns is not None:
+            return
+        self.attributes.update(attributes)
+        self.end_ns = time.time_ns()
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            _current.set(None)  # Ended in a different context than it started
+        _finished.append(self)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Stand-in used when tracing is disabled; every call is free."""
+
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def end(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("name", "attributes", "span")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        self.span = Span(self.name, self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and not issubclass(exc_type, SystemExit):
+            self.span.status = "ERROR"
+            self.span.set("error", f"{exc_type.__name__}: {exc}")
+        self.span.end()
+        return False
+
+
+def span(name, **attributes):
+    """Context manager that times a block as a span."""
+    if not enabled():
+        return _NOOP
+    return _SpanContext(name, attributes)
+
+
+def start_span(name, **attributes):
+    """Start a span that is finished explicitly with .end(); for code that cannot be indented."""
+    if not enabled():
+        return _NOOP
+    return Span(name, attributes)
+
+
+def current_span():
+    """Return the innermost active span (a no-op span if none or disabled)."""
+    return (_current.get() if enabled() else None) or _NOOP
+
+
+def set_attribute(key, value):
+    """Set an attribute on the innermost active span."""
+    current_span().set(key, value)
+
+
+def add_to_attribute(key, amount=1):
+    """Increment a counter attribute on the innermost active span."""
+    current_span().add(key, amount)
+
+
+def traced(name=None, args_attributes=None, result_attributes=None):
+    """
+    Decorator that wraps every call of a function in a span.
+
+    Args:
+        name: Span name (defaults to the function name)
+        args_attributes: Optional callable(*args, **kwargs) -> dict of attributes
+        result_attributes: Optional callable(result) -> dict of attributes
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            attributes = args_attributes(*args, **kwargs) if args_attributes else {}
+            with span(span_name, **attributes) as s:
+                result = func(*args, **kwargs)
+                if result_attributes:
+                    try:
+                        for key, value in result_attributes(result).items():
+                            s.set(key, value)
+                    except Exception:
+                        pass  # Attributes are best-effort; never break the call
+                return result
+        return wrapper
+    return decorator
+
+
+def file_attributes(filepath, *args, **kwargs):
+    """Span attributes for a call that takes a file path first."""
+    return {"path": str(filepath)}
+
+
+def text_attributes(text):
+    """Span attributes for loaded text: size and whether the file was missing."""
+    return {"chars": len(text), "missing": text.startswith("[File not found")}
+
+
+def prompt_attributes(system_prompt, user_prompt, *args, **kwargs):
+    """Span attributes for a model call: prompt sizes."""
+    return {"prompt.system_chars": len(system_prompt), "prompt.user_chars": len(user_prompt)}
+
+
+def model_usage(response):
+    """
+    Extract token usage from an OpenAI or Gemini response.
+
+    Returns:
+        dict: prompt_tokens, completion_tokens, cached_tokens, total_tokens (ints,
+        0 when the provider did not report them)
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None:  # OpenAI
+        details = getattr(usage, "prompt_tokens_details", None)
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        cached = getattr(details, "cached_tokens", 0) or 0 if details else 0
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "cached_tokens": cached,
+                "total_tokens": getattr(usage, "total_tokens", 0) or prompt + completion}
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:  # Gemini
+        prompt = getattr(metadata, "prompt_token_count", 0) or 0
+        completion = getattr(metadata, "candidates_token_count", 0) or 0
+        return {"prompt_tokens": prompt, "completion_tokens": completion,
+                "cached_tokens": getattr(metadata, "cached_content_token_count", 0) or 0,
+                "total_tokens": getattr(metadata, "total_token_count", 0) or prompt + completion}
+    return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "total_tokens": 0}
+
+
+def record_model_response(response):
+    """Attach token usage from a model response to the current span."""
+    if not enabled():
+        return
+    for key, value in model_usage(response).items():
+        add_to_attribute(f"llm.{key}", value)
+    model = getattr(response, "model", None) or getattr(response, "model_version", None)
+    if isinstance(model, str):
+        set_attribute("llm.model", model)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans, service_name=None):
+    """Render spans as an OTLP/JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name or SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "aid.tracing"},
+            "spans": [{
+                "traceId": _trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2 if s.status == "ERROR" else 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+def _attribute_value(value):
+    for key in ("intValue", "doubleValue", "boolValue", "stringValue"):
+        if key in value:
+            return int(value[key]) if key == "intValue" else value[key]
+    return None
+
+
+def summarize(spans):
+    """
+    Aggregate spans by name.
+
+    Args:
+        spans: Iterable of dicts with name, duration_ms and attributes
+
+    Returns:
+        list: Rows sorted by total time, with count, total/max ms and summed numeric attributes
+    """
+    rows = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0, "totals": defaultdict(float)})
+    for s in spans:
+        row = rows[s["name"]]
+        row["count"] += 1
+        row["total_ms"] += s["duration_ms"]
+        row["max_ms"] = max(row["max_ms"], s["duration_ms"])
+        row["errors"] += 1 if s.get("error") else 0
+        for key, value in s["attributes"].items():
+            if isinstance(value, bool):
+                row["totals"][key] += int(value)
+            elif isinstance(value, (int, float)):
+                row["totals"][key] += value
+    return sorted(({"name": name, **row} for name, row in rows.items()), key=lambda r: -r["total_ms"])
+
+
+def format_summary(rows):
+    """Render summary rows as a text table."""
+    lines = [f"{'span':<34}{'count':>6}{'total ms':>11}{'max ms':>10}  attributes"]
+    for row in rows:
+        extras = ", ".join(f"{k}={int(v) if float(v).is_integer() else round(v, 2)}" for k, v in sorted(row["totals"].items()))
+        errors = f" [{row['errors']} errors]" if row["errors"] else ""
+        lines.append(f"{row['name']:<34}{row['count']:>6}{row['total_ms']:>11.1f}{row['max_ms']:>10.1f}  {extras}{errors}")
+    return "\n".join(lines)
+
+
+def _span_dicts(spans):
+    return [{"name": s.name, "duration_ms": s.duration_ms, "attributes": s.attributes,
+             "error": s.status == "ERROR"} for s in spans]
+
+
+def load_trace_file(path):
+    """Read span dicts back from an OTLP/JSON lines file."""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line).get("resourceSpans", []):
+                for scope in resource.get("scopeSpans", []):
+                    for s in scope.get("spans", []):
+                        spans.append({
+                            "name": s["name"],
+                            "duration_ms": (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6,
+                            "attributes": {a["key"]: _attribute_value(a["value"]) for a in s.get("attributes", [])},
+                            "error": s.get("status", {}).get("code") == 2,
+                        })
+    return spans
+
+
+def reset(service_name=None):
+    """
+    Drop finished spans and start a new trace.
+
+    Used by runs forked from the warm worker (agent_worker.py), so each run
+    exports only its own spans, under its own trace id and service name, and
+    with the tracing settings of its own environment.
+    """
+    global SERVICE_NAME, _trace_id, _settings
+    _finished.clear()
+    _trace_id = secrets.token_hex(16)
+    _settings = None
+    if service_name:
+        SERVICE_NAME = service_name
+
+
+def flush():
+    """Export finished spans to AID_TRACE_FILE and/or print the summary."""
+    if not _finished:
+        return
+    spans = list(_finished)
+    _finished.clear()
+    trace_file, trace_mode = _config()
+    if trace_file:
+        try:
+            Path(trace_file).parent.mkdir(parents=True, exist_ok=True)
+            # One export request per line, as the OpenTelemetry file exporter writes them
+            with open(trace_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(to_otlp(spans)) + "\n")
+        except OSError as e:
+            print(f"⚠️  Could not write trace file {trace_file}: {e}", file=sys.stderr)
+    if trace_mode in ("summary", "console", "1", "true"):
+        print(f"\n⏱️  Trace summary ({SERVICE_NAME})\n{format_summary(summarize(_span_dicts(spans)))}", file=sys.stderr)
+
+
+def main():
+    """Summarize a trace file written via AID_TRACE_FILE."""
+    if len(sys.argv) < 3 or sys.argv[1] != "summary":
+        print("Usage: python tracing.py summary <trace_file>")
+        sys.exit(1)
+    print(format_summary(summarize(load_trace_file(sys.argv[2]))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger Utility
+Records token usage and latency for every model call, keyed by feature, stage
+and iteration, so prompt and context optimizations can be aimed at the calls
+that actually cost the most.
+
+Each call appends one record to .ai/usage/ledger.jsonl (via the journal's
+locked append): prompt, cached and completion tokens, latency, model and an
+estimated cost. Agents set the feature (and, for iterative agents, the
+iteration) with set_usage_context(); the stage defaults to the script name.
+
+Prices are USD per million tokens (input, cached input, output). Override or
+extend them with AID_MODEL_PRICES pointing to a JSON file of the same shape.
+
+Usage:
+    python scripts/usage_ledger.py report [--by feature|stage|iteration|candidate|model] [--top N] [--feature ID]
+"""
+
+import contextvars
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from journal import append_record, read_records
+from tracing import model_usage, record_model_response
+
+REPO_ROOT = Path(__file__).parent.parent
+DEFAULT_LEDGER_FILE = REPO_ROOT / ".ai/usage/ledger.jsonl"
+
+MODEL_PRICES = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+}
+
+_context = contextvars.ContextVar("aid_usage_context", default={})
+
+
+def ledger_file():
+    """The ledger file (AID_USAGE_LEDGER), read at call time so .env values apply."""
+    return Path(os.getenv("AID_USAGE_LEDGER") or DEFAULT_LEDGER_FILE)
+
+
+def _default_stage():
+    stem = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else ""
+    return stem.removeprefix("invoke_").replace("_agent", "") or "unknown"
+
+
+def set_usage_context(**fields):
+    """
+    Set fields (feature_id, stage, iteration) recorded with every following call.
+
+    Fields passed as None are removed. The context is per thread / task, like
+    contextvars; worker threads should run under contextvars.copy_context().
+    """
+    context = dict(_context.get())
+    for key, value in fields.items():
+        if value is None:
+            context.pop(key, None)
+        else:
+            context[key] = value
+    _context.set(context)
+
+
+def usage_context():
+    """Return the current usage context."""
+    return {"stage": _default_stage(), **_context.get()}
+
+
+def load_prices():
+    """Return the price table, merged with AID_MODEL_PRICES if set."""
+    prices = dict(MODEL_PRICES)
+    override = os.getenv("AID_MODEL_PRICES")
+    if override:
+        try:
+            with open(override, 'r', encoding='utf-8') as f:
+                prices.update({model: tuple(values) for model, values in json.load(f).items()})
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load AID_MODEL_PRICES ({override}): {e}", file=sys.stderr)
+    return prices
+
+
+def estimate_cost(model, usage, prices=None):
+    """
+    Estimate the USD cost of a call from its token usage.
+
+    Models are matched by longest prefix (gpt-4.1-2025-04-14 -> gpt-4.1).
+    Cached tokens are part of prompt_tokens for both providers.
+
+    Returns:
+        float or None: Cost, or None for unknown models
+    """
+    prices = prices or load_prices()
+    matches = [name for name in prices if (model or "").startswith(name)]
+    if not matches:
+        return None
+    input_price, cached_price, output_price = prices[max(matches, key=len)]
+    uncached = max(0, usage["prompt_tokens"] - usage["cached_tokens"])
+    return round((uncached * input_price + usage["cached_tokens"] * cached_price
+                  + usage["completion_tokens"] * output_price) / 1_000_000, 6)
+
+
+def record_usage(response, model, started, ledger_path=None):
+    """
+    Record one model call in the ledger and on the current trace span.
+
+    Args:
+        response: OpenAI or Gemini response object
+        model: Model name the call was made with
+        started: time.monotonic() taken just before the call
+        ledger_path: Optional ledger file (defaults to ledger_file())
+
+    Returns:
+        dict: The record written
+    """
+    latency_ms = round((time.monotonic() - started) * 1000)
+    usage = model_usage(response)
+    record_model_response(response)
+    record = {
+        **usage_context(),
+        "model": model,
+        "provider": "openai" if getattr(response, "usage", None) is not None else "gemini",
+        **usage,
+        "latency_ms": latency_ms,
+        "cost_usd": estimate_cost(model, usage),
+    }
+    if os.getenv("AI_PROVIDER", "").lower() == "replay":
+        return record  # Replayed responses cost nothing; keep them out of the ledger
+    try:
+        return append_record(ledger_path or ledger_file(), record)
+    except OSError as e:
+        print(f"⚠️  Could not record usage: {e}", file=sys.stderr)  # Accounting must never fail a run
+        return record
+
+
+def aggregate(records, by="feature_id"):
+    """
+    Sum usage per value of a record field.
+
+    Returns:
+        list: Row dicts (key, calls, tokens, latency, cost) sorted by cost, then total tokens
+    """
+    rows = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+                                "total_tokens": 0, "latency_ms": 0, "cost_usd": 0.0})
+    for record in records:
+        row = rows[str(record.get(by, "-"))]
+        row["calls"] += 1
+        for key in ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "latency_ms"):
+            row[key] += record.get(key) or 0
+        row["cost_usd"] += record.get("cost_usd") or 0.0
+    return sorted(({"key": key, **row} for key, row in rows.items()),
+                  key=lambda r: (-r["cost_usd"], -r["total_tokens"]))
+
+
+def format_report(rows, by, top=10):
+    """Render aggregated rows as a text table."""
+    lines = [f"{by:<28}{'calls':>6}{'prompt':>11}{'cached':>10}{'output':>10}{'latency s':>11}{'cost $':>10}"]
+    for row in rows[:top]:
+        lines.append(
+            f"{row['key'][:27]:<28}{row['calls']:>6}{row['prompt_tokens']:>11,}{row['cached_tokens']:>10,}"
+            f"{row['completion_tokens']:>10,}{row['latency_ms'] / 1000:>11.1f}{row['cost_usd']:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Print the most expensive features and stages."""
+    args = sys.argv[1:]
+    if not args or args[0] != "report":
+        print("Usage: python usage_ledger.py report [--by feature|stage|iteration|candidate|model] [--top N] [--feature ID]")
+        sys.exit(1)
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args and args.index(name) + 1 < len(args) else default
+
+    records = read_records(ledger_file())
+    feature = option("--feature")
+    if feature:
+        records = [record for record in records if record.get("feature_id") == feature]
+    if not records:
+        print(f"No usage recorded in {ledger_file()}")
+        return
+
+    total = aggregate(records, by="provider")
+    print(f"📊 {len(records)} calls, {sum(r['total_tokens'] for r in total):,} tokens, "
+          f"${sum(r['cost_usd'] for r in total):.4f} estimated\n")
+    top = int(option("--top", "10"))
+    by = option("--by")
+    groups = [by] if by else (["stage", "iteration"] if feature else ["feature", "stage"])
+    for group in groups:
+        field = "feature_id" if group == "feature" else group
+        print(format_report(aggregate(records, by=field), group, top))
+        print()
+
+
+if __name__ == "__main__":
+    main()
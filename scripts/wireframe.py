@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Wireframe Utility
+Validates and compacts the Design Agent's wireframe JSON.
+
+Wireframes are parsed into a tree of Node objects (__slots__, no per-node
+dict). Each node's style attributes (sizes, colors, fonts) are interned, so
+identical styles share one dict in memory. On disk, a style used by more than
+one node is stored once in a "styles" table and referenced by "styleRef":
+
+    {"format": "aid-wireframe/1",
+     "styles": {
+      "s1": {"fontSize": 16, "width": "FILL", "height": "HUG", "textAlign": "CENTER"}
+     },
+     "screens": [
+      {"name": "LoginScreen", "type": "FRAME", "width": 375, "height": 812, "children": [
+        {"name": "Title", "type": "TEXT", "characters": "Welcome", "styleRef": "s1"}
+      ]}
+     ]}
+
+The serializer streams one node per line, so large multi-screen wireframes
+are written without building the whole document in memory, and diffs stay
+line-oriented. load_wireframe() reads this format as well as the plain nested
+format, a list of screens, and design results that wrap the wireframe in
+wireframe_json / wireframe_json_string.
+
+Usage:
+    from wireframe import load_wireframe, parse_wireframe, save_wireframe, validate
+
+    python scripts/wireframe.py check <wireframe.json>
+    python scripts/wireframe.py compact <wireframe.json> [--write]
+    python scripts/wireframe.py expand <wireframe.json>
+"""
+
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+FORMAT = "aid-wireframe/1"
+STYLE_REF_KEY = "styleRef"
+STRUCTURAL_KEYS = frozenset({"name", "type", "children", STYLE_REF_KEY})
+# Attributes that are the node's content rather than its style; never shared
+CONTENT_KEYS = frozenset({"characters", "content", "label", "text", "placeholder", "value", "src", "alt", "href", "action"})
+KNOWN_TYPES = frozenset({
+    "FRAME", "GROUP", "SECTION", "COMPONENT", "INSTANCE", "TEXT", "RECTANGLE", "ELLIPSE",
+    "LINE", "VECTOR", "IMAGE", "ICON", "BUTTON", "INPUT",
+})
+SIZE_KEYS = frozenset({"width", "height", "layoutSizingHorizontal", "layoutSizingVertical"})
+SIZING_VALUES = frozenset({"FILL", "HUG", "FIXED", "AUTO"})
+NUMERIC_KEYS = frozenset({"fontSize", "cornerRadius", "gap", "opacity", "strokeWeight"})
+HEX_COLOR_RE = re.compile(r'^#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$')
+MAX_DEPTH = 32
+# Longer strings are documents pasted into the wireframe, not UI copy
+MAX_TEXT_CHARS = 500
+
+
+class WireframeError(ValueError):
+    """A wireframe cannot be parsed into a tree."""
+
+
+class Node:
+    """
+    One wireframe element.
+
+    content holds the node's own attributes (text, labels). style is shared
+    with every node of the same style: treat it as read-only.
+    """
+
+    __slots__ = ("name", "type", "content", "style", "children")
+
+    def __init__(self, name=None, type=None, content=None, style=None, children=None):
+        self.name = name
+        self.type = type
+        self.content = content or None
+        self.style = style or None
+        self.children = children or []
+
+    @property
+    def label(self):
+        """Name for messages and paths: the node's name, else its type."""
+        return self.name or self.type or "?"
+
+    def walk(self, path=()):
+        """Yield (path, node) for this node and its descendants, depth first."""
+        path = path + (self.label,)
+        stack = [(path, self)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            stack.extend((path + (child.label,), child) for child in reversed(node.children))
+
+    def to_dict(self, style_refs=None, children=True):
+        """
+        Render the node as a plain dict.
+
+        Args:
+            style_refs: id(style) -> style name for shared styles (None inlines every style)
+            children: Include the children (recursively)
+        """
+        data = {}
+        if self.name is not None:
+            data["name"] = self.name
+        if self.type is not None:
+            data["type"] = self.type
+        if self.content:
+            data.update(self.content)
+        if self.style:
+            ref = style_refs.get(id(self.style)) if style_refs else None
+            if ref:
+                data[STYLE_REF_KEY] = ref
+            else:
+                data.update(self.style)
+        if children and self.children:
+            data["children"] = [child.to_dict(style_refs) for child in self.children]
+        return data
+
+    def __repr__(self):
+        return f"Node({self.type} {self.name!r}, {len(self.children)} children)"
+
+
+class StyleTable:
+    """Interns style dicts so nodes with identical styles share one object."""
+
+    __slots__ = ("_styles", "_counts")
+
+    def __init__(self):
+        self._styles = {}
+        self._counts = {}
+
+    def intern(self, style):
+        """Return the shared dict equal to style (None for an empty style)."""
+        if not style:
+            return None
+        key = json.dumps(style, sort_keys=True, ensure_ascii=False)
+        shared = self._styles.setdefault(key, style)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        return shared
+
+    def __len__(self):
+        return len(self._styles)
+
+    def shared(self):
+        """Styles used by more than one node, in first-use order, as (name, style) pairs."""
+        reused = [self._styles[key] for key, count in self._counts.items() if count > 1]
+        return [(f"s{i}", style) for i, style in enumerate(reused, 1)]
+
+
+class Wireframe:
+    """A parsed wireframe: its screens (root nodes) and their style table."""
+
+    __slots__ = ("screens", "styles")
+
+    def __init__(self, screens, styles):
+        self.screens = screens
+        self.styles = styles
+
+    def walk(self):
+        """Yield (path, node) for every node of every screen."""
+        for screen in self.screens:
+            yield from screen.walk()
+
+    def node_count(self):
+        return sum(1 for _ in self.walk())
+
+    def style_refs(self):
+        """id(style) -> name for the styles stored once in the compact format."""
+        return {id(style): name for name, style in self.styles.shared()}
+
+    def to_data(self, compact=True):
+        """
+        Render the wireframe as plain JSON data.
+
+        Compact data uses the aid-wireframe/1 format. Expanded data is the
+        nested format, inlining every style: a single screen object, or a list
+        of screens.
+        """
+        if not compact:
+            screens = [screen.to_dict() for screen in self.screens]
+            return screens[0] if len(screens) == 1 else screens
+        refs = self.style_refs()
+        return {
+            "format": FORMAT,
+            "styles": {name: style for name, style in self.styles.shared()},
+            "screens": [screen.to_dict(refs) for screen in self.screens],
+        }
+
+
+def extract_wireframe(data):
+    """
+    Find the wireframe inside a design result.
+
+    Unwraps JSON strings and the wireframe_json_string, wireframe_json and
+    wireframe keys the Design Agent responses use.
+
+    Raises:
+        WireframeError: If a JSON string in the way does not parse
+    """
+    for _ in range(4):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except json.JSONDecodeError as e:
+                raise WireframeError(f"wireframe is not valid JSON: {e}") from e
+            continue
+        if isinstance(data, dict) and data.get("format") != FORMAT:
+            key = next((k for k in ("wireframe_json_string", "wireframe_json", "wireframe") if k in data), None)
+            if key:
+                data = data[key]
+                continue
+        break
+    return data
+
+
+def _parse_node(raw, shared_styles, table, path, depth):
+    where = "/".join(path)
+    if not isinstance(raw, dict):
+        raise WireframeError(f"{where}: node is {type(raw).__name__}, not an object")
+    if depth > MAX_DEPTH:
+        raise WireframeError(f"{where}: nested deeper than {MAX_DEPTH} levels")
+
+    content, style = {}, {}
+    ref = raw.get(STYLE_REF_KEY)
+    if ref is not None:
+        if ref not in shared_styles:
+            raise WireframeError(f"{where}: unknown {STYLE_REF_KEY} {ref!r}")
+        style.update(shared_styles[ref])
+    for key, value in raw.items():
+        if key not in STRUCTURAL_KEYS:
+            (content if key in CONTENT_KEYS else style)[key] = value
+
+    children = raw.get("children") or []
+    if not isinstance(children, list):
+        raise WireframeError(f"{where}: children is {type(children).__name__}, not a list")
+
+    name, node_type = raw.get("name"), raw.get("type")
+    node = Node(
+        name if isinstance(name, str) else (str(name) if name is not None else None),
+        node_type.upper() if isinstance(node_type, str) else None,
+        content,
+        table.intern(style),
+    )
+    node.children = [
+        _parse_node(child, shared_styles, table, path + (_raw_label(child),), depth + 1)
+        for child in children
+    ]
+    return node
+
+
+def _raw_label(raw):
+    if isinstance(raw, dict):
+        return str(raw.get("name") or raw.get("type") or "?")
+    return "?"
+
+
+def parse_wireframe(data):
+    """
+    Parse wireframe JSON data (any supported format) into a Wireframe.
+
+    Args:
+        data: Parsed JSON, or a JSON string
+
+    Returns:
+        Wireframe
+
+    Raises:
+        WireframeError: If the data is not a tree of node objects
+    """
+    data = extract_wireframe(data)
+    if isinstance(data, dict) and data.get("format") == FORMAT:
+        shared_styles = data.get("styles") or {}
+        raw_screens = data.get("screens") or []
+    else:
+        shared_styles = {}
+        raw_screens = data if isinstance(data, list) else [data]
+    if not raw_screens or raw_screens == [{}]:
+        raise WireframeError("wireframe is empty")
+
+    table = StyleTable()
+    screens = [_parse_node(raw, shared_styles, table, (_raw_label(raw),), 0) for raw in raw_screens]
+    return Wireframe(screens, table)
+
+
+def load_wireframe(path):
+    """Load and parse a wireframe file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_wireframe(json.load(f))
+
+
+def validate(wireframe):
+    """
+    Check a parsed wireframe for problems that do not prevent parsing.
+
+    Returns:
+        list: Issue strings ("Screen/Card/Title: ..."), empty if none
+    """
+    issues = []
+    for path, node in wireframe.walk():
+        where = "/".join(path)
+        if node.name is None:
+            issues.append(f"{where}: node has no name")
+        if node.type is None:
+            issues.append(f"{where}: node has no type")
+        elif node.type not in KNOWN_TYPES:
+            issues.append(f"{where}: unknown type {node.type}")
+        if node.type == "TEXT" and not (node.content or {}).get("characters") and not (node.content or {}).get("content"):
+            issues.append(f"{where}: TEXT node has no characters")
+
+        seen = set()
+        for child in node.children:
+            key = (child.name, child.type)
+            if child.name is not None and key in seen:
+                issues.append(f"{where}: duplicate child {child.type} {child.name!r}")
+            seen.add(key)
+
+        for key, value in (node.style or {}).items():
+            if key in SIZE_KEYS and not (
+                (isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0)
+                or (isinstance(value, str) and value.upper() in SIZING_VALUES)
+            ):
+                issues.append(f"{where}: {key} must be a size in px or FILL/HUG/FIXED, got {value!r}")
+            elif key in NUMERIC_KEYS and not (isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0):
+                issues.append(f"{where}: {key} must be a non-negative number, got {value!r}")
+            elif key.lower().endswith("color") and isinstance(value, str) and not HEX_COLOR_RE.match(value):
+                issues.append(f"{where}: {key} is not a hex color: {value!r}")
+        for key, value in {**(node.style or {}), **(node.content or {})}.items():
+            if isinstance(value, str) and len(value) > MAX_TEXT_CHARS:
+                issues.append(f"{where}: {key} holds {len(value):,} chars of text (UI copy only, max {MAX_TEXT_CHARS})")
+    return issues
+
+
+def _iter_node(node, style_refs, depth):
+    pad = "  " * depth
+    head = node.to_dict(style_refs, children=False)
+    text = json.dumps(head, ensure_ascii=False)
+    if not node.children:
+        yield pad + text
+        return
+    yield pad + text[:-1] + (", " if head else "") + '"children": [\n'
+    last = len(node.children) - 1
+    for i, child in enumerate(node.children):
+        yield from _iter_node(child, style_refs, depth + 1)
+        yield ",\n" if i < last else "\n"
+    yield pad + "]}"
+
+
+def iter_json(wireframe, compact=True):
+    """
+    Yield the wireframe as JSON text in chunks, one node per line.
+
+    Args:
+        wireframe: A parsed Wireframe
+        compact: Use the aid-wireframe/1 format with shared styles (else the
+            expanded nested format)
+    """
+    if not compact:
+        many = len(wireframe.screens) > 1
+        if many:
+            yield "[\n"
+        for i, screen in enumerate(wireframe.screens):
+            yield from _iter_node(screen, None, 1 if many else 0)
+            yield ",\n" if i < len(wireframe.screens) - 1 else "\n"
+        if many:
+            yield "]\n"
+        return
+
+    refs = wireframe.style_refs()
+    shared = wireframe.styles.shared()
+    yield '{"format": ' + json.dumps(FORMAT) + ',\n "styles": {'
+    for i, (name, style) in enumerate(shared):
+        yield ("\n" if i == 0 else ",\n") + f"  {json.dumps(name)}: {json.dumps(style, ensure_ascii=False)}"
+    yield ("\n }" if shared else "}") + ',\n "screens": [\n'
+    for i, screen in enumerate(wireframe.screens):
+        yield from _iter_node(screen, refs, 1)
+        yield ",\n" if i < len(wireframe.screens) - 1 else "\n"
+    yield " ]}\n"
+
+
+def dumps(wireframe, compact=True):
+    """Serialize a wireframe to a string (see iter_json)."""
+    return "".join(iter_json(wireframe, compact))
+
+
+def write_wireframe(path, wireframe, compact=True):
+    """
+    Stream a wireframe to a file, replacing it atomically.
+
+    Returns:
+        int: Bytes written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in iter_json(wireframe, compact):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def save_wireframe(path, raw):
+    """
+    Validate a Design Agent wireframe and write it in the compact format.
+
+    A wireframe that cannot be parsed into a tree is written as returned
+    (pretty-printed if it is JSON), as before.
+
+    Args:
+        path: Target file
+        raw: The wireframe as returned: object, list or JSON string
+
+    Returns:
+        dict: wireframe (None if written as returned), nodes, styles, bytes, issues
+    """
+    path = Path(path)
+    try:
+        wireframe = parse_wireframe(raw)
+    except WireframeError as e:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            text = json.dumps(json.loads(raw) if isinstance(raw, str) else raw, indent=2)
+        except (TypeError, ValueError):
+            text = raw if isinstance(raw, str) else str(raw)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return {"wireframe": None, "nodes": 0, "styles": 0, "bytes": len(text.encode('utf-8')), "issues": [str(e)]}
+
+    return {
+        "wireframe": wireframe,
+        "nodes": wireframe.node_count(),
+        "styles": len(wireframe.styles.shared()),
+        "bytes": write_wireframe(path, wireframe),
+        "issues": validate(wireframe),
+    }
+
+
+def main():
+    """Check, compact or expand a wireframe file."""
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("check", "compact", "expand"):
+        print("Usage: python wireframe.py check|compact|expand <wireframe.json> [--write]")
+        sys.exit(1)
+    command, path = args[0], Path(args[1])
+
+    try:
+        wireframe = load_wireframe(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {path}: {e}")
+        sys.exit(1)
+
+    if command == "expand":
+        sys.stdout.writelines(iter_json(wireframe, compact=False))
+        return
+    if command == "compact":
+        if "--write" in args:
+            before = path.stat().st_size
+            after = write_wireframe(path, wireframe)
+            print(f"✅ {path}: {before:,} → {after:,} bytes")
+        else:
+            sys.stdout.writelines(iter_json(wireframe))
+        return
+
+    issues = validate(wireframe)
+    compact_size = len(dumps(wireframe).encode('utf-8'))
+    expanded_size = len(json.dumps(wireframe.to_data(compact=False), indent=2, ensure_ascii=False).encode('utf-8'))
+    print(f"{path}: {len(wireframe.screens)} screens, {wireframe.node_count()} nodes, "
+          f"{len(wireframe.styles)} distinct styles ({len(wireframe.styles.shared())} shared)")
+    print(f"  {path.stat().st_size:,} bytes on disk, {compact_size:,} compact, {expanded_size:,} expanded (indent=2)")
+    for issue in issues:
+        print(f"  ⚠️  {issue}")
+    if not issues:
+        print("  ✅ No issues")
+    sys.exit(1 if issues else 0)
+
+
+if __name__ == "__main__":
+    main()
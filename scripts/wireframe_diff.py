@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Wireframe Diff Utility
+Tree diff over wireframes (see wireframe.py), so a design change is stored
+and passed downstream as the nodes that changed rather than the whole tree.
+
+Nodes are matched by their path of "name:TYPE" keys; siblings with the same
+name and type get an occurrence suffix ("Item:TEXT[1]"). An edit script is a
+list of operations:
+
+    {"op": "add", "path": [parent...], "index": 2, "node": {...subtree...}}
+    {"op": "remove", "path": [node...]}
+    {"op": "move", "path": [node...], "index": 0}           (reorder among siblings)
+    {"op": "update", "path": [node...], "set": {...}, "unset": [...]}
+
+Moves are minimal: siblings on the longest common subsequence of the old and
+new order stay put. A node whose name or type changed is a remove plus an add.
+
+Each design run appends the delta from the previous version to
+design/wireframes/<feature-id>.json.history.jsonl, with a full snapshot every
+SNAPSHOT_EVERY versions. Any version can be rebuilt from there. A downstream
+stage marks the version it used as pending, and as consumed once its output
+is accepted (dev: when build validation passes). Its next prompt gets only
+the subtrees changed since the consumed version, or nothing if none did.
+
+Usage:
+    from wireframe_diff import diff, apply, record_version, wireframe_context, mark_pending, mark_consumed
+
+    python scripts/wireframe_diff.py diff <old.json> <new.json>
+    python scripts/wireframe_diff.py history <wireframe.json>
+    python scripts/wireframe_diff.py show <wireframe.json> <version>
+    python scripts/wireframe_diff.py changes <wireframe.json> [--stage dev]
+    python scripts/wireframe_diff.py accept <wireframe.json> [--stage dev]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from journal import append_record, content_hash, read_records
+from wireframe import WireframeError, dumps, load_wireframe, parse_wireframe
+
+SNAPSHOT_EVERY = 20
+
+
+def _child_keys(labels):
+    """Match keys for a list of sibling (name, type) pairs."""
+    counts, keys = {}, []
+    for name, node_type in labels:
+        base = f"{name or ''}:{node_type or ''}"
+        occurrence = counts.get(base, 0)
+        counts[base] = occurrence + 1
+        keys.append(base if occurrence == 0 else f"{base}[{occurrence}]")
+    return keys
+
+
+def _attributes(node):
+    return {**(node.style or {}), **(node.content or {})}
+
+
+def _same(a, b):
+    # 1 == 1.0 == True in Python, but not in a wireframe
+    return type(a) is type(b) and a == b
+
+
+def _lcs(a, b):
+    """Keys on a longest common subsequence of two key lists."""
+    if a == b:
+        return set(a)
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) - 1, -1, -1):
+        for j in range(len(b) - 1, -1, -1):
+            lengths[i][j] = lengths[i + 1][j + 1] + 1 if a[i] == b[j] else max(lengths[i + 1][j], lengths[i][j + 1])
+    keep, i, j = set(), 0, 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            keep.add(a[i])
+            i, j = i + 1, j + 1
+        elif lengths[i + 1][j] >= lengths[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return keep
+
+
+def _diff_children(path, old_children, new_children, ops):
+    old_keys = _child_keys((child.name, child.type) for child in old_children)
+    new_keys = _child_keys((child.name, child.type) for child in new_children)
+    old_by_key = dict(zip(old_keys, old_children))
+    new_by_key = dict(zip(new_keys, new_children))
+
+    for key in old_keys:
+        if key not in new_by_key:
+            ops.append({"op": "remove", "path": [*path, key]})
+    staying = _lcs([k for k in old_keys if k in new_by_key], [k for k in new_keys if k in old_by_key])
+    for index, key in enumerate(new_keys):
+        if key not in old_by_key:
+            ops.append({"op": "add", "path": list(path), "index": index, "node": new_by_key[key].to_dict()})
+        elif key not in staying:
+            ops.append({"op": "move", "path": [*path, key], "index": index})
+    for key in new_keys:
+        if key in old_by_key:
+            _diff_node((*path, key), old_by_key[key], new_by_key[key], ops)
+
+
+def _diff_node(path, old, new, ops):
+    before, after = _attributes(old), _attributes(new)
+    changed = {key: value for key, value in after.items() if key not in before or not _same(before[key], value)}
+    removed = [key for key in before if key not in after]
+    if changed or removed:
+        op = {"op": "update", "path": list(path)}
+        if changed:
+            op["set"] = changed
+        if removed:
+            op["unset"] = removed
+        ops.append(op)
+    _diff_children(path, old.children, new.children, ops)
+
+
+def diff(old, new):
+    """
+    Compute the edit script that turns one wireframe into another.
+
+    Args:
+        old: Previous Wireframe (None for an empty one)
+        new: Current Wireframe
+
+    Returns:
+        list: Operations (see module docstring); empty if the trees are equal
+    """
+    ops = []
+    _diff_children((), old.screens if old else [], new.screens, ops)
+    return ops
+
+
+def _resolve(screens, path):
+    """Return (node dict, sibling list) for a key path in an expanded tree (from Node.to_dict())."""
+    siblings, node = screens, None
+    for key in path:
+        if node is not None:
+            siblings = node.setdefault("children", [])
+        by_key = dict(zip(_child_keys((child.get("name"), child.get("type")) for child in siblings), siblings))
+        if key not in by_key:
+            raise WireframeError(f"no node at {'/'.join(path)}")
+        node = by_key[key]
+    return node, siblings
+
+
+def _detach(siblings, node):
+    for i, sibling in enumerate(siblings):
+        if sibling is node:
+            del siblings[i]
+            return
+
+
+def apply(base, ops):
+    """
+    Apply an edit script from diff() to a wireframe.
+
+    Every path refers to the base tree, so all nodes are looked up before
+    anything changes. Then updates, removes and moves are detached, and
+    adds and moves are inserted at their final index, lowest first.
+
+    Args:
+        base: Wireframe the script was computed from (None for an empty one)
+        ops: Operations from diff()
+
+    Returns:
+        Wireframe: The edited wireframe
+
+    Raises:
+        WireframeError: If a path does not exist in the base tree
+    """
+    data = base.to_data(compact=False) if base else []
+    screens = data if isinstance(data, list) else [data]
+
+    resolved = []
+    for op in ops:
+        if op["op"] == "add":
+            parent = _resolve(screens, op["path"])[0] if op["path"] else None
+            resolved.append((op, None, parent))
+        else:
+            node, siblings = _resolve(screens, op["path"])
+            resolved.append((op, node, siblings))
+
+    inserts = []
+    for op, node, target in resolved:
+        if op["op"] == "update":
+            node.update(op.get("set", {}))
+            for key in op.get("unset", []):
+                node.pop(key, None)
+        elif op["op"] == "remove":
+            _detach(target, node)
+        elif op["op"] == "move":
+            _detach(target, node)
+            inserts.append((target, op["index"], node))
+        elif op["op"] == "add":
+            siblings = target.setdefault("children", []) if target is not None else screens
+            inserts.append((siblings, op["index"], json.loads(json.dumps(op["node"]))))
+        else:
+            raise WireframeError(f"unknown operation {op['op']!r}")
+
+    for siblings, index, node in sorted(inserts, key=lambda item: (id(item[0]), item[1])):
+        siblings.insert(index, node)
+    return parse_wireframe(screens)
+
+
+def canonical(wireframe):
+    """Canonical JSON text of a wireframe (expanded, sorted keys), for comparison and hashing."""
+    return json.dumps(wireframe.to_data(compact=False), sort_keys=True, ensure_ascii=False) if wireframe else ""
+
+
+def history_path_for(wireframe_path):
+    """Return the delta history file that backs a wireframe file."""
+    wireframe_path = Path(wireframe_path)
+    return wireframe_path.with_name(wireframe_path.name + ".history.jsonl")
+
+
+def reconstruct(records, version=None):
+    """
+    Rebuild a version from history records.
+
+    Args:
+        records: Records from the history file
+        version: Version to rebuild (default: the latest)
+
+    Returns:
+        tuple: (Wireframe or None, version number; 0 if there is no history)
+    """
+    versions = [r for r in records if r.get("op") == "version" and (version is None or r["version"] <= version)]
+    if not versions:
+        return None, 0
+    start = max((i for i, r in enumerate(versions) if "snapshot" in r), default=None)
+    wireframe = parse_wireframe(versions[start]["snapshot"]) if start is not None else None
+    for record in versions[(start + 1) if start is not None else 0:]:
+        wireframe = apply(wireframe, record["ops"])
+    return wireframe, versions[-1]["version"]
+
+
+def _append_version(history_path, old, new, version):
+    version += 1
+    record = {"op": "version", "version": version, "hash": content_hash(canonical(new))}
+    if version % SNAPSHOT_EVERY == 1:
+        record["snapshot"] = new.to_data()
+    else:
+        record["ops"] = diff(old, new)
+    append_record(history_path, record)
+    return version
+
+
+def record_version(wireframe_path, raw):
+    """
+    Append a new wireframe version to the history before it is saved.
+
+    The delta is taken against the latest recorded version. If the file on
+    disk differs from that version (edited by hand, or saved before history
+    existed), the file is recorded first as its own version.
+
+    Args:
+        wireframe_path: The wireframe file about to be overwritten
+        raw: The new wireframe (any format parse_wireframe() accepts)
+
+    Returns:
+        dict: version and ops (empty if unchanged), or None if raw is not a node tree
+    """
+    try:
+        new = parse_wireframe(raw)
+    except WireframeError:
+        return None
+    history_path = history_path_for(wireframe_path)
+    latest, version = reconstruct(read_records(history_path))
+    try:
+        on_disk = load_wireframe(wireframe_path)
+    except (OSError, ValueError):
+        on_disk = None
+    if on_disk is not None and canonical(on_disk) != canonical(latest):
+        version = _append_version(history_path, latest, on_disk, version)
+        latest = on_disk
+
+    ops = diff(latest, new)
+    if not ops:
+        return {"version": version, "ops": []}
+    return {"version": _append_version(history_path, latest, new, version), "ops": ops}
+
+
+def mark_pending(wireframe_path, stage, version):
+    """Record that a stage produced output from a wireframe version that is not accepted yet."""
+    if version:
+        append_record(history_path_for(wireframe_path), {"op": "pending", "stage": stage, "version": version})
+
+
+def mark_consumed(wireframe_path, stage, version=None):
+    """
+    Record that a stage's output for a wireframe version has been accepted.
+
+    Args:
+        wireframe_path: The wireframe file
+        stage: Stage name ("dev")
+        version: Accepted version (default: the stage's latest pending version)
+
+    Returns:
+        int or None: The version marked consumed
+    """
+    history_path = history_path_for(wireframe_path)
+    if version is None:
+        marks = [r for r in read_records(history_path) if r.get("stage") == stage and r.get("op") in ("pending", "consumed")]
+        version = marks[-1]["version"] if marks and marks[-1]["op"] == "pending" else None
+    if version:
+        append_record(history_path, {"op": "consumed", "stage": stage, "version": version})
+    return version
+
+
+def _display_path(path):
+    return "/".join(key.split(":")[0] or key for key in path) or "(root)"
+
+
+def format_changes(ops):
+    """Render an edit script as prompt-friendly lines, one per changed subtree."""
+    lines = []
+    for op in ops:
+        where = _display_path(op["path"])
+        if op["op"] == "add":
+            lines.append(f"- added under {where} at position {op['index']}: {json.dumps(op['node'], ensure_ascii=False)}")
+        elif op["op"] == "remove":
+            lines.append(f"- removed {where}")
+        elif op["op"] == "move":
+            lines.append(f"- moved {where} to position {op['index']}")
+        else:
+            parts = []
+            if op.get("set"):
+                parts.append(f"set {json.dumps(op['set'], ensure_ascii=False)}")
+            if op.get("unset"):
+                parts.append(f"unset {', '.join(op['unset'])}")
+            lines.append(f"- updated {where}: {'; '.join(parts)}")
+    return "\n".join(lines)
+
+
+def wireframe_context(wireframe_path, stage="dev"):
+    """
+    Wireframe text for a downstream prompt.
+
+    The whole wireframe (compact format) until the stage has consumed a
+    version; after that only the subtrees changed since the consumed
+    version, and "" once there are none.
+
+    Returns:
+        tuple: (text, "" if there is nothing to send; version or None if
+            the file is not in the history)
+    """
+    try:
+        current = load_wireframe(wireframe_path)
+    except (OSError, ValueError):
+        return "", None
+
+    records = read_records(history_path_for(wireframe_path))
+    latest, version = reconstruct(records)
+    if latest is None or canonical(latest) != canonical(current):
+        version = None  # Not recorded yet; consumption cannot be tracked
+
+    consumed = [r["version"] for r in records if r.get("op") == "consumed" and r.get("stage") == stage]
+    if not (version and consumed):
+        return dumps(current), version
+    if consumed[-1] == version:
+        return "", version
+    base, _ = reconstruct(records, consumed[-1])
+    return (f"Wireframe version {version}. Changes since version {consumed[-1]} (already implemented); "
+            f"only these subtrees changed:\n{format_changes(diff(base, current))}"), version
+
+
+def main():
+    """Command line entry point."""
+    args = sys.argv[1:]
+    command = args[0] if args else ""
+    try:
+        if command == "diff" and len(args) >= 3:
+            print(json.dumps(diff(load_wireframe(args[1]), load_wireframe(args[2])), indent=2, ensure_ascii=False))
+            return
+        if command == "history" and len(args) >= 2:
+            history_path = history_path_for(args[1])
+            for record in read_records(history_path):
+                if record.get("op") == "version":
+                    kind = "snapshot" if "snapshot" in record else f"{len(record['ops'])} ops"
+                    print(f"v{record['version']:<4} {record.get('ts', ''):<20} {kind:<12} "
+                          f"{len(json.dumps(record)):>8,} bytes  {record['hash']}")
+                elif record.get("op") in ("pending", "consumed"):
+                    print(f"      {record.get('ts', ''):<20} {record['op']} for {record['stage']} (v{record['version']})")
+            return
+        if command == "show" and len(args) >= 3:
+            wireframe, version = reconstruct(read_records(history_path_for(args[1])), int(args[2]))
+            if wireframe is None:
+                print(f"❌ No version {args[2]} in {history_path_for(args[1])}")
+                sys.exit(1)
+            sys.stdout.write(dumps(wireframe))
+            return
+        if command == "changes" and len(args) >= 2:
+            stage = args[args.index("--stage") + 1] if "--stage" in args and args.index("--stage") + 1 < len(args) else "dev"
+            print(wireframe_context(args[1], stage)[0])
+            return
+        if command == "accept" and len(args) >= 2:
+            stage = args[args.index("--stage") + 1] if "--stage" in args and args.index("--stage") + 1 < len(args) else "dev"
+            version = mark_consumed(args[1], stage)
+            print(f"✅ Version {version} accepted for {stage}" if version else f"⏭️  No pending version for {stage}")
+            return
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("Usage: python wireframe_diff.py diff <old.json> <new.json> | history <wireframe.json> | "
+          "show <wireframe.json> <version> | changes <wireframe.json> [--stage dev] | "
+          "accept <wireframe.json> [--stage dev]")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Data Processor Benchmark
+Compares the in-memory process_data path with the streaming process_file path
+and the memory-mapped column cache on a synthetic input: wall time,
+throughput and peak RSS. Each path runs in a fresh process so peak memory is
+measured independently.
+
+The scaling mode runs the parallel engine with 1, 2, 4, ... workers up to the
+core count and reports speedup and parallel efficiency against one worker.
+
+The suite mode sweeps input sizes (1e3 to 1e8 rows) and dtypes across the
+in-memory, chunked and parallel paths, writes the results as JSON and, given
+a baseline file, fails when any case got slower than the threshold allows.
+
+Usage:
+    python src/benchmark_data_processor.py [rows] [chunk_rows] [csv|parquet]
+    python src/benchmark_data_processor.py scaling [rows] [max_workers]
+    python src/benchmark_data_processor.py suite [--max-rows N] [--dtypes int32,float64]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.2] [--save-baseline]
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+import pandas as pd
+
+from data_processor import (
+    DEFAULT_CHUNK_ROWS, build_column_cache, process_cached, process_data, process_data_parallel,
+    process_file, process_parquet_parallel
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process plus its finished workers in MB, or None if unavailable.
+
+    RUSAGE_CHILDREN holds the peak of the largest reaped child only, so for a
+    pool of concurrent workers this is a lower bound; RssSampler measures the
+    whole process tree where /proc is available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _tree_rss_kb(pid):
+    """Current RSS of a process and all its descendants in KB (Linux /proc)."""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status", 'r') as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", 'r') as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class RssSampler:
+    """Samples the summed RSS of this process and its worker processes in the background."""
+
+    INTERVAL = 0.02
+
+    def __init__(self):
+        self.peak_kb = 0
+        self.available = os.path.exists(f"/proc/{os.getpid()}/task")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            self.peak_kb = max(self.peak_kb, _tree_rss_kb(os.getpid()))
+            if self._stop.wait(self.INTERVAL):
+                return
+
+    def __enter__(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.available:
+            self._stop.set()
+            self._thread.join()
+
+    def peak_mb(self):
+        return self.peak_kb / 1024 if self.available else None
+
+
+SUITE_SIZES = [10 ** exponent for exponent in range(3, 9)]
+SUITE_DTYPES = ["int32", "int64", "float32", "float64"]
+SUITE_PATHS = ["in-memory", "chunked", "parallel"]
+DEFAULT_THRESHOLD = 0.2
+# Cases faster than this are dominated by timer and process noise; never flagged
+MIN_COMPARE_SECONDS = 0.01
+
+
+def _random_column(rng, n, dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return (rng.random(n) * 1000).astype(dtype)
+    high = min(1000, np.iinfo(dtype).max // 2)
+    return rng.integers(0, high, n, dtype=dtype)
+
+
+def generate_input(path, rows, chunk_rows=DEFAULT_CHUNK_ROWS, dtype="int64"):
+    """Write a synthetic input with an old_col column of the given dtype, chunk by chunk."""
+    path = Path(path)
+    rng = np.random.default_rng(0)
+    writer = None
+    written = 0
+    while written < rows:
+        n = min(chunk_rows, rows - written)
+        chunk = pd.DataFrame({
+            'id': np.arange(written, written + n, dtype=np.int64),
+            'old_col': _random_column(rng, n, dtype),
+        })
+        if path.suffix == ".parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += n
+    if writer is not None:
+        writer.close()
+
+
+def run_in_memory(input_path, output_path):
+    """Baseline: load everything, process, write everything."""
+    if Path(input_path).suffix == ".parquet":
+        df = pd.read_parquet(input_path)
+        process_data(df).to_parquet(output_path, index=False)
+    else:
+        df = pd.read_csv(input_path)
+        process_data(df).to_csv(output_path, index=False)
+    return len(df)
+
+
+def run_streaming(input_path, output_path, chunk_rows):
+    """Streaming path under test."""
+    return process_file(input_path, output_path, chunk_rows=chunk_rows)
+
+
+def run_cached(input_path, output_path):
+    """Warm start: map the prebuilt column cache instead of parsing the input."""
+    table = process_cached(input_path)
+    if Path(output_path).suffix == ".parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, output_path)
+    else:
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(table, output_path)
+    return table.num_rows
+
+
+def _measure(queue, mode, input_path, output_path, chunk_rows):
+    start = time.perf_counter()
+    with RssSampler() as sampler:
+        if mode == "in-memory":
+            rows = run_in_memory(input_path, output_path)
+        elif mode == "cached":
+            rows = run_cached(input_path, output_path)
+        elif mode == "parallel":
+            rows = process_parquet_parallel(input_path, output_path)
+        else:
+            rows = run_streaming(input_path, output_path, chunk_rows)
+    seconds = time.perf_counter() - start
+    # Worker processes count towards peak memory: the sampled tree peak, or the rusage estimate without /proc
+    peaks = [peak for peak in (sampler.peak_mb(), peak_rss_mb()) if peak is not None]
+    queue.put({"mode": mode, "rows": rows, "seconds": seconds, "peak_rss_mb": max(peaks) if peaks else None})
+
+
+def measure(mode, input_path, output_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Run one path in a fresh process and return its metrics.
+
+    Raises:
+        RuntimeError: If the measured process exits without reporting (e.g. it crashed)
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(queue, mode, str(input_path), str(output_path), chunk_rows))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+            try:
+                result = queue.get(timeout=1)  # Exited right after reporting
+                break
+            except Empty:
+                raise RuntimeError(f"{mode} benchmark process exited with code {process.exitcode} without a result")
+    process.join()
+    result["rows_per_sec"] = result["rows"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def worker_counts(max_workers):
+    """Powers of two up to max_workers, always including max_workers itself."""
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def run_scaling(rows, max_workers):
+    """Print the scaling curve of both parallel paths."""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.parquet"
+        # Small row groups so every worker gets several to decode
+        row_group_rows = max(10_000, rows // (max_workers * 4))
+        print(f"Generating {rows:,} rows (parquet, {row_group_rows:,} rows per row group)...")
+        generate_input(input_path, rows, chunk_rows=row_group_rows)
+        df = pd.read_parquet(input_path)
+
+        for label in ("in-memory (shared memory)", "parquet (row groups)"):
+            print(f"\n{label}")
+            print(f"{'workers':>8}{'seconds':>10}{'rows/s':>14}{'speedup':>10}{'efficiency':>12}")
+            baseline = None
+            for workers in worker_counts(max_workers):
+                start = time.perf_counter()
+                if label.startswith("in-memory"):
+                    process_data_parallel(df.copy(), workers=workers, min_rows_per_worker=1)
+                else:
+                    output_dir = Path(tmp) / f"out-{workers}"
+                    process_parquet_parallel(input_path, output_dir, workers=workers)
+                    shutil.rmtree(output_dir)
+                seconds = time.perf_counter() - start
+                baseline = baseline or seconds
+                speedup = baseline / seconds
+                print(f"{workers:>8}{seconds:>10.2f}{rows / seconds:>14,.0f}{speedup:>9.2f}x{speedup / workers:>11.0%}")
+
+
+def _flag(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def _case_key(result):
+    return (result["path"], result["dtype"], result["rows"])
+
+
+def run_suite(sizes, dtypes, paths=SUITE_PATHS, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Run every (size, dtype, path) case in a fresh process.
+
+    Small cases are repeated and the fastest run is kept, so the numbers are
+    stable enough to compare against a baseline.
+
+    Returns:
+        dict: meta (environment) and results (one dict per case)
+    """
+    results = []
+    print(f"{'rows':>12} {'dtype':<8} {'path':<10}{'seconds':>10}{'rows/s':>14}{'peak RSS MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            for dtype in dtypes:
+                input_path = Path(tmp) / f"input-{rows}-{dtype}.parquet"
+                generate_input(input_path, rows, chunk_rows=min(chunk_rows, max(1, rows // 4)), dtype=dtype)
+                repeats = 3 if rows <= 1_000_000 else 1
+                for path in paths:
+                    output_path = Path(tmp) / ("out" if path == "parallel" else "out.parquet")
+                    runs = []
+                    for _ in range(repeats):
+                        runs.append(measure("streaming" if path == "chunked" else path, input_path, output_path, chunk_rows))
+                        if output_path.is_dir():
+                            shutil.rmtree(output_path)
+                    best = min(runs, key=lambda r: r["seconds"])
+                    result = {
+                        "rows": rows, "dtype": dtype, "path": path,
+                        "seconds": round(best["seconds"], 6),
+                        "rows_per_sec": round(best["rows_per_sec"], 1),
+                        "peak_rss_mb": round(max(r["peak_rss_mb"] or 0 for r in runs), 1) if best["peak_rss_mb"] is not None else None,
+                    }
+                    results.append(result)
+                    rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else "n/a"
+                    print(f"{rows:>12,} {dtype:<8} {path:<10}{result['seconds']:>10.3f}{result['rows_per_sec']:>14,.0f}{rss:>13}", flush=True)
+                input_path.unlink()
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Find cases that got slower than the baseline by more than threshold.
+
+    Peak RSS is compared with the same threshold. Cases missing from the
+    baseline, or too fast to time reliably, are not flagged.
+
+    Returns:
+        list: Regression dicts (case, metric, baseline, current, change)
+    """
+    previous = {_case_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get(_case_key(result))
+        if before is None:
+            continue
+        checks = [("seconds", before["seconds"] >= MIN_COMPARE_SECONDS or result["seconds"] >= MIN_COMPARE_SECONDS),
+                  ("peak_rss_mb", before.get("peak_rss_mb") and result.get("peak_rss_mb"))]
+        for metric, comparable in checks:
+            if not comparable:
+                continue
+            change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+            if change > threshold:
+                regressions.append({"case": f"{result['path']} {result['dtype']} {result['rows']:,} rows",
+                                    "metric": metric, "baseline": before[metric],
+                                    "current": result[metric], "change": round(change, 3)})
+    return regressions
+
+
+def suite_main(args):
+    """Entry point for the suite mode."""
+    max_rows = int(float(_flag(args, "--max-rows", "1e8")))
+    dtypes = _flag(args, "--dtypes", ",".join(SUITE_DTYPES)).split(",")
+    output_file = _flag(args, "--output")
+    baseline_file = _flag(args, "--baseline")
+    threshold = float(_flag(args, "--threshold", DEFAULT_THRESHOLD))
+    if "--save-baseline" in args and not baseline_file:
+        print("❌ --save-baseline needs --baseline <file> to write to")
+        sys.exit(1)
+
+    report = run_suite([rows for rows in SUITE_SIZES if rows <= max_rows], dtypes)
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {output_file}")
+
+    if not baseline_file:
+        return
+    if "--save-baseline" in args:
+        with open(baseline_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {baseline_file}")
+        return
+    try:
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  Baseline not found: {baseline_file} (use --save-baseline to create it)")
+        return
+
+    regressions = compare_to_baseline(report, baseline, threshold)
+    if not regressions:
+        print(f"\n✅ No regressions above {threshold:.0%} against {baseline_file}")
+        return
+    print(f"\n❌ {len(regressions)} regressions above {threshold:.0%}:")
+    for regression in regressions:
+        print(f"  {regression['case']}: {regression['metric']} {regression['baseline']} -> "
+              f"{regression['current']} (+{regression['change']:.0%})")
+    sys.exit(1)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "suite":
+        suite_main(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "scaling":
+        rows = int(float(sys.argv[2])) if len(sys.argv) > 2 else 20_000_000
+        max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+        run_scaling(rows, max_workers)
+        return
+
+    rows = int(float(sys.argv[1])) if len(sys.argv) > 1 else 2_000_000
+    chunk_rows = int(float(sys.argv[2])) if len(sys.argv) > 2 else 250_000
+    fmt = sys.argv[3] if len(sys.argv) > 3 else "csv"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / f"input.{fmt}"
+        print(f"Generating {rows:,} rows ({fmt})...")
+        generate_input(input_path, rows)
+        print(f"Input size: {input_path.stat().st_size / 1e6:.1f} MB")
+        start = time.perf_counter()
+        build_column_cache(input_path)
+        print(f"Column cache built in {time.perf_counter() - start:.2f}s (one-off)\n")
+
+        print(f"{'mode':<12}{'seconds':>10}{'rows/s':>14}{'peak RSS MB':>14}")
+        for mode in ("in-memory", "streaming", "cached"):
+            result = measure(mode, input_path, Path(tmp) / f"output-{mode}.{fmt}", chunk_rows)
+            rss = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else "n/a"
+            print(f"{mode:<12}{result['seconds']:>10.2f}{result['rows_per_sec']:>14,.0f}{rss:>14}")
+
+
+if __name__ == "__main__":
+    main()
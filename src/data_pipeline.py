@@ -0,0 +1,295 @@
+"""
+Lazy Transform Pipeline
+Declarative, lazily evaluated transforms for data_processor.
+
+Column expressions, filters and derived columns build a plan instead of
+running eagerly. At sink time (collect() or sink()) the whole plan runs as one
+fused pass: each source chunk is cut into cache-sized blocks, and every
+operation in the plan is applied to a block before moving on to the next. No
+full-length intermediate column is ever materialized, and only the columns the
+plan references are read from the source.
+
+Usage:
+    from data_pipeline import col, scan
+
+    (scan("input.parquet")
+        .with_column("new_col", col("old_col") * 2)
+        .filter(col("new_col") > 100)
+        .with_column("ratio", col("new_col") / (col("old_col") + 1))
+        .select("old_col", "ratio")
+        .sink("output.parquet"))
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_processor import DEFAULT_CHUNK_ROWS, iter_chunks, write_chunks
+
+# Rows per fused block; small enough that a block's temporaries stay in cache
+BLOCK_ROWS = 65_536
+
+_BINARY = {
+    "+": np.add, "-": np.subtract, "*": np.multiply, "/": np.true_divide,
+    "//": np.floor_divide, "%": np.mod, "**": np.power,
+    "==": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal,
+    ">": np.greater, ">=": np.greater_equal, "&": np.logical_and, "|": np.logical_or,
+}
+_UNARY = {"neg": np.negative, "abs": np.absolute, "~": np.logical_not}
+
+
+class Expr:
+    """A node in a column expression tree. Build with col() and lit()."""
+
+    __slots__ = ("op", "args")
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+
+    def _binary(self, op, other, reflected=False):
+        other = other if isinstance(other, Expr) else lit(other)
+        return Expr(op, other, self) if reflected else Expr(op, self, other)
+
+    def __add__(self, other): return self._binary("+", other)
+    def __radd__(self, other): return self._binary("+", other, True)
+    def __sub__(self, other): return self._binary("-", other)
+    def __rsub__(self, other): return self._binary("-", other, True)
+    def __mul__(self, other): return self._binary("*", other)
+    def __rmul__(self, other): return self._binary("*", other, True)
+    def __truediv__(self, other): return self._binary("/", other)
+    def __rtruediv__(self, other): return self._binary("/", other, True)
+    def __floordiv__(self, other): return self._binary("//", other)
+    def __mod__(self, other): return self._binary("%", other)
+    def __pow__(self, other): return self._binary("**", other)
+    def __eq__(self, other): return self._binary("==", other)
+    def __ne__(self, other): return self._binary("!=", other)
+    def __lt__(self, other): return self._binary("<", other)
+    def __le__(self, other): return self._binary("<=", other)
+    def __gt__(self, other): return self._binary(">", other)
+    def __ge__(self, other): return self._binary(">=", other)
+    def __and__(self, other): return self._binary("&", other)
+    def __or__(self, other): return self._binary("|", other)
+    def __neg__(self): return Expr("neg", self)
+    def __abs__(self): return Expr("abs", self)
+    def __invert__(self): return Expr("~", self)
+
+    __hash__ = object.__hash__
+
+    def cast(self, dtype):
+        """Convert the result to another dtype."""
+        return Expr("cast", self, np.dtype(dtype))
+
+    def columns(self):
+        """Names of the source columns this expression reads."""
+        if self.op == "col":
+            return {self.args[0]}
+        return set().union(*(arg.columns() for arg in self.args if isinstance(arg, Expr)))
+
+    def evaluate(self, block):
+        """Evaluate against a dict of equal-length arrays."""
+        return self._eval(block)[0]
+
+    def _eval(self, block):
+        """
+        Returns:
+            tuple: (result, owned) where owned means the array is a temporary
+            this expression allocated and may be overwritten in place.
+        """
+        if self.op == "col":
+            return block[self.args[0]], False
+        if self.op == "lit":
+            return self.args[0], False
+        if self.op == "cast":
+            value, owned = self.args[0]._eval(block)
+            array = np.asarray(value)
+            result = array.astype(self.args[1], copy=False)
+            # A no-op cast returns its input, which is only ours if the child's was
+            return result, result is not array or (owned and array is value)
+
+        if self.op in _UNARY:
+            value, owned = self.args[0]._eval(block)
+            ufunc = _UNARY[self.op]
+            if owned and ufunc(value[:0]).dtype == value.dtype:
+                return ufunc(value, out=value), True
+            return ufunc(value), True
+
+        ufunc = _BINARY[self.op]
+        left, left_owned = self.args[0]._eval(block)
+        right, right_owned = self.args[1]._eval(block)
+        # Resolve the output dtype on empty slices, e.g. int / int -> float64
+        dtype = np.asarray(ufunc(_empty_like(left), _empty_like(right))).dtype
+        # Reuse a temporary from a child instead of allocating a new block
+        shape = np.broadcast_shapes(np.shape(left), np.shape(right))
+        for value, owned in ((left, left_owned), (right, right_owned)):
+            if owned and isinstance(value, np.ndarray) and value.dtype == dtype and value.shape == shape:
+                return ufunc(left, right, out=value), True
+        return ufunc(left, right), True
+
+    def __repr__(self):
+        if self.op == "col":
+            return f"col({self.args[0]!r})"
+        if self.op == "lit":
+            return repr(self.args[0])
+        if self.op == "cast":
+            return f"{self.args[0]!r}.cast({self.args[1]})"
+        if self.op in _UNARY:
+            return f"{self.op}({self.args[0]!r})"
+        return f"({self.args[0]!r} {self.op} {self.args[1]!r})"
+
+
+def _empty_like(value):
+    return value[:0] if isinstance(value, np.ndarray) and value.ndim else value
+
+
+def col(name):
+    """Reference a column by name."""
+    return Expr("col", name)
+
+
+def lit(value):
+    """Wrap a constant."""
+    return Expr("lit", value)
+
+
+class LazyFrame:
+    """
+    An immutable plan over a source. Each method returns a new LazyFrame;
+    nothing runs until collect(), sink() or iter_chunks().
+    """
+
+    def __init__(self, source, steps=(), chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.source = source
+        self.steps = tuple(steps)
+        self.chunk_rows = chunk_rows
+
+    def _with(self, step):
+        return LazyFrame(self.source, self.steps + (step,), self.chunk_rows)
+
+    def with_column(self, name, expr):
+        """Add or replace a derived column."""
+        return self._with(("with_column", name, expr))
+
+    def filter(self, predicate):
+        """Keep rows where the boolean expression is true."""
+        return self._with(("filter", predicate))
+
+    def select(self, *names):
+        """Keep only the named columns, in this order."""
+        return self._with(("select", list(names)))
+
+    def required_columns(self):
+        """
+        Source columns the plan needs, or None for all of them.
+
+        Without a select() every source column reaches the output, so nothing
+        can be pruned. Columns only produced by with_column are not read.
+        """
+        if not any(step[0] == "select" for step in self.steps):
+            return None
+        needed = set()
+        for step in reversed(self.steps):
+            if step[0] == "select":
+                needed = set(step[1])
+            elif step[0] == "with_column":
+                needed.discard(step[1])
+                needed |= step[2].columns()
+            else:
+                needed |= step[1].columns()
+        return sorted(needed)
+
+    def explain(self):
+        """Describe the physical plan: projected scan, fused block operators, sink."""
+        columns = self.required_columns()
+        lines = [f"Scan {self._source_name()} columns={columns if columns is not None else 'all'}",
+                 f"  Fused pass over blocks of {BLOCK_ROWS:,} rows:"]
+        for step in self.steps:
+            if step[0] == "with_column":
+                lines.append(f"    {step[1]} = {step[2]!r}")
+            elif step[0] == "filter":
+                lines.append(f"    filter {step[1]!r}")
+            else:
+                lines.append(f"    select {step[1]}")
+        return "\n".join(lines)
+
+    def _source_name(self):
+        if isinstance(self.source, (str, bytes)) or hasattr(self.source, "__fspath__"):
+            return str(self.source)
+        return type(self.source).__name__
+
+    def _source_chunks(self, columns):
+        source = self.source
+        if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+            yield from iter_chunks(source, self.chunk_rows, columns)
+        elif isinstance(source, pd.DataFrame):
+            yield source if columns is None else source[columns]
+        elif hasattr(source, "to_pandas"):
+            # Arrow Table/RecordBatch: select before converting so unused columns are never copied
+            yield (source if columns is None else source.select(columns)).to_pandas()
+        else:
+            names = columns if columns is not None else list(source)
+            yield pd.DataFrame({name: source[name] for name in names}, copy=False)
+
+    def _run_block(self, block):
+        for step in self.steps:
+            if step[0] == "with_column":
+                value = step[2].evaluate(block)
+                if np.ndim(value) == 0:
+                    value = np.full(len(next(iter(block.values()))) if block else 0, value)
+                block[step[1]] = value
+            elif step[0] == "filter":
+                mask = np.asarray(step[1].evaluate(block), dtype=bool)
+                block = {name: values[mask] for name, values in block.items()}
+            else:
+                block = {name: block[name] for name in step[1]}
+        return block
+
+    def iter_chunks(self):
+        """Yield output DataFrames, one per source chunk."""
+        columns = self.required_columns()
+        for chunk in self._source_chunks(columns):
+            arrays = {name: chunk[name].to_numpy() for name in chunk.columns}
+            length = len(chunk)
+            blocks = [
+                self._run_block({name: values[start:start + BLOCK_ROWS] for name, values in arrays.items()})
+                for start in range(0, length, BLOCK_ROWS)
+            ] or [self._run_block(dict(arrays))]
+            names = list(blocks[0])
+            yield pd.DataFrame({
+                name: np.concatenate([block[name] for block in blocks]) if len(blocks) > 1 else blocks[0][name]
+                for name in names
+            })
+
+    def collect(self):
+        """Run the plan and return the result as one DataFrame."""
+        chunks = list(self.iter_chunks())
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
+
+    def sink(self, output_path):
+        """
+        Run the plan and stream the result to CSV or Parquet.
+
+        Returns:
+            int: Number of rows written
+        """
+        return write_chunks(self.iter_chunks(), output_path)
+
+
+def scan(source, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Start a lazy plan.
+
+    Args:
+        source: CSV/Parquet path, DataFrame, Arrow Table, or dict of arrays
+        chunk_rows: Rows per chunk when reading from a file
+
+    Returns:
+        LazyFrame: Empty plan over the source
+    """
+    return LazyFrame(source, chunk_rows=chunk_rows)
+
+
+def process_data_plan(source):
+    """The process_data transform (new_col = old_col * 2) as a lazy plan."""
+    return scan(source).with_column('new_col', col('old_col') * 2)
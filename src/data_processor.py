@@ -1,13 +1,469 @@
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+# Rows per batch for the streaming path; bounds peak memory regardless of input size
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+
+# Below this many rows per worker, process start-up costs more than it saves
+MIN_ROWS_PER_WORKER = 250_000
+
+# Silent unless the caller configures logging (e.g. logging.basicConfig(level=logging.INFO))
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _apply_transform(df):
+    """Add new_col = old_col * 2 to a frame (or chunk of one)."""
+    df['new_col'] = df['old_col'] * 2
+    return df
+
+
 def process_data(df):
     # Some processing logic
-    print("Starting data processing...")
-    df['new_col'] = df['old_col'] * 2
-    print("Processing data") # Fixed line 25: Added missing parenthesis
+    start = time.perf_counter()
+    logger.debug("process_data start rows=%d", len(df))
+    _apply_transform(df)
+    seconds = time.perf_counter() - start
+    logger.info("process_data done rows=%d seconds=%.4f", len(df), seconds,
+                extra={"rows": len(df), "seconds": seconds})
+    return df
+
+
+def _as_numpy(values):
+    """
+    View a column as a NumPy array without copying where the buffer allows it.
+
+    Accepts ndarrays, pandas Series and single-chunk Arrow arrays. Arrow arrays
+    with nulls, and pandas extension dtypes, cannot be viewed and are converted.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    if hasattr(values, "to_numpy") and type(values).__module__.startswith("pyarrow"):
+        try:
+            return values.to_numpy(zero_copy_only=True)
+        except Exception:
+            logger.debug("arrow column not zero-copy (nulls or chunked), converting")
+            return values.to_numpy(zero_copy_only=False)
+    return np.asarray(values)
+
+
+def _chunks(values):
+    """Split a column into its Arrow chunks, or a single-element list."""
+    return list(values.chunks) if hasattr(values, "chunks") else [values]
+
+
+def result_dtype(values, downcast=False):
+    """
+    Output dtype for transforming `values`.
+
+    With downcast=True, integer results use the narrowest integer type of the
+    same signedness that holds old_col * 2 for the actual value range (so the
+    "same_kind" cast in transform_column is allowed), and floats use float32.
+    """
+    arrays = [_as_numpy(chunk) for chunk in _chunks(values)]
+    arrays = [a for a in arrays if a.size] or [np.zeros(0, dtype=arrays[0].dtype if arrays else np.int64)]
+    dtype = (np.zeros(1, dtype=arrays[0].dtype) * 2).dtype
+    if not downcast or not arrays[0].size:
+        return dtype
+    if dtype.kind == "f":
+        return np.dtype(np.float32)
+    if dtype.kind in "iu":
+        low = min(int(a.min()) for a in arrays) * 2
+        high = max(int(a.max()) for a in arrays) * 2
+        candidates = (np.uint8, np.uint16, np.uint32) if dtype.kind == "u" else (np.int8, np.int16, np.int32)
+        for candidate in candidates:
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                return np.dtype(candidate)
+    return dtype
+
+
+def transform_column(values, out=None, dtype=None):
+    """
+    Compute old_col * 2 for a single column without copying or mutating it.
+
+    The result is written straight into `out` with np.multiply(..., out=), so a
+    caller can reuse one preallocated buffer across batches. Chunked Arrow
+    columns are processed chunk by chunk into slices of the output, never
+    concatenated.
+
+    Args:
+        values: ndarray, pandas Series, or Arrow Array/ChunkedArray
+        out: Optional preallocated output array of the same length
+        dtype: Output dtype when out is not given; "auto" downcasts to the
+            narrowest type that holds the result
+
+    Returns:
+        ndarray: The output buffer
+    """
+    length = len(values)
+    if out is None:
+        if dtype is None or dtype == "auto":
+            dtype = result_dtype(values, downcast=dtype == "auto")
+        out = np.empty(length, dtype=dtype)
+    elif len(out) != length:
+        raise ValueError(f"Output buffer has {len(out)} rows, expected {length}")
+
+    offset = 0
+    for chunk in _chunks(values):
+        src = _as_numpy(chunk)
+        np.multiply(src, 2, out=out[offset:offset + len(src)], casting="same_kind")
+        offset += len(src)
+    return out
+
+
+def process_columns(columns, out=None, dtype=None):
+    """
+    Non-mutating, columnar variant of process_data.
+
+    Works on a mapping of column name to array (dict of ndarrays, DataFrame) or
+    an Arrow Table/RecordBatch. Input columns are passed through by reference;
+    only new_col is allocated (or written into `out`).
+
+    Args:
+        columns: dict, DataFrame, or Arrow Table/RecordBatch with an old_col column
+        out: Optional preallocated output buffer for new_col
+        dtype: Output dtype for new_col, or "auto" to downcast
+
+    Returns:
+        dict or Arrow Table/RecordBatch: The input columns plus new_col
+    """
+    start = time.perf_counter()
+    new_col = transform_column(columns['old_col'], out=out, dtype=dtype)
+    seconds = time.perf_counter() - start
+    logger.info("process_columns done rows=%d dtype=%s seconds=%.4f", len(new_col), new_col.dtype, seconds,
+                extra={"rows": len(new_col), "dtype": str(new_col.dtype), "seconds": seconds})
+
+    if hasattr(columns, "append_column"):
+        # Arrow: existing buffers are shared with the input table
+        import pyarrow as pa
+        return columns.append_column('new_col', pa.array(new_col))
+    return {**{name: columns[name] for name in columns}, 'new_col': new_col}
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None):
+    """
+    Yield DataFrame chunks from a CSV or Parquet file without loading it whole.
+
+    Parquet is read in record batches of chunk_rows; CSV uses pandas' chunked reader.
+    """
+    path = Path(path)
+    if path.suffix.lower() in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+
+
+def process_chunks(chunks):
+    """Apply the process_data transform to each chunk of a stream."""
+    for chunk in chunks:
+        yield _apply_transform(chunk)
+
+
+def write_chunks(chunks, output_path):
+    """
+    Write a stream of chunks to CSV or Parquet incrementally.
+
+    Output goes to a temporary file that replaces output_path only once every
+    chunk is written, so a failure never leaves a partial file behind. Parquet
+    chunks are cast to the first chunk's schema (CSV chunks can infer
+    different dtypes, e.g. float64 once a blank cell appears).
+
+    Returns:
+        int: Number of rows written
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    rows = 0
+    try:
+        if output_path.suffix.lower() in PARQUET_SUFFIXES:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            try:
+                for chunk in chunks:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    writer.write_table(table.cast(writer.schema))
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(tmp_path, mode='w' if header else 'a', header=header, index=False)
+                header = False
+                rows += len(chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if tmp_path.exists():
+        os.replace(tmp_path, output_path)
+    return rows
+
+
+def process_file(input_path, output_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Streaming variant of process_data for inputs larger than memory.
+
+    Reads CSV or Parquet in chunk_rows batches, applies the same transform to
+    each batch and writes it out before reading the next, so peak memory is
+    bounded by the chunk size rather than the input size.
+
+    Returns:
+        int: Number of rows processed
+    """
+    return write_chunks(process_chunks(iter_chunks(input_path, chunk_rows)), output_path)
+
+
+def _partition(total, parts):
+    """Split range(total) into at most `parts` contiguous (start, stop) ranges."""
+    size = math.ceil(total / parts)
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _multiply_shared(in_name, out_name, length, in_dtype, out_dtype, start, stop):
+    """Worker: transform rows [start, stop) between shared-memory buffers."""
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    try:
+        src = np.ndarray((length,), dtype=in_dtype, buffer=in_shm.buf)
+        dst = np.ndarray((length,), dtype=out_dtype, buffer=out_shm.buf)
+        np.multiply(src[start:stop], 2, out=dst[start:stop])
+        del src, dst
+    finally:
+        in_shm.close()
+        out_shm.close()
+    return stop - start
+
+
+def process_data_parallel(df, workers=None, min_rows_per_worker=MIN_ROWS_PER_WORKER):
+    """
+    Multi-process variant of process_data.
+
+    old_col is copied once into shared memory; workers transform contiguous row
+    ranges straight into a shared output buffer, so no column data is pickled.
+    Falls back to the serial transform for small frames and non-numpy dtypes.
+
+    Returns:
+        DataFrame: df with new_col added, like process_data
+    """
+    workers = workers or os.cpu_count() or 1
+    column = df['old_col']
+    length = len(column)
+    parts = min(workers, max(1, length // min_rows_per_worker))
+    if parts <= 1 or not isinstance(column.dtype, np.dtype) or column.dtype.kind not in "iuf":
+        return _apply_transform(df)
+
+    in_dtype = column.dtype
+    out_dtype = (np.zeros(1, dtype=in_dtype) * 2).dtype
+    in_shm = shared_memory.SharedMemory(create=True, size=max(1, length * in_dtype.itemsize))
+    out_shm = shared_memory.SharedMemory(create=True, size=max(1, length * out_dtype.itemsize))
+    try:
+        np.ndarray((length,), dtype=in_dtype, buffer=in_shm.buf)[:] = column.to_numpy()
+        with ProcessPoolExecutor(max_workers=parts) as executor:
+            futures = [
+                executor.submit(_multiply_shared, in_shm.name, out_shm.name, length, in_dtype, out_dtype, start, stop)
+                for start, stop in _partition(length, parts)
+            ]
+            for future in futures:
+                future.result()
+        # Column assignment copies out of the shared buffer; that is the only copy made
+        result = np.ndarray((length,), dtype=out_dtype, buffer=out_shm.buf)
+        df['new_col'] = result
+        if np.may_share_memory(df['new_col'].to_numpy(), result):
+            df['new_col'] = result.copy()
+        del result
+    finally:
+        in_shm.close()
+        in_shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
+
     return df
 
+
+def _process_row_groups(input_path, output_path, row_groups):
+    """Worker: read, transform and write a contiguous run of Parquet row groups."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pq.ParquetFile(input_path).read_row_groups(row_groups)
+    old_col = table.column('old_col').to_numpy()
+    table = table.append_column('new_col', pa.array(old_col * 2))
+    pq.write_table(table, output_path)
+    return table.num_rows
+
+
+def process_parquet_parallel(input_path, output_dir, workers=None):
+    """
+    Transform a Parquet file across a process pool, partitioned by row group.
+
+    Each worker decodes its own row groups, applies the transform and writes an
+    ordered part file (part-00000.parquet, ...). Only row group indices cross
+    the process boundary, so decode, compute and encode all scale with cores.
+    Reading output_dir as a dataset yields rows in input order.
+
+    Parts are written to a staging directory next to output_dir and moved in
+    only once every worker has finished; part files from an earlier run are
+    removed then, so a rerun with fewer workers does not leave stale rows.
+
+    Returns:
+        int: Number of rows processed
+    """
+    import pyarrow.parquet as pq
+    workers = workers or os.cpu_count() or 1
+    output_dir = Path(output_dir)
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{output_dir.name}.staging-", dir=output_dir.parent))
+
+    try:
+        num_row_groups = pq.ParquetFile(input_path).metadata.num_row_groups
+        partitions = [list(range(start, stop)) for start, stop in _partition(num_row_groups, workers)] if num_row_groups else []
+
+        with ProcessPoolExecutor(max_workers=max(1, len(partitions))) as executor:
+            futures = [
+                executor.submit(_process_row_groups, str(input_path), str(staging_dir / f"part-{i:05d}.parquet"), groups)
+                for i, groups in enumerate(partitions)
+            ]
+            rows = sum(future.result() for future in futures)
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for stale in output_dir.glob("part-*.parquet"):
+            stale.unlink()
+        for part in sorted(staging_dir.glob("part-*.parquet")):
+            os.replace(part, output_dir / part.name)
+        return rows
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def cache_path_for(input_path, cache_dir=None):
+    """Location of the Arrow IPC column cache for an input file."""
+    input_path = Path(input_path)
+    cache_dir = Path(cache_dir) if cache_dir else input_path.parent
+    return cache_dir / f"{input_path.name}.arrow"
+
+
+def _source_stamp(input_path):
+    stat = Path(input_path).stat()
+    return {"source": str(Path(input_path).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cache_is_fresh(input_path, cache_path):
+    manifest_path = cache_path.with_name(cache_path.name + ".json")
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return cache_path.exists() and {k: manifest.get(k) for k in ("source", "size", "mtime_ns")} == _source_stamp(input_path)
+
+
+def build_column_cache(input_path, cache_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Convert a CSV or Parquet input into a memory-mappable Arrow IPC file.
+
+    The input is parsed once, in chunk_rows batches, and written as an
+    uncompressed Arrow file next to it (or in cache_dir) together with a
+    manifest of the source size and mtime.
+
+    Returns:
+        Path: The cache file
+    """
+    import pyarrow as pa
+    cache_path = cache_path_for(input_path, cache_dir)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    schema = None
+    try:
+        try:
+            for chunk in iter_chunks(input_path, chunk_rows):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(str(tmp_path), schema)
+                # CSV chunks can infer different dtypes; keep the first chunk's schema
+                writer.write_table(table.cast(schema))
+                rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if writer is None:
+        raise ValueError(f"No rows in {input_path}")
+    os.replace(tmp_path, cache_path)
+
+    with open(cache_path.with_name(cache_path.name + ".json"), 'w', encoding='utf-8') as f:
+        json.dump({**_source_stamp(input_path), "rows": rows, "columns": schema.names}, f, indent=2)
+    logger.info("column cache built rows=%d path=%s seconds=%.2f", rows, cache_path, time.perf_counter() - start)
+    return cache_path
+
+
+def open_cached(input_path, columns=None, cache_dir=None):
+    """
+    Memory-map the column cache for an input, building it first if stale.
+
+    Opening is zero-copy: no parsing happens and only the pages of the
+    selected columns are read from disk, on first access.
+
+    Args:
+        input_path: Original CSV or Parquet file
+        columns: Optional list of columns to select
+        cache_dir: Optional directory holding the cache
+
+    Returns:
+        pyarrow.Table: Table backed by the memory-mapped file
+    """
+    import pyarrow as pa
+    cache_path = cache_path_for(input_path, cache_dir)
+    if not _cache_is_fresh(input_path, cache_path):
+        build_column_cache(input_path, cache_dir)
+    table = pa.ipc.open_file(pa.memory_map(str(cache_path), 'r')).read_all()
+    return table.select(columns) if columns else table
+
+
+def load_frame(input_path, columns=None, cache_dir=None):
+    """DataFrame for process_data from the column cache, without re-parsing the input."""
+    return open_cached(input_path, columns, cache_dir).to_pandas(split_blocks=True)
+
+
+def process_cached(input_path, out=None, dtype=None, cache_dir=None):
+    """
+    Run the columnar transform over the memory-mapped cache of an input.
+
+    Only old_col is paged in; new_col is written into `out` if given.
+
+    Returns:
+        pyarrow.Table: old_col plus new_col
+    """
+    return process_columns(open_cached(input_path, ['old_col'], cache_dir), out=out, dtype=dtype)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     data = {'old_col': [1, 2, 3]}
     df = pd.DataFrame(data)
     processed_df = process_data(df)
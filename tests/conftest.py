@@ -0,0 +1,9 @@
+"""Put the flat script and source modules on the import path, as running them directly does."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+for directory in (ROOT / "scripts", ROOT / "src"):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
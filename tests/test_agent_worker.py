@@ -0,0 +1,86 @@
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+import agent_worker
+
+SCRIPTS_DIR = Path(agent_worker.__file__).parent
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"),
+                                reason="the agent worker needs fork() and Unix sockets")
+
+# A worker that serves one fake stage instead of preloading the real agents
+SERVER = textwrap.dedent("""
+    import os, sys, types
+    sys.path.insert(0, sys.argv[1])
+    import agent_worker
+
+    stage = types.ModuleType("fake_stage")
+    def main():
+        print(f"warm {sys.argv[1:]} {os.environ.get('MAX_FIX_ROUNDS')}")
+        sys.exit(3)
+    stage.main = main
+    sys.modules["fake_stage"] = stage
+    agent_worker.STAGE_MODULES = ["fake_stage"]
+
+    def preload(self):
+        self.preloaded = ["fake_stage"]
+        self.settings = agent_worker._settings(os.environ)
+        self.code_stamp = agent_worker._code_stamp()
+    agent_worker.Worker.preload = preload
+    agent_worker.Worker(sys.argv[2]).serve()
+""")
+
+CLIENT = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, sys.argv[1])
+    import agent_worker
+    sys.argv = ["fake_stage.py", "f-1"]
+    agent_worker.forward_to_worker("fake_stage.py")
+    print("cold")
+""")
+
+
+@pytest.fixture
+def worker(tmp_path):
+    socket_path = str(tmp_path / "w.sock")
+    env = {key: value for key, value in os.environ.items() if key not in ("AID_WORKER", agent_worker.CHILD_ENV)}
+    env.update(AID_WORKER_SOCKET=socket_path, MAX_FIX_ROUNDS="3")
+    env.pop("ERROR_CONTEXT_FILE", None)
+    server = subprocess.Popen([sys.executable, "-c", SERVER, str(SCRIPTS_DIR), socket_path], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not agent_worker.request({"command": "status"}, socket_path):
+        assert server.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+
+    def run(**overrides):
+        return subprocess.run([sys.executable, "-c", CLIENT, str(SCRIPTS_DIR)], env={**env, **overrides},
+                              stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=30)
+    yield run
+    agent_worker.request({"command": "stop"}, socket_path)
+    server.wait(timeout=10)
+
+
+def test_run_is_forked_from_the_worker(worker):
+    result = worker()
+    assert result.returncode == 3
+    assert result.stdout.strip() == "warm ['f-1'] 3"
+
+
+def test_per_run_error_context_file_is_forwarded(worker):
+    assert worker(ERROR_CONTEXT_FILE="/tmp/error.json").returncode == 3
+
+
+def test_different_stage_settings_start_cold(worker):
+    result = worker(MAX_FIX_ROUNDS="5")
+    assert result.returncode == 0
+    assert result.stdout.strip() == "cold"
+    assert "declined" in result.stderr
+    assert worker(KNOWLEDGE_MAX_CHARS="100").stdout.strip() == "cold"
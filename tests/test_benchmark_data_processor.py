@@ -0,0 +1,17 @@
+import pytest
+
+from benchmark_data_processor import compare_to_baseline, measure
+
+
+def test_measure_reports_crashed_child(tmp_path):
+    with pytest.raises(RuntimeError, match="exited with code"):
+        measure("parallel", tmp_path / "missing.parquet", tmp_path / "out")
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {"results": [{"path": "chunked", "dtype": "int64", "rows": 1000, "seconds": 1.0, "peak_rss_mb": 100}]}
+    report = {"results": [{"path": "chunked", "dtype": "int64", "rows": 1000, "seconds": 1.5, "peak_rss_mb": 105}]}
+
+    regressions = compare_to_baseline(report, baseline, threshold=0.2)
+
+    assert [r["metric"] for r in regressions] == ["seconds"]
@@ -0,0 +1,30 @@
+from bm25 import BM25Index, tokenize
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("The Google login is a session-handling issue") == ["google", "login", "session", "handling", "issue"]
+
+
+def test_matching_document_ranks_first():
+    index = BM25Index()
+    index.add("auth", "Google login and session handling")
+    index.add("charts", "Dashboard charts load slowly")
+    index.add("deploy", "Deployment runbook for staging")
+
+    ranked = index.score("google session")
+    assert ranked[0][0] == "auth"
+    assert ranked[0][1] > 0
+    assert dict(ranked)["charts"] == 0
+
+
+def test_remove_and_round_trip():
+    index = BM25Index()
+    index.add("a", "google login")
+    index.add("b", "google charts")
+    index.remove("a")
+
+    restored = BM25Index.from_dict(index.to_dict())
+    assert "a" not in restored and len(restored) == 1
+    assert restored.score("google charts") == index.score("google charts")
+    assert restored.score("login") == [("b", 0.0)]
+    assert restored.score("google", doc_ids=["missing"]) == []
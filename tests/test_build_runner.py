@@ -0,0 +1,50 @@
+import json
+
+import build_runner
+from build_runner import discover_test_files, install_is_cached
+
+
+def _tree(root, files):
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("def test_ok():\n    pass\n")
+
+
+def test_directory_argument_is_removed_before_sharding(tmp_path):
+    _tree(tmp_path, ["tests/test_a.py", "tests/unit/test_b.py", "scripts/test_newline_escape.py"])
+
+    files, base_cmd, separator = discover_test_files("python -m pytest -q tests/", tmp_path)
+
+    assert files == ["tests/test_a.py", "tests/unit/test_b.py"]
+    assert base_cmd == "python -m pytest -q"
+    assert separator == " "
+
+
+def test_configured_testpaths_limit_discovery(tmp_path):
+    _tree(tmp_path, ["tests/test_a.py", "scripts/test_newline_escape.py"])
+    (tmp_path / "pytest.ini").write_text("[pytest]\ntestpaths = tests\n")
+
+    files, base_cmd, _ = discover_test_files("pytest", tmp_path)
+
+    assert files == ["tests/test_a.py"]
+    assert base_cmd == "pytest"
+
+
+def test_shell_pipelines_are_not_sharded(tmp_path):
+    _tree(tmp_path, ["tests/test_a.py", "tests/test_b.py"])
+    assert discover_test_files("cd . && pytest tests", tmp_path) == ([], "cd . && pytest tests", "")
+
+
+def test_pip_install_stamp_needs_installed_packages(tmp_path, monkeypatch):
+    monkeypatch.setattr(build_runner, "CACHE_DIR", tmp_path / "cache")
+    (tmp_path / "cache").mkdir()
+    (tmp_path / "cache" / "f1.install.json").write_text(json.dumps({"key": "k"}))
+
+    (tmp_path / "requirements.txt").write_text("pytest>=7\n")
+    assert install_is_cached("f1", "k", "pip install -r requirements.txt", tmp_path)
+
+    (tmp_path / "requirements.txt").write_text("pytest>=7\nsurely-not-an-installed-package==1.0\n")
+    assert not install_is_cached("f1", "k", "pip install -r requirements.txt", tmp_path)
+    assert not install_is_cached("f1", "k", "pip install -e .", tmp_path)
+    assert not install_is_cached("f1", "other", "pip install -r requirements.txt", tmp_path)
@@ -0,0 +1,38 @@
+import pytest
+
+from candidate_scoring import best_of, score_candidate
+from usage_ledger import usage_context
+
+RULES = {"required": {"summary": str, "files_created": list}}
+
+
+def test_score_reports_missing_fields():
+    result = score_candidate({"summary": "done", "files_created": []}, RULES)
+    assert result["score"] < 1
+    assert result["failures"] == ["missing or empty files_created"]
+    assert score_candidate({"summary": "done", "files_created": ["a.py"]}, RULES)["score"] == 1
+
+
+def test_best_of_returns_the_highest_scoring_candidate_and_skips_failures():
+    candidates = {
+        1: {"summary": "partial", "files_created": []},
+        2: RuntimeError("invalid JSON"),
+        3: {"summary": "complete", "files_created": ["a.py"]},
+    }
+
+    def generate():
+        candidate = candidates[usage_context()["candidate"]]
+        if isinstance(candidate, Exception):
+            raise candidate
+        return candidate
+
+    assert best_of(generate, RULES, n=3)["summary"] == "complete"
+    assert "candidate" not in usage_context()
+
+
+def test_best_of_raises_when_every_candidate_fails():
+    def generate():
+        raise RuntimeError(f"candidate {usage_context()['candidate']} failed")
+
+    with pytest.raises(RuntimeError):
+        best_of(generate, RULES, n=2)
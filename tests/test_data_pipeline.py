@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from data_pipeline import col, lit, process_data_plan, scan
+
+
+def _frame():
+    return pd.DataFrame({'old_col': np.arange(1, 6, dtype=np.int64)})
+
+
+def test_plan_matches_process_data():
+    result = process_data_plan(_frame()).collect()
+    assert result['new_col'].tolist() == [2, 4, 6, 8, 10]
+
+
+def test_cast_of_derived_column_does_not_overwrite_it():
+    result = (scan(_frame())
+              .with_column('y', col('old_col') + 1)
+              .with_column('z', col('y').cast('int64') * 10)
+              .collect())
+    assert result['y'].tolist() == [2, 3, 4, 5, 6]
+    assert result['z'].tolist() == [20, 30, 40, 50, 60]
+
+
+def test_same_dtype_cast_of_source_column_leaves_source_intact():
+    df = _frame()
+    result = scan(df).with_column('z', col('old_col').cast('int64') + 1).collect()
+    assert result['z'].tolist() == [2, 3, 4, 5, 6]
+    assert df['old_col'].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_cast_literal_broadcasts():
+    result = scan(_frame()).with_column('z', lit(2).cast('float64') * col('old_col')).collect()
+    assert result['z'].tolist() == [2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+def test_filter_and_select_fuse(tmp_path):
+    output = tmp_path / "out.parquet"
+    rows = (scan(_frame())
+            .with_column('new_col', col('old_col') * 2)
+            .filter(col('new_col') > 4)
+            .select('new_col')
+            .sink(output))
+    assert rows == 3
+    assert pd.read_parquet(output)['new_col'].tolist() == [6, 8, 10]
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_processor import process_columns, process_data, process_file, write_chunks
+
+
+def test_process_data_adds_doubled_column():
+    df = process_data(pd.DataFrame({'old_col': [1, 2, 3]}))
+    assert df['new_col'].tolist() == [2, 4, 6]
+
+
+def test_process_columns_does_not_mutate_input():
+    old = np.array([1, 2, 3])
+    result = process_columns({'old_col': old})
+    assert result['old_col'] is old
+    assert result['new_col'].tolist() == [2, 4, 6]
+    assert old.tolist() == [1, 2, 3]
+
+
+def test_process_file_parquet_with_dtype_change_between_chunks(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("old_col,other\n1,10\n2,20\n3,\n4,40\n")
+    output = tmp_path / "out.parquet"
+
+    rows = process_file(source, output, chunk_rows=2)
+
+    assert rows == 4
+    table = pq.read_table(output)
+    assert table.column('new_col').to_pylist() == [2, 4, 6, 8]
+    assert table.column('other').to_pylist() == [10, 20, None, 40]
+
+
+def test_process_file_matches_csv_output(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("old_col\n" + "\n".join(str(i) for i in range(10)) + "\n")
+    output = tmp_path / "out.csv"
+
+    assert process_file(source, output, chunk_rows=3) == 10
+    assert pd.read_csv(output)['new_col'].tolist() == [i * 2 for i in range(10)]
+
+
+def test_failed_write_keeps_previous_output(tmp_path):
+    output = tmp_path / "out.parquet"
+    output.write_bytes(b"previous")
+
+    def chunks():
+        yield pd.DataFrame({'old_col': [1, 2]})
+        raise RuntimeError("reader failed")
+
+    with pytest.raises(RuntimeError):
+        write_chunks(chunks(), output)
+    assert output.read_bytes() == b"previous"
+    assert list(tmp_path.iterdir()) == [output]
+
+
+def test_process_data_parallel_matches_serial():
+    from data_processor import process_data_parallel
+    df = pd.DataFrame({'old_col': np.arange(1000, dtype=np.int64)})
+    result = process_data_parallel(df, workers=2, min_rows_per_worker=100)
+    assert result['new_col'].tolist() == [i * 2 for i in range(1000)]
+
+
+def test_parquet_parallel_rerun_replaces_old_parts(tmp_path):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from data_processor import process_parquet_parallel
+    source = tmp_path / "in.parquet"
+    pq.write_table(pa.table({'old_col': list(range(100))}), source, row_group_size=10)
+    output = tmp_path / "out"
+
+    assert process_parquet_parallel(source, output, workers=4) == 100
+    assert process_parquet_parallel(source, output, workers=2) == 100
+
+    assert sorted(p.name for p in output.iterdir()) == ["part-00000.parquet", "part-00001.parquet"]
+    table = ds.dataset(output).to_table()
+    assert table.num_rows == 100
+    assert sorted(table.column('new_col').to_pylist()) == [i * 2 for i in range(100)]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+
+@pytest.mark.parametrize("values, expected", [
+    (np.array([1, 2, 100]), np.int16),
+    (np.array([-5, 3]), np.int8),
+    (np.array([1, 2, 100], dtype=np.uint64), np.uint8),
+    (np.array([1, 40000], dtype=np.uint32), np.uint32),
+    (np.array([2 ** 40]), np.int64),
+    (np.array([1.5, 2.5]), np.float32),
+])
+def test_transform_column_auto_downcast(values, expected):
+    from data_processor import transform_column
+    result = transform_column(values, dtype="auto")
+    assert result.dtype == expected
+    assert result.tolist() == (values * 2).tolist()
+
+
+def test_transform_column_auto_downcast_chunked_arrow():
+    import pyarrow as pa
+    from data_processor import transform_column
+    result = transform_column(pa.chunked_array([[1, 2], [300]]), dtype="auto")
+    assert result.dtype == np.int16
+    assert result.tolist() == [2, 4, 600]
+
+
+def test_column_cache_is_reused_until_the_source_changes(tmp_path, monkeypatch):
+    import os
+    import data_processor
+    from data_processor import cache_path_for, open_cached, process_cached
+    source = tmp_path / "in.csv"
+    source.write_text("old_col\n1\n2\n3\n")
+    cache_dir = tmp_path / "cache"
+    builds = []
+    build = data_processor.build_column_cache
+    monkeypatch.setattr(data_processor, "build_column_cache",
+                        lambda *args, **kwargs: builds.append(args) or build(*args, **kwargs))
+
+    assert open_cached(source, cache_dir=cache_dir).column('old_col').to_pylist() == [1, 2, 3]
+    assert process_cached(source, cache_dir=cache_dir).column('new_col').to_pylist() == [2, 4, 6]
+    assert len(builds) == 1
+    assert cache_path_for(source, cache_dir).exists()
+
+    # Same size, newer mtime
+    source.write_text("old_col\n4\n5\n6\n")
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert open_cached(source, cache_dir=cache_dir).column('old_col').to_pylist() == [4, 5, 6]
+    assert len(builds) == 2
+
+    # Size change
+    source.write_text("old_col\n4\n5\n6\n7\n")
+    assert process_cached(source, cache_dir=cache_dir).column('new_col').to_pylist() == [8, 10, 12, 14]
+    assert len(builds) == 3
+
+
+def test_failed_cache_build_leaves_no_temp_file(tmp_path, monkeypatch):
+    import data_processor
+    from data_processor import build_column_cache
+
+    def chunks(*args, **kwargs):
+        yield pd.DataFrame({'old_col': [1, 2]})
+        raise RuntimeError("reader failed")
+
+    monkeypatch.setattr(data_processor, "iter_chunks", chunks)
+    source = tmp_path / "in.csv"
+    source.write_text("old_col\n1\n2\n")
+    with pytest.raises(RuntimeError):
+        build_column_cache(source, cache_dir=tmp_path / "cache")
+    assert list((tmp_path / "cache").iterdir()) == []
@@ -0,0 +1,66 @@
+import error_context
+from error_context import blob_hash, build_error_context, find_references, load_window, merge_windows
+
+
+def _write(root, rel, lines):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"line {i}\n" for i in range(1, lines + 1)), encoding="utf-8")
+    return path
+
+
+def test_python_traceback_references_innermost_frame_first(tmp_path):
+    app = _write(tmp_path, "src/app.py", 40)
+    util = _write(tmp_path, "src/util.py", 40)
+    log = f'''Traceback (most recent call last):
+  File "/home/runner/work/AID/AID/src/app.py", line 25, in main
+    run()
+  File "/usr/lib/python3.11/site-packages/click/core.py", line 10, in invoke
+  File "src/util.py", line 7, in run
+    raise ValueError("bad")
+ValueError: bad
+'''
+    references = find_references(log, tmp_path)
+    assert list(references) == [util.resolve(), app.resolve()]
+    assert references[app.resolve()] == [25]
+
+
+def test_typescript_and_node_file_line_col_references(tmp_path):
+    component = _write(tmp_path, "web/src/Login.tsx", 40)
+    server = _write(tmp_path, "web/src/server.ts", 40)
+    log = (
+        "web/src/Login.tsx:12:5 - error TS2304: Cannot find name 'session'.\n"
+        "TypeError: Cannot read properties of undefined\n"
+        "    at handler (/home/runner/work/AID/AID/web/src/server.ts:33:17)\n"
+        "    at node:internal/process/task_queues:95:5\n"
+    )
+    references = find_references(log, tmp_path)
+    assert references == {server.resolve(): [33], component.resolve(): [12]}
+
+
+def test_long_files_are_sent_as_marked_windows(tmp_path, monkeypatch):
+    monkeypatch.setattr(error_context, "CACHE_DIR", tmp_path / "cache")
+    _write(tmp_path, "src/big.py", 400)
+    context, files = build_error_context('File "src/big.py", line 200, in f', root=tmp_path)
+    assert files == ["src/big.py"]
+    assert "lines 180-220" in context
+    assert ">> 200 | line 200" in context and "line 179\n" not in context
+    assert merge_windows([10, 30, 100], 400, context=10) == [(1, 40), (90, 110)]
+
+
+def test_windows_are_cached_by_blob_hash(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(error_context, "CACHE_DIR", cache_dir)
+    path = _write(tmp_path, "src/app.py", 10)
+
+    first = load_window(path, 1, 5, [3])
+    [cache_file] = cache_dir.iterdir()
+    cache_file.write_text("cached", encoding="utf-8")
+    assert first.splitlines()[2] == ">> 3 | line 3"
+    assert load_window(path, 1, 5, [3]) == "cached"
+
+    # A changed file has a new blob hash, so it is rendered again
+    path.write_text("changed\n" * 10, encoding="utf-8")
+    assert load_window(path, 1, 5, [3]).splitlines()[2] == ">> 3 | changed"
+    assert len(list(cache_dir.iterdir())) == 2
+    assert blob_hash(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
@@ -0,0 +1,36 @@
+from error_fingerprint import find_fix, load_index, record_fix
+
+
+def _record(tmp_path, fixes):
+    index_path = tmp_path / "fingerprints.json"
+    record_fix("fp", {"message": "m", "path": "", "line_hash": ""}, "err-1", {"file_fixes": fixes},
+               root=tmp_path, index_path=index_path)
+    return index_path
+
+
+def test_existing_files_are_stored_as_edits(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\nb = 2\n")
+    index_path = _record(tmp_path, [{"path": "a.py", "content": "a = 1\nb = 3\n"}])
+    stored = load_index(index_path)["fp"]["file_fixes"][0]
+    assert "content" not in stored and stored["edits"]
+
+    # Still applies after an unrelated change elsewhere in the file
+    (tmp_path / "a.py").write_text("import os\n\n\n\n\na = 1\nb = 2\n")
+    entry, fixes = find_fix("fp", root=tmp_path, index_path=index_path)
+    assert fixes == [{"path": "a.py", "content": "import os\n\n\n\n\na = 1\nb = 3\n"}]
+
+
+def test_created_file_is_reused_only_while_absent(tmp_path):
+    index_path = _record(tmp_path, [{"path": "new.py", "content": "n = 1\n"}])
+    entry, fixes = find_fix("fp", root=tmp_path, index_path=index_path)
+    assert fixes == [{"path": "new.py", "content": "n = 1\n"}]
+
+    (tmp_path / "new.py").write_text("something else\n")
+    assert find_fix("fp", root=tmp_path, index_path=index_path) == (None, None)
+
+
+def test_deleted_file_is_a_miss(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n")
+    index_path = _record(tmp_path, [{"path": "a.py", "content": "a = 2\n"}])
+    (tmp_path / "a.py").unlink()
+    assert find_fix("fp", root=tmp_path, index_path=index_path) == (None, None)
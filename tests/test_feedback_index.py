@@ -0,0 +1,48 @@
+import json
+
+from feedback_index import mark_processed, select_entries, split_entries
+
+INBOX = """# Feedback Inbox
+
+---
+
+## 2025-01-02 (alice)
+Login with Google keeps failing on mobile.
+
+---
+
+## 2025-01-03 (bob)
+Dashboard charts load slowly.
+"""
+
+
+def test_entry_id_survives_text_edits():
+    _, before = split_entries(INBOX)
+    _, after = split_entries(INBOX.replace("keeps failing", "fails"))
+
+    assert [e["id"] for e in before] == [e["id"] for e in after]
+    assert len({e["id"] for e in before}) == 2
+
+
+def test_same_header_twice_gets_distinct_ids():
+    _, entries = split_entries(INBOX + "\n## 2025-01-03 (bob)\nAnother note.\n")
+    assert len({e["id"] for e in entries}) == 3
+
+
+def test_processed_entries_are_excluded_for_other_features(tmp_path):
+    inbox, index = tmp_path / "inbox.md", tmp_path / "feedback-index.json"
+    inbox.write_text(INBOX)
+
+    _, selected, total = select_entries("feature-1", "login google", inbox_path=inbox, index_path=index)
+    assert total == 2 and len(selected) == 2
+    login = next(e for e in selected if "Google" in e["text"])
+    mark_processed([login["id"]], "feature-1", index_path=index)
+
+    inbox.write_text(INBOX.replace("keeps failing", "fails"))
+    _, selected, _ = select_entries("feature-2", inbox_path=inbox, index_path=index)
+    assert [e["author"] for e in selected] == ["bob"]
+    _, selected, _ = select_entries("feature-1", inbox_path=inbox, index_path=index)
+    assert len(selected) == 2
+
+    # Only the processed map is persisted
+    assert set(json.loads(index.read_text())) == {"processed"}
@@ -0,0 +1,69 @@
+import shutil
+import subprocess
+
+import pytest
+
+from fix_validator import validate_fixes
+
+
+def _repo(tmp_path):
+    (tmp_path / "app.py").write_text("def answer():\n    return 41\n")
+    (tmp_path / "test_app.py").write_text("from app import answer\n\n\ndef test_answer():\n    assert answer() == 42\n")
+    return tmp_path
+
+
+def test_fix_that_makes_tests_pass(tmp_path):
+    root = _repo(tmp_path)
+    assert validate_fixes([{"path": "app.py", "content": "def answer():\n    return 42\n"}], root) == []
+    assert "41" in (root / "app.py").read_text()
+
+
+def test_fix_that_breaks_syntax_or_tests_fails(tmp_path):
+    root = _repo(tmp_path)
+    failures = validate_fixes([{"path": "app.py", "content": "def answer(:\n"}], root)
+    assert [f["check"] for f in failures][:1] == ["py_compile"]
+
+    failures = validate_fixes([{"path": "app.py", "content": "def answer():\n    return 0\n"}], root)
+    assert [f["check"] for f in failures] == ["pytest"]
+
+
+def test_test_file_without_tests_is_not_a_failure(tmp_path):
+    (tmp_path / "lib.py").write_text("X = 1\n")
+    (tmp_path / "test_lib.py").write_text("# placeholder, no tests yet\n")
+    assert validate_fixes([{"path": "lib.py", "content": "X = 2\n"}], tmp_path) == []
+
+
+def _git_repo(tmp_path):
+    root = tmp_path / "repo"
+    root.mkdir()
+    _repo(root)
+    (root / "build").mkdir()
+    (root / "build" / "config.json").write_text('{"tracked": true}\n')
+    (root / ".gitignore").write_text("dist/\n")
+    for args in (["init", "-q"], ["add", "."], ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"]):
+        subprocess.run(["git", *args], cwd=root, check=True)
+    return root
+
+
+@pytest.mark.skipif(not shutil.which("git"), reason="git is not installed")
+def test_git_checkout_validates_tracked_build_files_and_local_changes(tmp_path):
+    root = _git_repo(tmp_path)
+    # Uncommitted change that the fix's tests depend on
+    (root / "test_app.py").write_text("from app import answer\n\n\ndef test_answer():\n    assert answer() == 43\n")
+    (root / "dist").mkdir()
+    (root / "dist" / "bundle.json").write_text("{}")
+
+    assert validate_fixes([{"path": "app.py", "content": "def answer():\n    return 43\n"}], root) == []
+    assert validate_fixes([{"path": "build/config.json", "content": "{"}], root)[0]["check"] == "json"
+    assert validate_fixes([{"path": "dist/bundle.json", "content": "{}"}], root)[0]["check"] == "path"
+    worktrees = subprocess.run(["git", "worktree", "list"], cwd=root, capture_output=True, text=True).stdout
+    assert len(worktrees.splitlines()) == 1
+
+
+def test_fixes_under_skipped_dirs_are_refused_without_git(tmp_path):
+    root = _repo(tmp_path)
+    (root / "dist").mkdir()
+    (root / "dist" / "bundle.json").write_text("{}")
+    failures = validate_fixes([{"path": "dist/bundle.json", "content": "{}"}], root)
+    assert failures[0]["check"] == "path" and "dist/" in failures[0]["output"]
+    assert validate_fixes([{"path": "node_modules/pkg/index.js", "content": ""}], root)[0]["check"] == "path"
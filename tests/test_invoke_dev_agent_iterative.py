@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("pydantic")
+
+import invoke_dev_agent_iterative as dev  # noqa: E402
+from usage_ledger import set_usage_context, usage_context  # noqa: E402
+
+
+def _manifest(monkeypatch, response):
+    def fake_route(*args, **kwargs):
+        if isinstance(response, Exception):
+            raise response
+        return response
+    monkeypatch.setattr(dev, "route", fake_route)
+    return dev._request_manifest("", "", "", "", "f1")
+
+
+def test_empty_manifest_is_not_a_failure(monkeypatch):
+    assert _manifest(monkeypatch, {"files": []}) == []
+    assert _manifest(monkeypatch, RuntimeError("down")) is None
+    assert _manifest(monkeypatch, {"summary": "no files key"}) is None
+    assert _manifest(monkeypatch, {"files": [{"description": "no path"}]}) is None
+    assert _manifest(monkeypatch, {"files": [{"path": "a.py", "estimated_lines": 10}]})[0]["path"] == "a.py"
+
+
+def test_full_content_request_restores_iteration(monkeypatch):
+    set_usage_context(iteration=3)
+    seen = []
+    monkeypatch.setattr(dev, "route", lambda *args, **kwargs: seen.append(usage_context()["iteration"]) or {})
+    dev._request_full_content("", "f1", [{"path": "a.py", "error": "stale"}])
+    assert seen == ["full_content"]
+    assert usage_context()["iteration"] == 3
+    set_usage_context(iteration=None)
+
+
+def _run_with_manifest(tmp_path, monkeypatch, manifest, iteration, error_context=None):
+    monkeypatch.setattr(dev, "REPO_ROOT", tmp_path)
+    monkeypatch.setattr(dev, "DEV_PLANNER", "adaptive")
+    monkeypatch.setattr(dev, "context_for", lambda *args, **kwargs: "")
+    monkeypatch.setattr(dev, "_request_manifest", lambda *args, **kwargs: manifest)
+    monkeypatch.setattr(dev, "_invoke_iteration", iteration)
+    if error_context is not None:
+        path = tmp_path / "error.json"
+        path.write_text(__import__("json").dumps(error_context), encoding="utf-8")
+        monkeypatch.setenv("ERROR_CONTEXT_FILE", str(path))
+    else:
+        monkeypatch.delenv("ERROR_CONTEXT_FILE", raising=False)
+    return dev.invoke_dev_agent_iterative("f1")
+
+
+def test_failed_planned_iteration_is_retried(tmp_path, monkeypatch):
+    calls = []
+
+    def iteration(*args):
+        calls.append(args[5]["files"][0]["path"])
+        if len(calls) == 1:
+            raise RuntimeError("timeout")
+        return {"files_created": [{"path": "a.py", "content": "x = 1\n"}]}
+
+    result = _run_with_manifest(tmp_path, monkeypatch, [{"path": "a.py", "kind": "implementation", "description": "module", "estimated_lines": 5}], iteration)
+    assert calls == ["a.py", "a.py"]
+    assert [f["path"] for f in result["files_created"]] == ["a.py"]
+
+
+def test_empty_manifest_with_error_context_needs_no_changes(tmp_path, monkeypatch):
+    def iteration(*args):
+        raise AssertionError("no iteration expected")
+
+    fixed = _run_with_manifest(tmp_path, monkeypatch, [], iteration,
+                               error_context={"error_type": "build", "message": "fixed", "log_tail": ""})
+    assert fixed["_no_changes_needed"] and fixed["files_created"] == []
+    assert not _run_with_manifest(tmp_path, monkeypatch, [], iteration)["_no_changes_needed"]
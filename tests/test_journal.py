@@ -0,0 +1,53 @@
+import threading
+
+from journal import (append_markdown, append_record, compare_and_swap, content_hash, file_hash,
+                     journal_path_for, read_records, render)
+
+
+def test_append_record_adds_timestamp(tmp_path):
+    path = tmp_path / "log.jsonl"
+    append_record(path, {"op": "x", "n": 1})
+    append_record(path, {"op": "x", "n": 2})
+
+    records = read_records(path)
+    assert [r["n"] for r in records] == [1, 2]
+    assert all("ts" in r for r in records)
+    assert read_records(tmp_path / "missing.jsonl") == []
+
+
+def test_concurrent_appends_are_not_interleaved(tmp_path):
+    md = tmp_path / "active.md"
+    md.write_text("# Experiments\n")
+
+    threads = [threading.Thread(target=append_markdown, args=(md, f"## Entry {i}\nbody {i}", f"f{i}"))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    content = md.read_text()
+    for i in range(20):
+        assert f"## Entry {i}\nbody {i}\n" in content
+    assert render(md) == content
+
+
+def test_compare_and_swap_creates_missing_file(tmp_path):
+    beliefs = tmp_path / "beliefs" / "current.md"
+    beliefs.parent.mkdir()
+
+    assert file_hash(beliefs) == content_hash("")
+    assert compare_and_swap(beliefs, "# Beliefs\n", file_hash(beliefs), "f1")
+    assert beliefs.read_text() == "# Beliefs\n"
+
+
+def test_compare_and_swap_rejects_stale_hash(tmp_path):
+    beliefs = tmp_path / "current.md"
+    beliefs.write_text("v1")
+    stale = file_hash(beliefs)
+    assert compare_and_swap(beliefs, "v2", stale, "f1")
+
+    assert not compare_and_swap(beliefs, "v3", stale, "f2")
+    assert beliefs.read_text() == "v2"
+    last = read_records(journal_path_for(beliefs))[-1]
+    assert last["content"] == "v3" and last["applied"] is False
@@ -0,0 +1,66 @@
+import knowledge_index
+from knowledge_index import KnowledgeIndex, chunk_markdown, context_for
+
+DOC = """# Decision Rules
+
+## Pricing
+Discounts above twenty percent need finance approval.
+
+## Authentication
+Google login must keep the session for thirty days.
+
+## Charts
+Dashboard charts refresh every five minutes.
+
+## Sessions
+Session tokens rotate after login.
+"""
+
+
+def _use_index(tmp_path, monkeypatch):
+    index = KnowledgeIndex(tmp_path / "index.json", root=tmp_path)
+    monkeypatch.setattr(knowledge_index, "_index", index)
+    return index
+
+
+def test_chunk_markdown_splits_on_headings():
+    headings = [heading for heading, _ in chunk_markdown(DOC)]
+    assert headings == ["Decision Rules", "Pricing", "Authentication", "Charts", "Sessions"]
+
+
+def test_refresh_is_incremental(tmp_path):
+    doc = tmp_path / "rules.md"
+    doc.write_text(DOC, encoding="utf-8")
+    index = KnowledgeIndex(tmp_path / "index.json", root=tmp_path)
+
+    assert index.refresh([doc]) == 1
+    index.save()
+    reloaded = KnowledgeIndex(tmp_path / "index.json", root=tmp_path)
+    assert reloaded.refresh([doc]) == 0
+    assert reloaded.search("finance discounts", k=1)[0]["heading"] == "Pricing"
+
+
+def test_context_for_returns_small_documents_whole(tmp_path, monkeypatch):
+    _use_index(tmp_path, monkeypatch)
+    doc = tmp_path / "rules.md"
+    doc.write_text(DOC, encoding="utf-8")
+    assert context_for("anything", [doc], max_chars=10_000) == DOC
+    assert context_for("anything", [tmp_path / "missing.md"]) == ""
+
+
+def test_context_for_keeps_document_order(tmp_path, monkeypatch):
+    _use_index(tmp_path, monkeypatch)
+    doc = tmp_path / "rules.md"
+    doc.write_text(DOC, encoding="utf-8")
+
+    context = context_for("session login", [doc], max_chars=150)
+
+    assert "Pricing" not in context and "Charts" not in context
+    assert context.index("Google login") < context.index("Session tokens")
+
+
+def test_context_for_is_empty_when_nothing_matches(tmp_path, monkeypatch):
+    _use_index(tmp_path, monkeypatch)
+    doc = tmp_path / "rules.md"
+    doc.write_text(DOC, encoding="utf-8")
+    assert context_for("kubernetes", [doc], max_chars=50) == ""
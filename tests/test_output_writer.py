@@ -0,0 +1,64 @@
+import os
+import stat
+
+import pytest
+
+import output_writer
+from output_writer import OutputBatch
+
+
+def test_commit_writes_and_skips_unchanged(tmp_path):
+    (tmp_path / "same.txt").write_text("same")
+    batch = OutputBatch(tmp_path)
+    batch.add("same.txt", "same")
+    batch.add("new/dir/file.txt", "hello")
+    stats = batch.commit()
+
+    assert (tmp_path / "new/dir/file.txt").read_text() == "hello"
+    assert stats["written"] == [(tmp_path / "new/dir/file.txt").resolve()]
+    assert stats["skipped"] == [(tmp_path / "same.txt").resolve()]
+    assert not list(tmp_path.glob(".aid-staging-*"))
+
+
+def test_commit_keeps_file_mode(tmp_path):
+    script = tmp_path / "run.sh"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o755)
+    batch = OutputBatch(tmp_path)
+    batch.add("run.sh", "#!/bin/sh\necho hi\n")
+    batch.commit()
+
+    assert stat.S_IMODE(script.stat().st_mode) == 0o755
+    assert script.read_text() == "#!/bin/sh\necho hi\n"
+
+
+def test_add_refuses_paths_outside_root(tmp_path):
+    batch = OutputBatch(tmp_path / "repo")
+    with pytest.raises(ValueError):
+        batch.add("../escape.txt", "x")
+
+
+def test_failed_rename_rolls_back(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("old a")
+    batch = OutputBatch(tmp_path)
+    batch.add("a.txt", "new a")
+    batch.add("b.txt", "new b")
+    batch.add("c.txt", "new c")
+
+    real_replace = os.replace
+    calls = []
+
+    def failing_replace(src, dst):
+        calls.append(dst)
+        if str(dst).endswith("c.txt"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(output_writer.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        batch.commit()
+
+    assert (tmp_path / "a.txt").read_text() == "old a"
+    assert not (tmp_path / "b.txt").exists()
+    assert not (tmp_path / "c.txt").exists()
+    assert not list(tmp_path.glob(".aid-staging-*"))
@@ -0,0 +1,53 @@
+import pytest
+
+from journal import content_hash
+from patch_apply import PatchError, apply_change, apply_edits, apply_unified_diff, resolve_changes
+
+
+def test_exact_search_replace():
+    assert apply_edits("a = 1\nb = 2\n", [{"search": "b = 2\n", "replace": "b = 3\n"}]) == "a = 1\nb = 3\n"
+
+
+def test_whitespace_tolerant_match_keeps_line_structure():
+    text = "def f():\n    x = 1  \n    return x\n"
+    result = apply_edits(text, [{"search": "    x = 1\n", "replace": "    x = 2\n"}])
+    assert result == "def f():\n    x = 2\n    return x\n"
+
+
+def test_whitespace_tolerant_match_without_trailing_newline():
+    text = "def f():\n    x = 1  \n    return x\n"
+    result = apply_edits(text, [{"search": "    x = 1\n    return x", "replace": "    x = 2\n    return x"}])
+    assert result == "def f():\n    x = 2\n    return x\n"
+
+
+def test_ambiguous_search_is_refused():
+    with pytest.raises(PatchError, match="matches 2 times"):
+        apply_edits("x\nx\n", [{"search": "x", "replace": "y"}])
+
+
+def test_edits_require_matching_base_hash():
+    current = "a = 1\n"
+    edit = {"path": "a.py", "edits": [{"search": "a = 1", "replace": "a = 2"}]}
+    with pytest.raises(PatchError, match="base_hash"):
+        apply_change(edit, current)
+    with pytest.raises(PatchError, match="changed since"):
+        apply_change({**edit, "base_hash": content_hash("other")}, current)
+    assert apply_change({**edit, "base_hash": content_hash(current)}, current) == "a = 2\n"
+
+
+def test_unified_diff_tolerates_offset():
+    text = "one\ntwo\nthree\nfour\n"
+    diff = "@@ -1,2 +1,2 @@\n three\n-four\n+FOUR\n"
+    assert apply_unified_diff(text, diff) == "one\ntwo\nthree\nFOUR\n"
+
+
+def test_resolve_changes_reports_failures(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n")
+    changes = [
+        {"path": "a.py", "base_hash": content_hash("a = 1\n"), "edits": [{"search": "a = 1", "replace": "a = 2"}]},
+        {"path": "missing.py", "base_hash": "x", "edits": [{"search": "x", "replace": "y"}]},
+        {"path": "new.py", "content": "n = 1\n"},
+    ]
+    resolved, failures = resolve_changes(changes, tmp_path)
+    assert [(c["path"], c["content"]) for c in resolved] == [("a.py", "a = 2\n"), ("new.py", "n = 1\n")]
+    assert [f["path"] for f in failures] == ["missing.py"]
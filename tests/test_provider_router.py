@@ -0,0 +1,57 @@
+import time
+
+import provider_router
+from provider_router import LatencyStats, MIN_SAMPLES
+
+
+def test_hedge_delay_uses_the_stage_p95(tmp_path, monkeypatch):
+    monkeypatch.setenv("AID_HEDGE", "1")
+    monkeypatch.delenv("AID_HEDGE_AFTER", raising=False)
+    stats = LatencyStats(tmp_path / "latency.json")
+    endpoint = ("openai", "gpt-4.1")
+    for _ in range(MIN_SAMPLES):
+        stats.record(endpoint, 2.0, stage="product")
+        stats.record(endpoint, 120.0, stage="dev")
+
+    assert stats.hedge_delay(endpoint, "product") == 2.0
+    assert stats.hedge_delay(endpoint, "dev") == 120.0
+    assert stats.hedge_delay(endpoint, "ops") is None
+    assert stats.summary(endpoint)["count"] == 2 * MIN_SAMPLES
+
+
+def test_stage_windows_persist(tmp_path):
+    endpoint = ("gemini", "gemini-2.5-flash")
+    LatencyStats(tmp_path / "latency.json").record(endpoint, 1.5, stage="qa")
+    reloaded = LatencyStats(tmp_path / "latency.json")
+    assert reloaded.summary(endpoint, "qa")["p50"] == 1.5
+    assert reloaded.summary(endpoint, "dev")["count"] == 0
+
+
+def test_single_endpoint_is_never_hedged(tmp_path, monkeypatch):
+    monkeypatch.setenv("AID_HEDGE", "1")
+    monkeypatch.setenv("AID_HEDGE_AFTER", "0.01")
+    monkeypatch.setenv("AID_ENDPOINTS", "openai:gpt-4.1")
+    monkeypatch.setattr(provider_router, "_stats", LatencyStats(tmp_path / "latency.json"))
+    calls = []
+
+    def invoke(system_prompt, user_prompt, model):
+        calls.append(model)
+        time.sleep(0.2)
+        return {"ok": True}
+
+    assert provider_router.route("s", "u", openai=invoke) == {"ok": True}
+    assert calls == ["gpt-4.1"]
+
+
+def test_hedge_goes_to_the_next_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setenv("AID_HEDGE", "1")
+    monkeypatch.setenv("AID_HEDGE_AFTER", "0.01")
+    monkeypatch.setenv("AID_ENDPOINTS", "openai:slow,openai:fast")
+    monkeypatch.setattr(provider_router, "_stats", LatencyStats(tmp_path / "latency.json"))
+
+    def invoke(system_prompt, user_prompt, model):
+        if model == "slow":
+            time.sleep(1)
+        return model
+
+    assert provider_router.route("s", "u", openai=invoke) == "fast"
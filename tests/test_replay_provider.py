@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from replay_provider import Cassettes, RecordingClient, ReplayClient, ReplayMiss
+from tracing import model_usage
+
+MESSAGES = [{"role": "system", "content": "You are the Dev Agent."}, {"role": "user", "content": "Build f-1"}]
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, model=None, messages=None, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content='{"files_created": []}'),
+                                     finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30, total_tokens=150,
+                                  prompt_tokens_details=SimpleNamespace(cached_tokens=100)),
+        )
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch):
+    monkeypatch.setenv("AID_CASSETTE_DIR", str(tmp_path))
+    monkeypatch.delenv("AID_REPLAY_STRICT", raising=False)
+    monkeypatch.setenv("AID_REPLAY_LATENCY", "0")
+    live = FakeCompletions()
+    client = RecordingClient(SimpleNamespace(chat=SimpleNamespace(completions=live)))
+    response = client.chat.completions.create(model="gpt-4.1", messages=MESSAGES)
+    assert live.calls == 1
+    return tmp_path, response
+
+
+def test_recorded_call_replays_identically(recorded):
+    cassette_dir, live_response = recorded
+    assert len(list(cassette_dir.glob("*.json"))) == 1
+
+    replayed = ReplayClient(Cassettes(cassette_dir)).chat.completions.create(model="gpt-4.1", messages=MESSAGES)
+    assert replayed.choices[0].message.content == live_response.choices[0].message.content
+    assert model_usage(replayed) == model_usage(live_response)
+
+
+def test_replay_streams_the_recorded_text(recorded, monkeypatch):
+    cassette_dir, live_response = recorded
+    monkeypatch.setenv("AID_REPLAY_CHUNK_CHARS", "4")
+    chunks = list(ReplayClient(Cassettes(cassette_dir)).chat.completions.create(messages=MESSAGES, stream=True))
+    assert len(chunks) > 1
+    assert "".join(c.choices[0].delta.content for c in chunks) == live_response.choices[0].message.content
+    assert chunks[-1].choices[0].finish_reason == "stop"
+
+
+def test_changed_prompt_falls_back_unless_strict(recorded, monkeypatch):
+    cassette_dir, _ = recorded
+    changed = [MESSAGES[0], {"role": "user", "content": "Build f-1 (2026-10-19)"}]
+    replay = ReplayClient(Cassettes(cassette_dir)).chat.completions
+    assert replay.create(messages=changed).usage.total_tokens == 150
+    with pytest.raises(ReplayMiss):
+        replay.create(messages=changed)  # Each recorded cassette is served once
+
+    monkeypatch.setenv("AID_REPLAY_STRICT", "1")
+    with pytest.raises(ReplayMiss):
+        ReplayClient(Cassettes(cassette_dir)).chat.completions.create(messages=changed)
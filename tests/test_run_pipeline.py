@@ -0,0 +1,66 @@
+import run_pipeline
+from journal import read_records
+from wireframe_diff import mark_pending
+
+STATE = """feature: f1
+status: product_complete
+needs_design: false
+stages:
+  product: ✓ 2026-01-01
+  design: skipped
+  architect: pending
+  dev: pending
+  qa: pending
+  ops: pending
+"""
+
+
+def _run(tmp_path, monkeypatch, state, **kwargs):
+    monkeypatch.setattr(run_pipeline, "PIPELINE_DIR", tmp_path)
+    monkeypatch.setattr(run_pipeline, "WIREFRAMES_DIR", tmp_path)
+    (tmp_path / "f1.state").write_text(state)
+    ran = []
+    monkeypatch.setattr(run_pipeline, "run_stage", lambda module, feature_id, args: ran.append(module) or 0)
+    code = run_pipeline.run_pipeline("f1", prefetch=False, **kwargs)
+    return code, ran, (tmp_path / "f1.state").read_text()
+
+
+def test_skips_completed_and_unneeded_stages(tmp_path, monkeypatch):
+    code, ran, state = _run(tmp_path, monkeypatch, STATE)
+    assert code == 0
+    assert ran == ["invoke_architect_agent", "invoke_dev_agent_iterative", "build_runner", "invoke_ops_agent"]
+    assert "status: ops_complete" in state
+    for key in ("architect", "dev", "qa", "ops"):
+        assert f"  {key}: ✓\n" in state
+    assert "  design: skipped\n" in state
+    assert state.endswith("  build_validation: - skipped\n")
+
+
+def test_dev_reruns_with_pending_error_context(tmp_path, monkeypatch):
+    (tmp_path / "f1.error-context.json").write_text("{}")
+    (tmp_path / "f1.build.json").write_text("{}")
+    done = STATE.replace("pending", "✓")
+    code, ran, state = _run(tmp_path, monkeypatch, done, last="build")
+    assert ran == ["invoke_dev_agent_iterative", "build_runner"]
+    assert "build_validation: ✓" in state and "error_context_resolved: ✓" in state
+    assert not (tmp_path / "f1.error-context.json").exists()
+
+
+def test_validated_build_accepts_pending_wireframe(tmp_path, monkeypatch):
+    (tmp_path / "f1.build.json").write_text("{}")
+    mark_pending(tmp_path / "f1.json", "dev", 3)
+    _run(tmp_path, monkeypatch, STATE.replace("  dev: pending", "  dev: in-progress"), first="build", last="build")
+    assert [r["version"] for r in read_records(tmp_path / "f1.json.history.jsonl") if r["op"] == "consumed"] == [3]
+
+
+def test_skipped_build_leaves_wireframe_pending(tmp_path, monkeypatch):
+    mark_pending(tmp_path / "f1.json", "dev", 3)
+    _run(tmp_path, monkeypatch, STATE, first="build", last="build")
+    assert [r["op"] for r in read_records(tmp_path / "f1.json.history.jsonl")] == ["pending"]
+
+
+def test_qa_blocks_on_failed_build(tmp_path, monkeypatch):
+    state = STATE.replace("  dev: pending", "  dev: ✓") + "  build_validation: ✗ failed\n"
+    code, ran, state = _run(tmp_path, monkeypatch, state, first="qa")
+    assert code == 1 and ran == []
+    assert "qa: pending" in state
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("AID_TRACE_FILE", str(path))
+    monkeypatch.delenv("AID_TRACE", raising=False)
+    tracing.reset()
+    yield path
+    monkeypatch.delenv("AID_TRACE_FILE")
+    tracing.reset()
+
+
+def test_settings_are_read_when_the_first_span_starts(tmp_path, monkeypatch):
+    monkeypatch.delenv("AID_TRACE_FILE", raising=False)
+    monkeypatch.delenv("AID_TRACE", raising=False)
+    tracing.reset()
+    assert tracing.span("off") is tracing._NOOP
+
+    # As when .env is loaded after the module was imported
+    monkeypatch.setenv("AID_TRACE", "summary")
+    tracing.reset()
+    with tracing.span("on") as s:
+        assert s is not tracing._NOOP
+    monkeypatch.delenv("AID_TRACE")
+    tracing.reset()
+
+
+def test_nested_spans_export_as_otlp(trace_file):
+    with tracing.span("stage", feature="f-1") as outer:
+        with tracing.span("model_call") as inner:
+            tracing.add_to_attribute("llm.total_tokens", 120)
+        with pytest.raises(ValueError):
+            with tracing.span("parse"):
+                raise ValueError("bad json")
+    tracing.flush()
+
+    lines = trace_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    spans = {s["name"]: s for s in json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert "parentSpanId" not in spans["stage"]
+    assert spans["model_call"]["parentSpanId"] == outer.span_id
+    assert spans["parse"]["parentSpanId"] == outer.span_id
+    assert spans["model_call"]["spanId"] == inner.span_id
+    assert len({s["traceId"] for s in spans.values()}) == 1
+    assert {"key": "llm.total_tokens", "value": {"intValue": "120"}} in spans["model_call"]["attributes"]
+    assert spans["parse"]["status"]["code"] == 2
+    assert spans["stage"]["status"]["code"] == 1
+
+    loaded = {s["name"]: s for s in tracing.load_trace_file(trace_file)}
+    assert loaded["stage"]["attributes"] == {"feature": "f-1"}
+    assert loaded["model_call"]["attributes"]["llm.total_tokens"] == 120
+    assert loaded["parse"]["error"] and not loaded["stage"]["error"]
+
+
+def test_flush_drops_exported_spans(trace_file):
+    with tracing.span("once"):
+        pass
+    tracing.flush()
+    tracing.flush()
+    assert len(trace_file.read_text(encoding="utf-8").splitlines()) == 1
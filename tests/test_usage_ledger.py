@@ -0,0 +1,45 @@
+import contextvars
+import time
+from types import SimpleNamespace
+
+from journal import read_records
+from usage_ledger import aggregate, record_usage, set_usage_context
+
+
+def _response(prompt=1000, cached=200, completion=500):
+    return SimpleNamespace(model="gpt-4.1-2025-04-14", usage=SimpleNamespace(
+        prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached)))
+
+
+def _record(ledger, **context):
+    def call():
+        set_usage_context(**context)
+        return record_usage(_response(), "gpt-4.1", time.monotonic(), ledger_path=ledger)
+    # A fresh context, as each agent thread gets, so the fields do not leak into other tests
+    return contextvars.copy_context().run(call)
+
+
+def test_call_is_recorded_under_the_context_stage(tmp_path, monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    ledger = tmp_path / "ledger.jsonl"
+    _record(ledger, feature_id="f-1", stage="dev", iteration=2)
+
+    [record] = read_records(ledger)
+    assert (record["feature_id"], record["stage"], record["iteration"]) == ("f-1", "dev", 2)
+    assert (record["prompt_tokens"], record["cached_tokens"], record["completion_tokens"]) == (1000, 200, 500)
+    assert record["provider"] == "openai"
+    # 800 uncached at $2, 200 cached at $0.50, 500 output at $8 per million
+    assert record["cost_usd"] == 0.0057
+
+    [row] = aggregate(read_records(ledger), by="stage")
+    assert row["key"] == "dev" and row["calls"] == 1
+
+
+def test_replayed_calls_are_not_recorded(tmp_path, monkeypatch):
+    monkeypatch.setenv("AI_PROVIDER", "replay")
+    ledger = tmp_path / "ledger.jsonl"
+    record = _record(ledger, feature_id="f-1", stage="dev")
+
+    assert record["stage"] == "dev" and record["total_tokens"] == 1500
+    assert not ledger.exists()
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from wireframe import FORMAT, WireframeError, dumps, load_wireframe, parse_wireframe, save_wireframe, validate
+
+NESTED = {
+    "name": "LoginScreen", "type": "FRAME", "width": 375, "height": 812, "children": [
+        {"name": "Title", "type": "TEXT", "characters": "Welcome", "fontSize": 16, "width": "FILL"},
+        {"name": "Subtitle", "type": "TEXT", "characters": "Sign in", "fontSize": 16, "width": "FILL"},
+        {"name": "Submit", "type": "BUTTON", "label": "Log in", "backgroundColor": "#1a73e8"},
+    ],
+}
+
+
+def test_compact_round_trip_shares_styles():
+    wireframe = parse_wireframe(NESTED)
+    data = json.loads(dumps(wireframe))
+    assert data["format"] == FORMAT
+    assert data["styles"] == {"s1": {"fontSize": 16, "width": "FILL"}}
+    assert [child.get("styleRef") for child in data["screens"][0]["children"]] == ["s1", "s1", None]
+
+    reparsed = parse_wireframe(data)
+    assert json.loads(dumps(reparsed, compact=False)) == NESTED
+    # Identical styles are one shared object in memory
+    title, subtitle, _ = reparsed.screens[0].children
+    assert title.style is subtitle.style
+
+
+def test_unwraps_design_results():
+    wrapped = {"wireframe_json_string": json.dumps(NESTED)}
+    assert parse_wireframe(wrapped).node_count() == 4
+
+
+def test_validate_reports_problems():
+    bad = {"name": "S", "type": "FRAME", "children": [
+        {"name": "T", "type": "TEXT", "width": "wide"},
+        {"name": "B", "type": "WIDGET", "textColor": "blue"},
+    ]}
+    issues = validate(parse_wireframe(bad))
+    assert "S/T: TEXT node has no characters" in issues
+    assert "S/T: width must be a size in px or FILL/HUG/FIXED, got 'wide'" in issues
+    assert "S/B: unknown type WIDGET" in issues
+    assert "S/B: textColor is not a hex color: 'blue'" in issues
+    assert validate(parse_wireframe(NESTED)) == []
+
+
+def test_unknown_style_ref_is_an_error():
+    with pytest.raises(WireframeError, match="unknown styleRef"):
+        parse_wireframe({"format": FORMAT, "styles": {}, "screens": [{"name": "S", "styleRef": "s9"}]})
+
+
+def test_save_wireframe_writes_compact(tmp_path):
+    path = tmp_path / "wireframe.json"
+    result = save_wireframe(path, json.dumps(NESTED))
+    assert result["nodes"] == 4 and result["styles"] == 1 and result["issues"] == []
+    assert json.loads(dumps(load_wireframe(path), compact=False)) == NESTED
+
+
+def test_save_wireframe_keeps_unparseable_input(tmp_path):
+    path = tmp_path / "wireframe.json"
+    result = save_wireframe(path, "not json")
+    assert result["wireframe"] is None and result["issues"]
+    assert path.read_text() == "not json"
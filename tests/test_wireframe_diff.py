@@ -0,0 +1,74 @@
+import json
+
+from journal import read_records
+from wireframe import parse_wireframe
+from wireframe_diff import (
+    apply, canonical, diff, history_path_for, mark_consumed, mark_pending, reconstruct, record_version,
+    wireframe_context,
+)
+
+
+def _screen(*children, title="Welcome"):
+    return {"name": "Home", "type": "FRAME", "children": [
+        {"name": "Title", "type": "TEXT", "characters": title},
+        *children,
+    ]}
+
+
+BUTTON = {"name": "Go", "type": "BUTTON", "label": "Go"}
+LINK = {"name": "Help", "type": "TEXT", "characters": "Help"}
+
+
+def test_diff_apply_round_trip():
+    old = parse_wireframe(_screen(BUTTON, LINK))
+    new = parse_wireframe(_screen(LINK, {**BUTTON, "label": "Start"}, title="Hi"))
+    ops = diff(old, new)
+    assert {op["op"] for op in ops} == {"move", "update"}
+    assert canonical(apply(old, ops)) == canonical(new)
+    assert diff(new, new) == []
+
+
+def test_renamed_node_is_remove_plus_add():
+    old = parse_wireframe(_screen(BUTTON))
+    new = parse_wireframe(_screen({**BUTTON, "name": "Start"}))
+    assert sorted(op["op"] for op in diff(old, new)) == ["add", "remove"]
+    assert canonical(apply(old, diff(old, new))) == canonical(new)
+
+
+def test_history_reconstructs_every_version(tmp_path):
+    path = tmp_path / "f1.json"
+    versions = [_screen(), _screen(BUTTON), _screen(BUTTON, LINK, title="Hi")]
+    for i, raw in enumerate(versions, 1):
+        assert record_version(path, raw)["version"] == i
+        path.write_text(json.dumps(raw))
+    assert record_version(path, versions[-1]) == {"version": 3, "ops": []}
+
+    records = read_records(history_path_for(path))
+    for i, raw in enumerate(versions, 1):
+        wireframe, version = reconstruct(records, i)
+        assert version == i and canonical(wireframe) == canonical(parse_wireframe(raw))
+
+
+def test_context_sends_only_changes_after_acceptance(tmp_path):
+    path = tmp_path / "f1.json"
+    assert wireframe_context(path) == ("", None)
+    record_version(path, _screen())
+    path.write_text(json.dumps(_screen()))
+
+    text, version = wireframe_context(path)
+    assert version == 1 and "Welcome" in text
+
+    # Not accepted yet: the next run still gets the full wireframe
+    mark_pending(path, "dev", version)
+    assert wireframe_context(path)[0] == text
+
+    assert mark_consumed(path, "dev") == 1
+    assert mark_consumed(path, "dev") is None
+    assert wireframe_context(path) == ("", 1)
+
+    record_version(path, _screen(BUTTON))
+    path.write_text(json.dumps(_screen(BUTTON)))
+    text, version = wireframe_context(path)
+    assert version == 2
+    assert text.startswith("Wireframe version 2. Changes since version 1")
+    assert "added under Home" in text and "Welcome" not in text